@@ -1,394 +1,58 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from scipy import stats
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import csv, re, io
-from collections import defaultdict
-from io import BytesIO
-from datetime import datetime
+import hashlib
+from attribution_engine import CI_LEVEL, DEFAULT_MAX_LAG, DEFAULT_RESAMPLES, calibrate_funnel, sweep, tornado
+from attribution_model import (BRAND_MAP, CONTENT_MIN_YEAR, STORE_PATH, aggregate_model,
+                               store_aggregate, available_months)
+from time_axis import DEFAULT_WINDOW_MONTHS, month_label, window_label
+from ingest import ingest
+from parse_cache import ParseCache
+from results import BrandResults
+import diagnostics
+from diagnostics import span
+from theme import (S1, BD, CORAL, GRN, YEL, BLU, PUR, T1, T2, T3, CC, MO, CSS,
+                   fd, fn, kpi_h, sec, badge_h, pthem)
+
+# plotly is imported inside the tabs that draw charts, so the model and a
+# bare page load don't pay for it
 
 st.set_page_config(page_title="TTS Amazon Lift Model", page_icon="📊", layout="wide")
 
 # ═══════════════ THEME — Pattern.com inspired ═══════════════
-BG='#0A0A0A';S1='#111111';S2='#1A1A1A';BD='#2A2A2A'
-# Pattern uses a dark black BG, white text, and coral/orange accent
-CORAL='#FF6B35';GRN='#34D399';YEL='#FBBF24';BLU='#60A5FA'
-PUR='#A78BFA';T1='#FFFFFF';T2='#9CA3AF';T3='#4B5563'
-CC={'HIGH':GRN,'MED':YEL,'LOW':'#FB923C','WEAK':'#EF4444','INSUF':T3}
-MO=['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
-
-st.markdown(f"""<style>
-@import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800;900&display=swap');
-.stApp{{background:{BG};}}
-section[data-testid="stSidebar"]{{background:{S1};border-right:1px solid {BD};}}
-h1,h2,h3{{font-family:'Inter',sans-serif!important;color:{T1}!important;font-weight:800!important;}}
-.kpi{{background:{S1};border:1px solid {BD};border-radius:12px;padding:18px;text-align:center;position:relative;}}
-.kpi .lb{{font:700 10px 'Inter',sans-serif;color:{T2};text-transform:uppercase;letter-spacing:.08em;}}
-.kpi .vl{{font:800 28px 'Inter',sans-serif;color:{T1};letter-spacing:-.02em;margin:4px 0;}}
-.kpi .vg{{font:800 28px 'Inter',sans-serif;color:{GRN};letter-spacing:-.02em;margin:4px 0;}}
-.kpi .sb{{font:400 10px 'Inter',sans-serif;color:{T3};}}
-.kpi .tip{{display:none;position:absolute;bottom:calc(100% + 8px);left:50%;transform:translateX(-50%);background:#1F2937;color:#D1D5DB;padding:8px 12px;border-radius:8px;font:400 11px 'Inter',sans-serif;white-space:normal;width:220px;text-align:left;z-index:99;box-shadow:0 4px 12px rgba(0,0,0,.4);line-height:1.4;}}
-.kpi .tip::after{{content:'';position:absolute;top:100%;left:50%;transform:translateX(-50%);border:6px solid transparent;border-top-color:#1F2937;}}
-.kpi:hover .tip{{display:block;}}
-.stTabs [data-baseweb="tab-list"]{{gap:4px;}}
-.stTabs [data-baseweb="tab"]{{background:transparent;border:1px solid {BD};border-radius:8px;padding:6px 16px;font-size:12px;font-weight:600;color:{T2};font-family:'Inter',sans-serif;}}
-.stTabs [aria-selected="true"]{{background:rgba(255,107,53,.08)!important;border-color:{CORAL}!important;color:{CORAL}!important;}}
-</style>""", unsafe_allow_html=True)
-
-# ═══════════════ HELPERS ═══════════════
-def fd(v):
-    if v is None: return "$0"
-    v=float(v)
-    if abs(v)>=1e6:return f"${v/1e6:.1f}M"
-    if abs(v)>=1e3:return f"${v/1e3:.0f}K"
-    return f"${v:,.0f}"
-def fn(v):
-    if v is None: return "0"
-    v=float(v)
-    if v>=1e6:return f"{v/1e6:.1f}M"
-    if v>=1e3:return f"{v/1e3:.0f}K"
-    return f"{v:,.0f}"
-def sf(v):
-    try:return float(str(v).replace('$','').replace(',','').replace('%',''))
-    except:return 0.0
-def kpi_h(lb,vl,sb="",g=False,tip=""):
-    vc="vg" if g else "vl"
-    tip_html = f'<div class="tip">{tip}</div>' if tip else ''
-    return f'<div class="kpi">{tip_html}<div class="lb">{lb}</div><div class="{vc}">{vl}</div><div class="sb">{sb}</div></div>'
-def sec(t):
-    st.markdown(f'<div style="display:flex;align-items:center;gap:8px;margin:28px 0 10px;"><div style="width:3px;height:16px;background:{CORAL};border-radius:2px;"></div><span style="font:700 10px \'Inter\',sans-serif;color:{CORAL};text-transform:uppercase;letter-spacing:.12em;">{t}</span></div>',unsafe_allow_html=True)
-def badge_h(c):
-    return f'<span style="display:inline-block;font:700 9px \'Inter\',sans-serif;padding:2px 8px;border-radius:4px;letter-spacing:.06em;background:{CC.get(c,T3)}15;color:{CC.get(c,T3)};">{c}</span>'
-def pthem(fig,h=350):
-    fig.update_layout(height=h,plot_bgcolor=BG,paper_bgcolor=BG,font=dict(family='Inter,sans-serif',color=T2,size=10),margin=dict(l=10,r=10,t=20,b=10),hovermode='x unified',legend=dict(orientation='h',y=-0.12,font=dict(size=10)))
-    fig.update_xaxes(gridcolor=BD,showline=False);fig.update_yaxes(gridcolor=BD,showline=False)
-    return fig
-
-# ═══════════════ BRAND MAP ═══════════════
-# All known name variants → canonical name
-# Amazon report is the MASTER: only brands in Amazon report are included
-BRAND_MAP={
-    # Broadway shop → canonical
-    'Thorne Health Shop':'Thorne Research','Pure Encapsulations Shop':'Pure Encapsulations',
-    'Hims & Hers':'Hims & Hers','Vital Proteins Shop':'Vital Proteins',
-    'youtheory':'YouTheory','Philips Shop US':'Philips','PHILIPS':'Philips',
-    'TruNiagen':'Tru Niagen','SmartMouth':'SmartMouth','Sakura of America Shop':'Sakura',
-    'Strider Bikes':'Strider Bikes','Mercola Market Shop':'Dr. Mercola',
-    'Natural Factors':'Natural Factors','Herbs, Etc.':'Herbs, Etc.',
-    'Amazing Grass':'Amazing Grass','Emerald Labs':'Emerald Labs',
-    'Balance of Nature Shop':'Balance of Nature','AdvoCare':'AdvoCare',
-    'Brownmed':'Brownmed','New Chapter Inc':'New Chapter',
-    'Optimum Nutrition Shop':'Optimum Nutrition','Gaia Herbs':'Gaia',
-    # Amazon report → canonical
-    'Atrium - Pure Encapsulations':'Pure Encapsulations','Dr Mercola':'Dr. Mercola',
-    'Emerald Laboratories':'Emerald Labs','Herbs Etc.':'Herbs, Etc.',
-    'Glanbia Performance Nutrition':'Optimum Nutrition',
-    'Philips Avent':'Philips','Philips Norelco':'Philips','Philips Sonicare':'Philips',
-    'Strider':'Strider Bikes','Youtheory':'YouTheory',
-    # GMV CSV → canonical
-    'Advocare':'AdvoCare','Tru Niagen':'Tru Niagen',
-    'Vital Proteins':'Vital Proteins','Sakura':'Sakura',
-    'Thorne Research':'Thorne Research','Pure Encapsulations':'Pure Encapsulations',
-    'Hims & Hers':'Hims & Hers','YouTheory':'YouTheory',
-    'SmartMouth':'SmartMouth','Strider Bikes':'Strider Bikes',
-    'Dr. Mercola':'Dr. Mercola','Natural Factors':'Natural Factors',
-    'Herbs, Etc.':'Herbs, Etc.','Emerald Labs':'Emerald Labs',
-    'Balance of Nature':'Balance of Nature','AdvoCare':'AdvoCare',
-    'Brownmed':'Brownmed','New Chapter':'New Chapter',
-    'Optimum Nutrition':'Optimum Nutrition','Gaia':'Gaia',
-    'Amazing Grass':'Amazing Grass','Philips':'Philips',
-}
-
-def norm(name, bm):
-    if not name or not str(name).strip(): return None
-    name = str(name).strip()
-    if name in bm: return bm[name]
-    for k, v in bm.items():
-        if k.lower() == name.lower(): return v
-    clean = re.sub(r'\s*\(.*?\)\s*$', '', name)
-    clean = re.sub(r'\s*(Shop|Official|Store|US|USA)\s*$', '', clean, flags=re.IGNORECASE).strip()
-    clean = re.sub(r'\s*(DO NOT|DONT|no more|No Longer).*$', '', clean, flags=re.IGNORECASE).strip()
-    if not clean: clean = name
-    bm[name] = clean
-    return clean
-
-MO_MAP={'january':1,'february':2,'march':3,'april':4,'may':5,'june':6,
-        'july':7,'august':8,'september':9,'october':10,'november':11,'december':12,
-        'jan':1,'feb':2,'mar':3,'apr':4,'jun':6,'jul':7,'aug':8,'sep':9,'oct':10,'nov':11,'dec':12}
+st.markdown(CSS, unsafe_allow_html=True)
+
+# ═══════════════ DIAGNOSTICS ═══════════════
+# TTS_DIAGNOSTICS=1 (or =memory) records spans for each script run, per session
+diag = None
+if diagnostics.mode_from_env():
+    if 'diagnostics' not in st.session_state:
+        st.session_state['diagnostics'] = diagnostics.Recorder.from_env()
+    diag = st.session_state['diagnostics']
+    diag.clear()
+diagnostics.use(diag)
 
 # ═══════════════ PARSERS ═══════════════
 
-@st.cache_data
-def parse_gmv_csv(fb):
-    text=fb.decode('utf-8-sig');reader=csv.reader(io.StringIO(text));rows=list(reader)
-    hi=None
-    for i,r in enumerate(rows):
-        if r and str(r[0]).strip().upper()=='BRAND': hi=i;break
-    if hi is None: return None
-    headers=rows[hi]; month_cols={}
-    for ci,h in enumerate(headers):
-        hl=str(h).strip().lower()
-        for mn,mv in MO_MAP.items():
-            if mn in hl:
-                for y in ['2026','2025','2024']:
-                    if y in hl: month_cols[(int(y),mv)]=ci;break
-                break
-    data=[]
-    for r in rows[hi+1:]:
-        if not r or not r[0] or r[0].strip() in ('Total',''): continue
-        brand=r[0].strip();ps=r[1].strip() if len(r)>1 else '';status=r[3].strip() if len(r)>3 else ''
-        monthly={}
-        for (year,month),ci in month_cols.items():
-            if ci<len(r): monthly[(year,month)]=sf(r[ci])
-        data.append({'brand':brand,'ps':ps,'status':status,'monthly':monthly})
-    return data
-
-@st.cache_data
-def parse_broadway(fb):
-    import openpyxl
-    wb=openpyxl.load_workbook(BytesIO(fb),read_only=True,data_only=True)
-    pr,vr,ct=[],[],[]
-    if 'Partner Raw' in wb.sheetnames:
-        for i,row in enumerate(wb['Partner Raw'].iter_rows(values_only=True)):
-            if i==0:continue
-            v=list(row)
-            if not v[0]:continue
-            pr.append({'shop':str(v[0]),'gmv':sf(v[1]),
-                'impressions':sf(v[13]) if len(v)>13 else 0,
-                'visitors':sf(v[14]) if len(v)>14 else 0,
-                'affiliate_gmv':sf(v[10]) if len(v)>10 else 0,
-                'month':int(sf(v[18])) if len(v)>18 and v[18] else 0,
-                'year':int(sf(v[20])) if len(v)>20 and v[20] else 0})
-    if 'Partner Video Raw' in wb.sheetnames:
-        for i,row in enumerate(wb['Partner Video Raw'].iter_rows(values_only=True)):
-            if i==0:continue
-            v=list(row)
-            if not v[0]:continue
-            vr.append({'shop':str(v[0]),
-                'videos':sf(v[10]) if len(v)>10 else 0,
-                'lives':sf(v[9]) if len(v)>9 else 0,
-                'month':int(sf(v[13])) if len(v)>13 and v[13] else 0,
-                'year':int(sf(v[15])) if len(v)>15 and v[15] else 0})
-    if 'Retainer Creator TAP Data' in wb.sheetnames:
-        for i,row in enumerate(wb['Retainer Creator TAP Data'].iter_rows(values_only=True)):
-            if i==0:continue
-            v=list(row)
-            if not v[0]:continue
-            ct.append({'creator':str(v[5]) if len(v)>5 and v[5] else '',
-                'shop':str(v[10]) if len(v)>10 and v[10] else '',
-                'views':sf(v[18]) if len(v)>18 else 0,
-                'likes':sf(v[19]) if len(v)>19 else 0,
-                'month':int(sf(v[24])) if len(v)>24 and v[24] else 0,
-                'year':int(sf(v[26])) if len(v)>26 and v[26] else 0})
-    wb.close()
-    return {'pr':pr,'vr':vr,'ct':ct}
-
-@st.cache_data
-def parse_amazon(fb):
-    import openpyxl
-    wb=openpyxl.load_workbook(BytesIO(fb),read_only=True,data_only=True)
-    target=None
-    for s in wb.sheetnames:
-        ws=wb[s]
-        first=[str(c).lower() if c else '' for c in next(ws.iter_rows(max_row=1,values_only=True))]
-        if any('start' in f and 'date' in f for f in first) and any('brand' in f for f in first):
-            target=s;break
-    if not target:wb.close();return None
-    ws=wb[target];headers=None;rows=[]
-    for i,row in enumerate(ws.iter_rows(values_only=True)):
-        v=list(row)
-        if i==0:headers=[str(c).strip() if c else '' for c in v];continue
-        if v[0]:rows.append(v)
-    wb.close()
-    if not headers or not rows:return None
-    hl=[h.lower() for h in headers]
-    def fc(kws):
-        for k in kws:
-            for j,h in enumerate(hl):
-                if all(w in h for w in k.split()):return j
-        return None
-    cs=fc(['start date']);cb=fc(['brand']);ct_col=fc(['total sales $','total sales'])
-    cas=fc(['ad sales','advertising sales','sponsored sales'])
-    cpv=fc(['total page view','page view'])
-    if cs is None or cb is None or ct_col is None:return None
-    data=[]
-    for v in rows:
-        try:
-            s=v[cs]
-            if isinstance(s,str):s=datetime.strptime(s.split(' ')[0],'%Y-%m-%d')
-            elif not isinstance(s,datetime):continue
-            sales=sf(v[ct_col]);ad_s=sf(v[cas]) if cas is not None else 0
-            data.append({'year':s.year,'month':s.month,'brand_raw':str(v[cb]).strip(),
-                'sales':sales,'ad_sales':ad_s,'organic':sales-ad_s,
-                'page_views':sf(v[cpv]) if cpv is not None else 0})
-        except:continue
-    return data
+@st.cache_data(show_spinner=False)
+def load_uploads(file_keys, _gmv_bytes, _bw_bytes, _amz_bytes):
+    """Parse all uploads in parallel, memoized in memory and on disk by content hash. Broadway rows before CONTENT_MIN_YEAR (if set) are dropped in the parse."""
+    return ingest(_gmv_bytes, _bw_bytes, _amz_bytes, min_year=CONTENT_MIN_YEAR, cache=ParseCache.from_env())
 
 
 # ═══════════════ MODEL BUILDER ═══════════════
 
-def build_model(gmv_data, broadway, amazon_data, bm, cap_mult=4,
-                browse_rate=0.15, recall_rate=0.002, amz_conv=0.10, amz_aov=35,
-                report_month=None):
-    """Build the full model. Amazon brands = master list."""
-
-    # Step 1: Get Amazon master brand list
-    amz_monthly = defaultdict(lambda: defaultdict(lambda:{'sales':0,'ad_sales':0,'organic':0,'page_views':0}))
-    amz_brands = set()
-    if amazon_data:
-        for a in amazon_data:
-            brand = norm(a['brand_raw'], bm)
-            if not brand: continue
-            amz_brands.add(brand)
-            d = amz_monthly[brand][(a['year'], a['month'])]
-            d['sales'] += a['sales']; d['ad_sales'] += a['ad_sales']
-            d['organic'] += a['organic']; d['page_views'] += a['page_views']
-
-    # Step 2: TTS monthly from GMV CSV
-    tts_monthly = defaultdict(lambda: defaultdict(float))
-    tts_meta = {}
-    if gmv_data:
-        for row in gmv_data:
-            brand = norm(row['brand'], bm)
-            if not brand: continue
-            tts_meta[brand] = {'ps':row['ps'],'status':row['status']}
-            for (y,m),gmv in row['monthly'].items():
-                tts_monthly[brand][(y,m)] += gmv
-
-    # Step 3: Content from Broadway
-    content = defaultdict(lambda: defaultdict(lambda:{'gmv':0,'impressions':0,'visitors':0,'affiliate_gmv':0,'videos':0,'lives':0,'views':0,'likes':0,'creators':set()}))
-    if broadway:
-        for p in broadway['pr']:
-            if p['year']<2025:continue
-            brand=norm(p['shop'],bm)
-            if not brand:continue
-            d=content[brand][(p['year'],p['month'])]
-            d['gmv']+=p['gmv'];d['impressions']+=p['impressions'];d['visitors']+=p['visitors'];d['affiliate_gmv']+=p['affiliate_gmv']
-        for v in broadway['vr']:
-            if v['year']<2025:continue
-            brand=norm(v['shop'],bm)
-            if not brand:continue
-            content[brand][(v['year'],v['month'])]['videos']+=v['videos']
-            content[brand][(v['year'],v['month'])]['lives']+=v['lives']
-        for c in broadway['ct']:
-            if c['year']<2025:continue
-            brand=norm(c['shop'],bm)
-            if not brand:continue
-            content[brand][(c['year'],c['month'])]['views']+=c['views']
-            content[brand][(c['year'],c['month'])]['likes']+=c['likes']
-            if c['creator']:content[brand][(c['year'],c['month'])]['creators'].add(c['creator'])
-
-    # Use selected report month (or auto-detect)
-    if report_month:
-        latest = report_month
-    else:
-        content_months = set()
-        for b,ms in content.items():
-            for k in ms: content_months.add(k)
-        latest = max(content_months) if content_months else (2026,1)
-
-    # Step 4: Build brand models — ONLY for Amazon master brands
-    master_brands = amz_brands if amz_brands else set(tts_monthly.keys())
-
-    brands = []
-    for brand in sorted(master_brands):
-        tts_2025 = [tts_monthly[brand].get((2025,m),0) for m in range(1,13)]
-        amz_2025 = [amz_monthly[brand].get((2025,m),{}).get('sales',0) for m in range(1,13)]
-        org_2025 = [amz_monthly[brand].get((2025,m),{}).get('organic',0) for m in range(1,13)]
-        active = sum(1 for v in tts_2025 if v > 0)
-
-        # Latest month content
-        lc = content[brand].get(latest,{})
-        imp = lc.get('impressions',0) if isinstance(lc,dict) else 0
-        vis = lc.get('visitors',0) if isinstance(lc,dict) else 0
-        vid = lc.get('videos',0) if isinstance(lc,dict) else 0
-        liv = lc.get('lives',0) if isinstance(lc,dict) else 0
-        cre = len(lc.get('creators',set())) if isinstance(lc,dict) and isinstance(lc.get('creators'),set) else 0
-        aff = lc.get('affiliate_gmv',0) if isinstance(lc,dict) else 0
-
-        # Latest month TTS GMV
-        jan_tts = tts_monthly[brand].get(latest,0)
-        if jan_tts == 0: jan_tts = lc.get('gmv',0) if isinstance(lc,dict) else 0
-
-        # Latest month AMZ
-        jan_amz = amz_monthly[brand].get(latest,{}).get('sales',0)
-        # If no latest month AMZ, use last available
-        if jan_amz == 0:
-            for m in range(12,0,-1):
-                jan_amz = amz_monthly[brand].get((2025,m),{}).get('sales',0)
-                if jan_amz > 0: break
-
-        meta = tts_meta.get(brand,{})
-
-        # ── CORRELATION MODEL ──
-        r_best=0;r_type='same';conf='INSUF';corr_rate=0.03
-        corr_attr=0;corr_capped=False
-        if active >= 3 and any(v>0 for v in amz_2025):
-            ta=np.array(tts_2025,dtype=float);aa=np.array(amz_2025,dtype=float);oa=np.array(org_2025,dtype=float)
-            cors=[]
-            if np.std(ta)>0 and np.std(aa)>0:
-                r,p=stats.pearsonr(ta,aa);cors.append((abs(r),r,'same'))
-            if np.std(ta)>0 and np.std(oa)>0:
-                r,p=stats.pearsonr(ta,oa);cors.append((abs(r),r,'org-same'))
-            if np.std(ta[:-1])>0 and np.std(aa[1:])>0:
-                r,p=stats.pearsonr(ta[:-1],aa[1:]);cors.append((abs(r),r,'lag+1'))
-            if np.std(ta[:-1])>0 and np.std(oa[1:])>0:
-                r,p=stats.pearsonr(ta[:-1],oa[1:]);cors.append((abs(r),r,'org-lag'))
-            if cors:
-                best=max(cors,key=lambda x:x[0]);r_best=best[1];r_type=best[2]
-            if abs(r_best)>=0.8:conf='HIGH';corr_rate=0.17
-            elif abs(r_best)>=0.5:conf='MED';corr_rate=0.12
-            elif abs(r_best)>=0.3:conf='LOW';corr_rate=0.06
-            else:conf='WEAK';corr_rate=0.02
-            if jan_tts>0 and jan_amz>0:
-                uc=jan_amz*corr_rate;cp=jan_tts*cap_mult
-                corr_attr=min(uc,cp);corr_capped=uc>cp
-        elif active<3:conf='INSUF';corr_rate=0.03
-        else:conf='WEAK';corr_rate=0.02
-
-        # ── FUNNEL MODEL (dual-path) ──
-        funnel_attr = 0
-        path_a = 0  # non-buying visitors → Amazon
-        path_b = 0  # impression-only → Amazon
-        path_a_amz_vis = 0
-        path_b_amz_vis = 0
-
-        if vis > 0:
-            tts_buyer_count = jan_tts / amz_aov if amz_aov > 0 else 0
-            tts_buy_rate = min(tts_buyer_count / vis, 0.5) if vis > 0 else 0
-            non_buyers = vis * (1 - tts_buy_rate)
-            path_a_amz_vis = non_buyers * browse_rate
-            path_a = path_a_amz_vis * amz_conv * amz_aov
-
-        if imp > vis:
-            view_only = imp - vis
-            path_b_amz_vis = view_only * recall_rate
-            path_b = path_b_amz_vis * amz_conv * amz_aov
-
-        funnel_attr = path_a + path_b
-        total_amz_vis = path_a_amz_vis + path_b_amz_vis
-
-        brands.append({
-            'brand':brand, 'ps':meta.get('ps',''), 'status':meta.get('status',''),
-            'jan_tts':jan_tts, 'jan_amz':jan_amz, 'tts_total':sum(tts_2025),
-            'active_months':active,
-            # Correlation model
-            'r_best':r_best, 'r_type':r_type, 'corr_rate':corr_rate,
-            'confidence':conf, 'corr_attr':corr_attr, 'corr_capped':corr_capped,
-            # Funnel model
-            'funnel_attr':funnel_attr, 'path_a':path_a, 'path_b':path_b,
-            'path_a_vis':path_a_amz_vis, 'path_b_vis':path_b_amz_vis,
-            'total_amz_vis':total_amz_vis,
-            # Content
-            'impressions':imp, 'visitors':vis, 'videos':vid,
-            'live_streams':liv, 'creators':cre, 'affiliate_gmv':aff,
-            # Monthly series
-            'tts_2025':tts_2025, 'amz_2025':amz_2025, 'org_2025':org_2025,
-        })
-
-    return brands, latest
+@st.cache_data(show_spinner=False)
+def cached_aggregate(file_keys, report_month, window, n_resamples, max_lag, _gmv_data, _broadway, _amazon_data):
+    """aggregate_model memoized on upload hashes + report month + window + resamples + max lag (parsed data itself isn't hashed)."""
+    if STORE_PATH:
+        return store_aggregate(_gmv_data, _broadway, _amazon_data, dict(BRAND_MAP), report_month=report_month, window=window, n_resamples=n_resamples, max_lag=max_lag)
+    return aggregate_model(_gmv_data, _broadway, _amazon_data, dict(BRAND_MAP), report_month=report_month, window=window, n_resamples=n_resamples, max_lag=max_lag)
+
+@st.cache_data(show_spinner=False)
+def cached_calibration(file_keys, report_month, window, n_resamples, max_lag, cap_mult, amz_aov, amz_conv, by_tier, _arrays):
+    """calibrate_funnel memoized on cached_aggregate's key + the settings it fits under (arrays aren't hashed)."""
+    return calibrate_funnel(_arrays, cap_mult=cap_mult, amz_aov=amz_aov, amz_conv=amz_conv, by_tier=by_tier)
 
 
 # ═══════════════ APP LAYOUT ═══════════════
@@ -421,13 +85,13 @@ if not amz_file:
     st.stop()
 
 # Parse
-bm = dict(BRAND_MAP)
-gmv_data = parse_gmv_csv(gmv_file.read()) if gmv_file else None
-if gmv_file: gmv_file.seek(0)
-broadway = parse_broadway(bw_file.read()) if bw_file else None
-if bw_file: bw_file.seek(0)
-amazon_data = parse_amazon(amz_file.read())
-amz_file.seek(0)
+gmv_bytes = gmv_file.getvalue() if gmv_file else None
+bw_bytes = bw_file.getvalue() if bw_file else None
+amz_bytes = amz_file.getvalue()
+file_keys = tuple(hashlib.sha256(fb).hexdigest() if fb else None for fb in (gmv_bytes, bw_bytes, amz_bytes))
+with span("load_uploads","app"):
+    parsed = load_uploads(file_keys, gmv_bytes, bw_bytes, amz_bytes)
+gmv_data, broadway, amazon_data = parsed['gmv'], parsed['broadway'], parsed['amazon']
 
 if not amazon_data:
     st.error("Could not parse Amazon report. Check the file has a 'Brands > Aggregations' sheet with Start Date and Brand columns.")
@@ -435,15 +99,7 @@ if not amazon_data:
 
 # ═══════════════ MONTH SELECTOR ═══════════════
 # Detect available months from Broadway data
-avail_months = set()
-if broadway:
-    for p in broadway['pr']:
-        if p['year'] >= 2025 and p['month'] > 0:
-            avail_months.add((p['year'], p['month']))
-if not avail_months and gmv_data:
-    for row in gmv_data:
-        for (y, m) in row['monthly']:
-            if y >= 2025: avail_months.add((y, m))
+avail_months = available_months(gmv_data, broadway)
 if not avail_months:
     avail_months = {(2026, 1)}
 
@@ -462,29 +118,51 @@ with st.sidebar:
     st.markdown(f'<span style="font:700 10px \'Inter\',sans-serif;color:{CORAL};text-transform:uppercase;letter-spacing:.16em;">Model Settings</span>',unsafe_allow_html=True)
     st.markdown("---")
     st.markdown(f"**Correlation Model**")
+    window_months = st.slider("Correlation window (months)", 6, 18, DEFAULT_WINDOW_MONTHS, help="Trailing months, ending at the reporting month, that r is computed over")
+    max_lag = st.slider("Max lag (months)", 1, 6, DEFAULT_MAX_LAG, help="Also try Amazon responding up to this many months after TTS; above 1, the Correlation view shows each brand's lag profile")
     cap_mult = st.slider("GMV Cap Multiplier", 2, 8, 4, help="Attributed <= TTS x this")
+    show_ci = st.checkbox("Bootstrap confidence intervals", help=f"{CI_LEVEL:.0%} intervals for r and Corr Attributed from {DEFAULT_RESAMPLES:,} resamples of the window months")
     st.markdown("---")
     st.markdown(f"**Funnel Model**")
     browse_rate = st.slider("Non-buyer Amazon browse %", 5, 40, 15, help="% of TTS visitors who didn't buy but later go to Amazon") / 100
     recall_rate = st.slider("Impression recall rate (per 1000)", 1, 10, 2, help="Per 1000 impression-only viewers who later search Amazon") / 1000
     amz_conv = st.slider("Amazon conversion %", 5, 20, 10) / 100
     amz_aov = st.slider("Amazon AOV ($)", 15, 75, 35)
+    calibration_box = st.expander("Calibrate to correlation model")
     st.markdown("---")
     st.caption(f"GMV CSV: {'loaded' if gmv_data else 'none'}")
     st.caption(f"Broadway: {'loaded' if broadway else 'none'}")
-    st.caption(f"Amazon: {len(amazon_data)} rows")
+    st.caption(f"Amazon: {len(amazon_data['brand_raw'])} rows")
 
-# Build model
-brands, latest = build_model(gmv_data, broadway, amazon_data, bm,
-    cap_mult=cap_mult, browse_rate=browse_rate, recall_rate=recall_rate,
-    amz_conv=amz_conv, amz_aov=amz_aov, report_month=selected_month)
+# Build model — heavy stage is cached per upload set + month; sliders only rerun the light stage
+with span("cached_aggregate","app"):
+    arrays, latest = cached_aggregate(file_keys, selected_month, window_months, DEFAULT_RESAMPLES if show_ci else 0, max_lag, gmv_data, broadway, amazon_data)
+res = BrandResults.build(arrays, cap_mult=cap_mult, browse_rate=browse_rate,
+    recall_rate=recall_rate, amz_conv=amz_conv, amz_aov=amz_aov)
 
-if not brands:
+if not len(res):
     st.error("No matching brands found. Check that brand names align across files.")
     st.stop()
 
-df = pd.DataFrame(brands).sort_values('jan_tts', ascending=False)
+# Funnel rates fitted to the correlation model, shown under the funnel sliders
+with calibration_box:
+    by_tier = st.checkbox("Per confidence tier", key="calibrate_by_tier")
+    with span("calibrate_funnel","app"):
+        fits = cached_calibration(file_keys, selected_month, window_months, DEFAULT_RESAMPLES if show_ci else 0, max_lag,
+                                  cap_mult, amz_aov, amz_conv, by_tier, arrays)
+    st.dataframe(pd.DataFrame([{'Group':g,'Browse %':f['browse_rate']*100,'Recall /1000':f['recall_rate']*1000,
+                                'Conv %':f['amz_conv']*100,'RMSE':f['rmse']} for g, f in fits.items()]).style.format(
+                     {'Browse %':'{:.1f}','Recall /1000':'{:.2f}','Conv %':'{:.1f}','RMSE':'${:,.0f}'}),
+                 hide_index=True, use_container_width=True)
+    st.caption(f"Least-squares fit of each brand's Funnel Attributed to its Corr Attributed at cap {cap_mult}x and AOV ${amz_aov}, "
+               "within the slider ranges. Only conversion × browse and conversion × recall are identified, so conversion "
+               "stays at its slider value unless a range forces it.")
+
+# Scalar metrics indexed by brand, by TTS GMV; series stay in res's matrices
+df = res.table
 ml = f"{MO[latest[1]-1]} {latest[0]}"
+WM = [month_label(ym, short=True) for ym in arrays['window']]
+wl = window_label(arrays['window'])
 
 st.markdown(f'<div style="margin:10px 0;font:700 11px \'Inter\',sans-serif;color:{T2};">{len(df)} Amazon brands matched | Data: {ml}</div>',unsafe_allow_html=True)
 
@@ -505,367 +183,320 @@ with cols[5]:
 
 
 # ═══════════════ TABS ═══════════════
-tabs = st.tabs(["Attribution","Funnel Model","Correlation","Content Funnel","Deep Dive"])
+# Only the selected view is built on a rerun. Correlation and Deep Dive
+# are fragments: paging and brand picks rerun just that view.
+VIEWS = ["Attribution","Funnel Model","Correlation","Content Funnel","Deep Dive","Sensitivity"]
+view = st.radio("View", VIEWS, horizontal=True, key="view", label_visibility="collapsed")
 
 # TAB 1: ATTRIBUTION OVERVIEW
-with tabs[0]:
-    sec("Attribution Overview")
-    st.caption("Two models side-by-side: correlation-based and funnel-based")
-    ad = df.copy()
-    ad['corr_rate_pct'] = (ad['corr_rate']*100).round(0).astype(int).astype(str)+'%'
-    ad['cap_f'] = ad['corr_capped'].apply(lambda x:'YES' if x else '-')
-    disp = ad[['brand','confidence','r_best','corr_rate_pct','corr_attr','funnel_attr','path_a','path_b','jan_tts','jan_amz','cap_f']].copy()
-    disp.columns = ['Brand','Conf','r','Rate','Corr Attr','Funnel Attr','Funnel A (visitors)','Funnel B (impressions)','TTS GMV','AMZ Sales','Capped']
-    st.dataframe(disp.sort_values('Corr Attr',ascending=False).style.format(
-        {'r':'{:.3f}','Corr Attr':'${:,.0f}','Funnel Attr':'${:,.0f}',
-         'Funnel A (visitors)':'${:,.0f}','Funnel B (impressions)':'${:,.0f}',
-         'TTS GMV':'${:,.0f}','AMZ Sales':'${:,.0f}'}),
-        use_container_width=True, height=550)
-
-    sec("Attribution Comparison")
-    cmp = df[['brand','corr_attr','funnel_attr']].copy()
-    cmp = cmp[(cmp['corr_attr']>0)|(cmp['funnel_attr']>0)].sort_values('corr_attr',ascending=True)
-    fig = go.Figure()
-    fig.add_trace(go.Bar(y=cmp['brand'],x=cmp['corr_attr'],name='Correlation',orientation='h',marker=dict(color=GRN,opacity=.7)))
-    fig.add_trace(go.Bar(y=cmp['brand'],x=cmp['funnel_attr'],name='Funnel',orientation='h',marker=dict(color=PUR,opacity=.7)))
-    fig.update_layout(barmode='group')
-    fig.update_xaxes(tickprefix='$',tickformat=',.0s')
-    st.plotly_chart(pthem(fig,max(350,len(cmp)*30)),use_container_width=True)
+def attribution_tab():
+    with span("tab:Attribution","render"):
+        import plotly.graph_objects as go
+        sec("Attribution Overview")
+        st.caption("Two models side-by-side: correlation-based and funnel-based")
+        disp = df[['confidence','r_best','corr_rate','corr_attr','funnel_attr','path_a','path_b','jan_tts','jan_amz','corr_capped']].rename_axis('Brand')
+        disp.columns = ['Conf','r','Rate','Corr Attr','Funnel Attr','Funnel A (visitors)','Funnel B (impressions)','TTS GMV','AMZ Sales','Capped']
+        disp['Rate'] = (disp['Rate']*100).round(0).astype(int).astype(str)+'%'
+        disp['Capped'] = np.where(disp['Capped'],'YES','-')
+        if 'r_lo' in df:
+            ci = f"{CI_LEVEL:.0%}"
+            for col,lo,hi,f in [('r','r_lo','r_hi','{:.2f}'),('Corr Attr','corr_attr_lo','corr_attr_hi','${:,.0f}')]:
+                disp.insert(disp.columns.get_loc(col)+1, f'{col} {ci} CI',
+                            [f"{f.format(a)} to {f.format(b)}" if pd.notna(a) else "-" for a,b in zip(df[lo],df[hi])])
+        with span("table:attribution","render"):
+            st.dataframe(disp.sort_values('Corr Attr',ascending=False).style.format(
+                {'r':'{:.3f}','Corr Attr':'${:,.0f}','Funnel Attr':'${:,.0f}',
+                 'Funnel A (visitors)':'${:,.0f}','Funnel B (impressions)':'${:,.0f}',
+                 'TTS GMV':'${:,.0f}','AMZ Sales':'${:,.0f}'}),
+                use_container_width=True, height=550)
+
+        sec("Attribution Comparison")
+        cmp = df.loc[(df['corr_attr']>0)|(df['funnel_attr']>0),['corr_attr','funnel_attr']].sort_values('corr_attr',ascending=True)
+        with span("figure:attribution","render"):
+            fig = go.Figure()
+            fig.add_trace(go.Bar(y=cmp.index,x=cmp['corr_attr'],name='Correlation',orientation='h',marker=dict(color=GRN,opacity=.7)))
+            fig.add_trace(go.Bar(y=cmp.index,x=cmp['funnel_attr'],name='Funnel',orientation='h',marker=dict(color=PUR,opacity=.7)))
+            fig.update_layout(barmode='group')
+            fig.update_xaxes(tickprefix='$',tickformat=',.0s')
+            st.plotly_chart(pthem(fig,max(350,len(cmp)*30)),use_container_width=True)
 
 # TAB 2: FUNNEL MODEL
-with tabs[1]:
-    sec("Dual-Path Funnel Model")
-    st.markdown(f"""
+def funnel_tab():
+    with span("tab:Funnel Model","render"):
+        import plotly.graph_objects as go
+        sec("Dual-Path Funnel Model")
+        st.markdown(f"""
 **Path A — Non-Buying Visitors:**
 TTS Visitors who didn't buy x **{browse_rate:.0%}** go to Amazon x **{amz_conv:.0%}** convert x **${amz_aov}** AOV
 
 **Path B — Impression Recall:**
 Impression-only viewers (saw content, didn't click) x **{recall_rate:.2%}** later search Amazon x **{amz_conv:.0%}** convert x **${amz_aov}** AOV
 
-Adjust rates in the sidebar. Conservative defaults calibrated to match correlation model output.
-    """)
-
-    fu = df[['brand','impressions','visitors','jan_tts','path_a_vis','path_a','path_b_vis','path_b','total_amz_vis','funnel_attr']].copy()
-    fu.columns = ['Brand','Impressions','TTS Visitors','TTS GMV','Path A AMZ Vis','Path A Sales','Path B AMZ Vis','Path B Sales','Total AMZ Vis','Funnel Attributed']
-    st.dataframe(fu.sort_values('Funnel Attributed',ascending=False).style.format(
-        {'Impressions':'{:,.0f}','TTS Visitors':'{:,.0f}','TTS GMV':'${:,.0f}',
-         'Path A AMZ Vis':'{:,.0f}','Path A Sales':'${:,.0f}',
-         'Path B AMZ Vis':'{:,.0f}','Path B Sales':'${:,.0f}',
-         'Total AMZ Vis':'{:,.0f}','Funnel Attributed':'${:,.0f}'}),
-        use_container_width=True, height=550)
-
-    sec("Funnel Waterfall - Portfolio")
-    total_vis = df['visitors'].sum()
-    total_non_buy = total_vis - (ttts / amz_aov if amz_aov > 0 else 0)
-    total_view_only = timp - total_vis
-    total_a_vis = df['path_a_vis'].sum()
-    total_b_vis = df['path_b_vis'].sum()
-    total_amz_orders = t_funnel / amz_aov if amz_aov > 0 else 0
-
-    funnel_labels = ['TTS Impressions','TTS Visitors','Non-Buyers','Path A: AMZ Visits','Path B: AMZ Visits','Est. AMZ Orders','Est. AMZ Sales']
-    funnel_vals = [timp, total_vis, max(total_non_buy,0), total_a_vis, total_b_vis, total_amz_orders, t_funnel]
-    funnel_colors = [PUR,BLU,YEL,GRN,GRN,CORAL,CORAL]
-    fig = go.Figure(go.Bar(
-        y=funnel_labels[::-1], x=funnel_vals[::-1], orientation='h',
-        marker=dict(color=funnel_colors[::-1], opacity=.8),
-        text=[fn(v) if i < 5 else fd(v) for i, v in enumerate(funnel_vals[::-1])],
-        textposition='outside', textfont=dict(size=10, family='Inter', color=T1),
-    ))
-    st.plotly_chart(pthem(fig,400),use_container_width=True)
+Adjust rates in the sidebar. Conservative defaults calibrated to match correlation model output; the sidebar's *Calibrate to correlation model* fits them to the current data.
+        """)
+
+        fu = df[['impressions','visitors','jan_tts','path_a_vis','path_a','path_b_vis','path_b','total_amz_vis','funnel_attr']].rename_axis('Brand')
+        fu.columns = ['Impressions','TTS Visitors','TTS GMV','Path A AMZ Vis','Path A Sales','Path B AMZ Vis','Path B Sales','Total AMZ Vis','Funnel Attributed']
+        with span("table:funnel","render"):
+            st.dataframe(fu.sort_values('Funnel Attributed',ascending=False).style.format(
+                {'Impressions':'{:,.0f}','TTS Visitors':'{:,.0f}','TTS GMV':'${:,.0f}',
+                 'Path A AMZ Vis':'{:,.0f}','Path A Sales':'${:,.0f}',
+                 'Path B AMZ Vis':'{:,.0f}','Path B Sales':'${:,.0f}',
+                 'Total AMZ Vis':'{:,.0f}','Funnel Attributed':'${:,.0f}'}),
+                use_container_width=True, height=550)
+
+        sec("Funnel Waterfall - Portfolio")
+        total_vis = df['visitors'].sum()
+        total_non_buy = total_vis - (ttts / amz_aov if amz_aov > 0 else 0)
+        total_view_only = timp - total_vis
+        total_a_vis = df['path_a_vis'].sum()
+        total_b_vis = df['path_b_vis'].sum()
+        total_amz_orders = t_funnel / amz_aov if amz_aov > 0 else 0
+
+        funnel_labels = ['TTS Impressions','TTS Visitors','Non-Buyers','Path A: AMZ Visits','Path B: AMZ Visits','Est. AMZ Orders','Est. AMZ Sales']
+        funnel_vals = [timp, total_vis, max(total_non_buy,0), total_a_vis, total_b_vis, total_amz_orders, t_funnel]
+        funnel_colors = [PUR,BLU,YEL,GRN,GRN,CORAL,CORAL]
+        with span("figure:funnel","render"):
+            fig = go.Figure(go.Bar(
+                y=funnel_labels[::-1], x=funnel_vals[::-1], orientation='h',
+                marker=dict(color=funnel_colors[::-1], opacity=.8),
+                text=[fn(v) if i < 5 else fd(v) for i, v in enumerate(funnel_vals[::-1])],
+                textposition='outside', textfont=dict(size=10, family='Inter', color=T1),
+            ))
+            st.plotly_chart(pthem(fig,400),use_container_width=True)
 
 # TAB 3: CORRELATION
-with tabs[2]:
-    sec("Correlation Model - TTS vs Amazon Monthly (2025)")
-    if not gmv_data:
-        st.warning("Upload the **Monthly GMV CSV** to enable correlation analysis. It provides 2025 TTS history needed to correlate with Amazon sales.")
-    else:
-        st.caption("Red bars = TTS GMV | Blue area = AMZ total | Green dashed = AMZ organic")
-        cb = df[df['active_months']>=3].sort_values('r_best',ascending=False,key=abs)
-        if len(cb) == 0:
-            st.info("No brands with 3+ active TTS months found. Correlation requires at least 3 months of TTS data.")
-        for _,b in cb.iterrows():
-            conf_color = CC.get(b['confidence'],T3)
-            cl1,cl2 = st.columns([4,1])
-            with cl1: st.markdown(f"**{b['brand']}** {badge_h(b['confidence'])} r = {b['r_best']:.3f} ({b['r_type']})",unsafe_allow_html=True)
-            with cl2: st.markdown(f"<span style='font:700 12px Inter;color:{conf_color};'>{fd(b['corr_attr'])} attributed</span>",unsafe_allow_html=True)
-            fig = make_subplots(specs=[[{"secondary_y":True}]])
-            fig.add_trace(go.Scatter(x=MO,y=b['amz_2025'],name='AMZ',fill='tozeroy',fillcolor='rgba(77,166,255,.06)',line=dict(color=BLU,width=2),marker=dict(size=3)),secondary_y=False)
-            fig.add_trace(go.Scatter(x=MO,y=b['org_2025'],name='Organic',line=dict(color=GRN,width=1.5,dash='dash')),secondary_y=False)
-            fig.add_trace(go.Bar(x=MO,y=b['tts_2025'],name='TTS',marker=dict(color=CORAL,opacity=.75),width=.4),secondary_y=True)
-            fig.update_yaxes(tickprefix='$',tickformat=',.0s',secondary_y=False)
-            fig.update_yaxes(tickprefix='$',tickformat=',.0s',secondary_y=True)
-            st.plotly_chart(pthem(fig,220),use_container_width=True)
-            st.markdown("---")
+@st.fragment
+def correlation_tab():
+    with span("tab:Correlation","render"):
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+        sec(f"Correlation Model - TTS vs Amazon Monthly ({wl})")
+        if not gmv_data:
+            st.warning("Upload the **Monthly GMV CSV** to enable correlation analysis. It provides the TTS history needed to correlate with Amazon sales.")
+        else:
+            st.caption("Red bars = TTS GMV | Blue = AMZ total | Green dashed = AMZ organic")
+            # Page by brand name; only the page's rows are taken from the table
+            names = df.index[df['active_months'].to_numpy()>=3]
+            names = names[np.argsort(-np.abs(df.loc[names,'r_best'].to_numpy()),kind='stable')]
+            if len(names) == 0:
+                st.info("No brands with 3+ active TTS months found. Correlation requires at least 3 months of TTS data.")
+                return
+            pg0,pg1,pg2,pg3 = st.columns([1,1,1,2])
+            with pg0: layout = st.selectbox("Layout",["Grid","Per brand"],key="corr_layout",help="Grid draws every brand on the page in one WebGL figure; Per brand draws a full chart each")
+            with pg1: per_page = st.selectbox("Brands per page",[10,20,50,100,500] if layout=="Grid" else [10,20,50],key=f"corr_per_page_{layout}")
+            n_pages = max(1,-(-len(names)//per_page))
+            with pg2: page = st.number_input("Page",1,n_pages,1,key="corr_page")
+            page = min(int(page),n_pages)
+            with pg3: st.caption(f"{len(names)} brands | page {page} of {n_pages}")
+            names = names[(page-1)*per_page:page*per_page]
+            cb = df.loc[names]
+            if 'lag_profile' in res.matrices and len(cb):
+                from charts import lag_heatmap
+                sec(f"Lag Profile - r at lags 0 to {max_lag} months")
+                with span("figure:lag_profile","render",brands=len(cb)):
+                    st.plotly_chart(lag_heatmap(names.tolist(), res.series('lag_profile',names), cb['best_lag'].to_numpy()),use_container_width=True)
+            if layout == "Grid" and len(cb):
+                from charts import correlation_grid, correlation_titles
+                with span("figure:correlation_grid","render",brands=len(cb),page=page):
+                    # Rows of the cached brand × month matrices, in display order
+                    pos = res.rows(names)
+                    titles, colors = correlation_titles(cb)
+                    fig = correlation_grid(names.tolist(), res.matrices['tts_series'][pos], res.matrices['amz_series'][pos],
+                                           res.matrices['org_series'][pos], WM, titles, colors)
+                    st.plotly_chart(fig,use_container_width=True)
+            else:
+                with span("figures:correlation","render",brands=len(cb),page=page):
+                    for b in map(res.brand, names):
+                        conf_color = CC.get(b['confidence'],T3)
+                        cl1,cl2 = st.columns([4,1])
+                        with cl1: st.markdown(f"**{b['brand']}** {badge_h(b['confidence'])} r = {b['r_best']:.3f} ({b['r_type']})",unsafe_allow_html=True)
+                        with cl2: st.markdown(f"<span style='font:700 12px Inter;color:{conf_color};'>{fd(b['corr_attr'])} attributed</span>",unsafe_allow_html=True)
+                        fig = make_subplots(specs=[[{"secondary_y":True}]])
+                        fig.add_trace(go.Scatter(x=WM,y=b['amz_series'],name='AMZ',fill='tozeroy',fillcolor='rgba(77,166,255,.06)',line=dict(color=BLU,width=2),marker=dict(size=3)),secondary_y=False)
+                        fig.add_trace(go.Scatter(x=WM,y=b['org_series'],name='Organic',line=dict(color=GRN,width=1.5,dash='dash')),secondary_y=False)
+                        fig.add_trace(go.Bar(x=WM,y=b['tts_series'],name='TTS',marker=dict(color=CORAL,opacity=.75),width=.4),secondary_y=True)
+                        fig.update_yaxes(tickprefix='$',tickformat=',.0s',secondary_y=False)
+                        fig.update_yaxes(tickprefix='$',tickformat=',.0s',secondary_y=True)
+                        st.plotly_chart(pthem(fig,220),use_container_width=True)
+                        st.markdown("---")
 
 # TAB 4: CONTENT FUNNEL
-with tabs[3]:
-    sec(f"Content Funnel - {ml}")
-    if not broadway:
-        st.warning("Upload the **Broadway Tool** for content metrics.")
-    else:
-        fu2 = df[df['impressions']>0].copy()
-        fu2['visit_pct'] = np.where(fu2['impressions']>0,(fu2['visitors']/fu2['impressions']*100).round(2),0)
-        disp = fu2[['brand','impressions','visitors','visit_pct','videos','live_streams','creators','jan_tts']].copy()
-        disp.columns = ['Brand','Impressions','Visitors','Visit %','Videos','Lives','Creators','TTS GMV']
-        st.dataframe(disp.sort_values('Impressions',ascending=False).style.format(
-            {'Impressions':'{:,.0f}','Visitors':'{:,.0f}','Visit %':'{:.2f}%',
-             'Videos':'{:,.0f}','Lives':'{:,.0f}','TTS GMV':'${:,.0f}'}),
-            use_container_width=True, height=500)
+def content_tab():
+    with span("tab:Content Funnel","render"):
+        sec(f"Content Funnel - {ml}")
+        if not broadway:
+            st.warning("Upload the **Broadway Tool** for content metrics.")
+        else:
+            disp = df.loc[df['impressions']>0,['impressions','visitors','videos','live_streams','creators','jan_tts']].rename_axis('Brand')
+            disp.columns = ['Impressions','Visitors','Videos','Lives','Creators','TTS GMV']
+            disp.insert(2,'Visit %',(disp['Visitors']/disp['Impressions']*100).round(2))
+            with span("table:content","render"):
+                st.dataframe(disp.sort_values('Impressions',ascending=False).style.format(
+                    {'Impressions':'{:,.0f}','Visitors':'{:,.0f}','Visit %':'{:.2f}%',
+                     'Videos':'{:,.0f}','Lives':'{:,.0f}','TTS GMV':'${:,.0f}'}),
+                    use_container_width=True, height=500)
 
 # TAB 5: DEEP DIVE
-with tabs[4]:
-    sec("Brand Deep Dive")
-    brand_list_sorted = sorted(df['brand'].unique().tolist())
-    sel = st.selectbox("Select Brand", brand_list_sorted, key="deep_dive_brand_select")
-    if sel:
-        b = df[df['brand']==sel].iloc[0]
-        c1,c2 = st.columns([3,2])
-        with c1:
-            st.markdown(f"#### {sel} Monthly (2025)")
-            fig = go.Figure()
-            fig.add_trace(go.Bar(x=MO,y=b['tts_2025'],name='TTS GMV',marker=dict(color=CORAL,opacity=.75)))
-            fig.add_trace(go.Scatter(x=MO,y=b['amz_2025'],name='AMZ Sales',yaxis='y2',line=dict(color=BLU,width=2),marker=dict(size=3)))
-            fig.update_layout(yaxis2=dict(overlaying='y',side='right',gridcolor='rgba(0,0,0,0)',showline=False,tickprefix='$',tickformat=',.0s'))
-            fig.update_yaxes(tickprefix='$',tickformat=',.0s')
-            st.plotly_chart(pthem(fig,280),use_container_width=True)
-        with c2:
-            st.markdown(f"#### KPIs")
-            conf_color = CC.get(b['confidence'],T3)
-            mets = [
-                ("TTS GMV",fd(b['jan_tts']),T1),("AMZ Sales",fd(b['jan_amz']),BLU),
-                ("2025 TTS Total",fd(b['tts_total']),T1),("Active Mo.",str(b['active_months']),T1),
-                ("","",BD),
-                ("Correlation r",f"{b['r_best']:.3f}",conf_color),("Confidence",b['confidence'],conf_color),
-                ("Corr Rate",f"{b['corr_rate']*100:.0f}%",conf_color),
-                ("Corr Attributed",fd(b['corr_attr']),GRN),("Capped?","YES" if b['corr_capped'] else "NO",YEL if b['corr_capped'] else GRN),
-                ("","",BD),
-                ("Impressions",fn(b['impressions']),PUR),("Visitors",fn(b['visitors']),T1),
-                ("Funnel Path A",fd(b['path_a']),GRN),("Funnel Path B",fd(b['path_b']),GRN),
-                ("Funnel Attributed",fd(b['funnel_attr']),GRN),
-                ("Est. AMZ Visitors",fn(b['total_amz_vis']),BLU),
-            ]
-            for lb,vl,co in mets:
-                if not lb: st.markdown(f"<div style='border-top:1px solid {BD};margin:6px 0;'></div>",unsafe_allow_html=True);continue
-                st.markdown(f'<div style="display:flex;justify-content:space-between;padding:4px 0;border-bottom:1px solid {BD};font:400 12px \'Inter\',monospace;"><span style="color:{T2}">{lb}</span><span style="color:{co};font-weight:700">{vl}</span></div>',unsafe_allow_html=True)
-
-        st.markdown("#### Monthly Detail (2025)")
-        md = pd.DataFrame({'Month':MO,'TTS GMV':b['tts_2025'],'AMZ Sales':b['amz_2025'],'AMZ Organic':b['org_2025']})
-        md['Ad Sales'] = [a-o for a,o in zip(b['amz_2025'],b['org_2025'])]
-        st.dataframe(md.style.format({'TTS GMV':'${:,.0f}','AMZ Sales':'${:,.0f}','AMZ Organic':'${:,.0f}','Ad Sales':'${:,.0f}'}),use_container_width=True)
-
-        # ── PDF EXPORT ──
-        sec("Export Brand Report")
-        if st.button(f"📄 Download {sel} PDF Report", key="pdf_export_btn"):
-            from reportlab.lib.pagesizes import letter
-            from reportlab.lib.units import inch
-            from reportlab.lib.colors import HexColor, white, black
-            from reportlab.pdfgen import canvas as pdf_canvas
-            import matplotlib
-            matplotlib.use('Agg')
-            import matplotlib.pyplot as plt
-            from reportlab.lib.utils import ImageReader
-
-            pdf_buf = BytesIO()
-            c = pdf_canvas.Canvas(pdf_buf, pagesize=letter)
-            W, H = letter
-            margin = 50
-
-            # Colors
-            bg_color = HexColor('#0A0A0A')
-            surface = HexColor('#111111')
-            border = HexColor('#2A2A2A')
-            coral_pdf = HexColor('#FF6B35')
-            green_pdf = HexColor('#34D399')
-            blue_pdf = HexColor('#60A5FA')
-            purple_pdf = HexColor('#A78BFA')
-            text_w = white
-            text_g = HexColor('#9CA3AF')
-            conf_colors_pdf = {'HIGH':HexColor('#34D399'),'MED':HexColor('#FBBF24'),'LOW':HexColor('#FB923C'),'WEAK':HexColor('#EF4444'),'INSUF':HexColor('#4B5563')}
-
-            def draw_bg():
-                c.setFillColor(bg_color)
-                c.rect(0, 0, W, H, fill=1, stroke=0)
-
-            def chart_to_img(fig_func, cw=7, ch=2.5):
-                fig, ax = fig_func(cw, ch)
-                fig.patch.set_facecolor('#0A0A0A')
-                ax.set_facecolor('#0A0A0A')
-                ax.tick_params(colors='#9CA3AF', labelsize=7)
-                for spine in ax.spines.values(): spine.set_color('#2A2A2A')
-                buf2 = BytesIO()
-                fig.savefig(buf2, format='png', dpi=150, bbox_inches='tight', facecolor='#0A0A0A')
-                plt.close(fig)
-                buf2.seek(0)
-                return ImageReader(buf2)
-
-            # ═══ PAGE 1 ═══
-            draw_bg()
-            # Header bar
-            c.setFillColor(coral_pdf)
-            c.rect(0, H-60, W, 60, fill=1, stroke=0)
-            c.setFillColor(white)
-            c.setFont("Helvetica-Bold", 20)
-            c.drawString(margin, H-42, f"{sel} — TTS to Amazon Lift Report")
-            c.setFont("Helvetica", 10)
-            c.drawRightString(W-margin, H-42, f"{ml} | Pattern x NextWave")
-
-            # KPI boxes
-            y = H - 110
-            kpis_pdf = [
-                ("TTS GMV", fd(b['jan_tts'])),
-                ("AMZ Sales", fd(b['jan_amz'])),
-                ("Correlation r", f"{b['r_best']:.3f}"),
-                ("Confidence", b['confidence']),
-                ("Corr. Attributed", fd(b['corr_attr'])),
-                ("Funnel Attributed", fd(b['funnel_attr'])),
-            ]
-            box_w = (W - 2*margin - 5*12) / 6
-            for i, (label, value) in enumerate(kpis_pdf):
-                bx = margin + i*(box_w+12)
-                c.setFillColor(surface)
-                c.roundRect(bx, y, box_w, 55, 6, fill=1, stroke=0)
-                c.setFillColor(text_g)
-                c.setFont("Helvetica", 7)
-                c.drawString(bx+8, y+40, label.upper())
-                val_color = conf_colors_pdf.get(value, green_pdf) if label == "Confidence" else (green_pdf if label in ("Corr. Attributed","Funnel Attributed") else text_w)
-                c.setFillColor(val_color)
-                c.setFont("Helvetica-Bold", 14)
-                c.drawString(bx+8, y+12, str(value))
-
-            # Attribution detail
-            y -= 50
-            c.setFillColor(coral_pdf)
-            c.rect(margin, y, 3, 12, fill=1, stroke=0)
-            c.setFont("Helvetica-Bold", 9)
-            c.drawString(margin+10, y+2, "ATTRIBUTION DETAIL")
-
-            y -= 25
-            detail_rows = [
-                ("Correlation Rate", f"{b['corr_rate']*100:.0f}%"),
-                ("Corr. Type", b['r_type']),
-                ("GMV Cap Applied", "YES" if b['corr_capped'] else "NO"),
-                ("Active TTS Months", str(b['active_months'])),
-                ("2025 TTS Total", fd(b['tts_total'])),
-                ("Impressions", fn(b['impressions'])),
-                ("Visitors", fn(b['visitors'])),
-                ("Funnel Path A (visitors)", fd(b['path_a'])),
-                ("Funnel Path B (impressions)", fd(b['path_b'])),
-                ("Est. AMZ Visitors", fn(b['total_amz_vis'])),
-            ]
-            col1_rows = detail_rows[:5]
-            col2_rows = detail_rows[5:]
-            for ci, col_rows in enumerate([col1_rows, col2_rows]):
-                bx = margin + ci * ((W-2*margin)//2)
-                ry = y
-                for label, value in col_rows:
-                    c.setFillColor(text_g); c.setFont("Helvetica", 8)
-                    c.drawString(bx, ry, label)
-                    c.setFillColor(text_w); c.setFont("Helvetica-Bold", 8)
-                    c.drawString(bx+160, ry, str(value))
-                    ry -= 15
-
-            # TTS vs AMZ chart
-            def tts_amz_chart(cw, ch):
-                fig, ax = plt.subplots(figsize=(cw, ch))
-                x = np.arange(12)
-                ax.bar(x, b['tts_2025'], color='#FF6B35', alpha=0.75, label='TTS GMV', width=0.4)
-                ax2 = ax.twinx()
-                ax2.fill_between(x, b['amz_2025'], alpha=0.15, color='#60A5FA')
-                ax2.plot(x, b['amz_2025'], color='#60A5FA', linewidth=2, label='AMZ Sales')
-                ax2.plot(x, b['org_2025'], color='#34D399', linewidth=1.5, linestyle='--', label='AMZ Organic')
-                ax2.tick_params(colors='#9CA3AF', labelsize=7)
-                ax.set_xticks(x); ax.set_xticklabels(MO, fontsize=7)
-                ax.legend(loc='upper left', fontsize=6, facecolor='#0A0A0A', edgecolor='#2A2A2A', labelcolor='#9CA3AF')
-                ax2.legend(loc='upper right', fontsize=6, facecolor='#0A0A0A', edgecolor='#2A2A2A', labelcolor='#9CA3AF')
-                ax.set_title('TTS GMV vs Amazon Sales (2025)', color='white', fontsize=9, fontweight='bold', pad=8)
-                return fig, ax
-
-            img = chart_to_img(tts_amz_chart, 7, 2.5)
-            c.drawImage(img, 25, H-430, width=550, height=230, mask='auto')
-
-            # ═══ PAGE 2 ═══
-            c.showPage(); draw_bg()
-            c.setFillColor(coral_pdf); c.setFont("Helvetica-Bold", 8)
-            c.drawString(margin, H-35, "PATTERN x NEXTWAVE")
-            c.setFillColor(text_w); c.setFont("Helvetica-Bold", 16)
-            c.drawString(margin, H-55, f"{sel} — Monthly Detail")
-
-            # Monthly table
-            y = H-90
-            c.setFillColor(coral_pdf); c.rect(margin, y, 3, 12, fill=1, stroke=0)
-            c.setFont("Helvetica-Bold", 9)
-            c.drawString(margin+10, y+2, "MONTHLY DETAIL (2025)")
-
-            y -= 25
-            col_positions = [margin, margin+50, margin+140, margin+250, margin+360]
-            headers_t = ["Month", "TTS GMV", "AMZ Sales", "AMZ Organic", "Ad Sales"]
-            c.setFillColor(surface)
-            c.rect(margin-5, y-4, W-2*margin+10, 18, fill=1, stroke=0)
-            c.setFillColor(coral_pdf); c.setFont("Helvetica-Bold", 8)
-            for hi_idx, h in enumerate(headers_t):
-                c.drawString(col_positions[hi_idx], y, h)
-
-            y -= 18
-            for mi in range(12):
-                tts_v = b['tts_2025'][mi]
-                amz_v = b['amz_2025'][mi]
-                org_v = b['org_2025'][mi]
-                ad_v = amz_v - org_v
-                if mi % 2 == 0:
-                    c.setFillColor(HexColor('#0F0F0F'))
-                    c.rect(margin-5, y-4, W-2*margin+10, 16, fill=1, stroke=0)
-                c.setFillColor(text_g); c.setFont("Helvetica", 8)
-                c.drawString(col_positions[0], y, MO[mi])
-                c.setFillColor(text_w)
-                c.drawString(col_positions[1], y, fd(tts_v) if tts_v > 0 else "-")
-                c.drawString(col_positions[2], y, fd(amz_v) if amz_v > 0 else "-")
-                c.drawString(col_positions[3], y, fd(org_v) if org_v > 0 else "-")
-                c.drawString(col_positions[4], y, fd(ad_v) if ad_v != 0 else "-")
-                y -= 16
-
-            # Funnel summary
-            y -= 30
-            c.setFillColor(coral_pdf); c.rect(margin, y, 3, 12, fill=1, stroke=0)
-            c.setFont("Helvetica-Bold", 9)
-            c.drawString(margin+10, y+2, "FUNNEL MODEL SUMMARY")
-            y -= 20
-            funnel_rows = [
-                ("TTS Visitors", fn(b['visitors'])),
-                ("TTS Impressions", fn(b['impressions'])),
-                ("Path A — Non-buyer visitors → AMZ", fd(b['path_a'])),
-                ("Path B — Impression recall → AMZ", fd(b['path_b'])),
-                ("Total Funnel Attributed", fd(b['funnel_attr'])),
-                ("Est. Amazon Visitors from TTS", fn(b['total_amz_vis'])),
-            ]
-            for label, value in funnel_rows:
-                c.setFillColor(text_g); c.setFont("Helvetica", 8)
-                c.drawString(margin+10, y, label)
-                is_total = "Total" in label
-                c.setFillColor(green_pdf if is_total else text_w)
-                c.setFont("Helvetica-Bold", 9 if is_total else 8)
-                c.drawString(margin+250, y, value)
-                y -= 15
-
-            # Footer
-            c.setFillColor(text_g); c.setFont("Helvetica", 7)
-            c.drawString(margin, 30, f"Pattern x NextWave | TTS → Amazon Lift Model v5 | {ml} | Generated {datetime.now().strftime('%Y-%m-%d')}")
-            c.drawRightString(W-margin, 30, "Confidential — Internal Use Only")
-
-            c.save()
-            pdf_buf.seek(0)
-
-            st.download_button(
-                label=f"⬇️ Save {sel} Report PDF",
-                data=pdf_buf.getvalue(),
-                file_name=f"{sel.replace(' ','_')}_lift_report_{ml.replace(' ','_')}.pdf",
-                mime="application/pdf",
-                key="pdf_download_btn"
-            )
+@st.fragment
+def deep_dive_tab():
+    with span("tab:Deep Dive","render"):
+        import plotly.graph_objects as go
+        sec("Brand Deep Dive")
+        sel = st.selectbox("Select Brand", res.index, key="deep_dive_brand_select")
+        if sel:
+            b = res.brand(sel)
+            c1,c2 = st.columns([3,2])
+            with c1:
+                st.markdown(f"#### {sel} Monthly ({wl})")
+                with span("figure:deep_dive","render"):
+                    fig = go.Figure()
+                    fig.add_trace(go.Bar(x=WM,y=b['tts_series'],name='TTS GMV',marker=dict(color=CORAL,opacity=.75)))
+                    fig.add_trace(go.Scatter(x=WM,y=b['amz_series'],name='AMZ Sales',yaxis='y2',line=dict(color=BLU,width=2),marker=dict(size=3)))
+                    fig.update_layout(yaxis2=dict(overlaying='y',side='right',gridcolor='rgba(0,0,0,0)',showline=False,tickprefix='$',tickformat=',.0s'))
+                    fig.update_yaxes(tickprefix='$',tickformat=',.0s')
+                    st.plotly_chart(pthem(fig,280),use_container_width=True)
+            with c2:
+                st.markdown(f"#### KPIs")
+                conf_color = CC.get(b['confidence'],T3)
+                mets = [
+                    ("TTS GMV",fd(b['jan_tts']),T1),("AMZ Sales",fd(b['jan_amz']),BLU),
+                    ("Window TTS Total",fd(b['tts_total']),T1),("Active Mo.",str(b['active_months']),T1),
+                    ("","",BD),
+                    ("Correlation r",f"{b['r_best']:.3f}",conf_color),("Confidence",b['confidence'],conf_color),
+                    ("Corr Rate",f"{b['corr_rate']*100:.0f}%",conf_color),
+                    ("Corr Attributed",fd(b['corr_attr']),GRN),("Capped?","YES" if b['corr_capped'] else "NO",YEL if b['corr_capped'] else GRN),
+                ]
+                if 'r_lo' in b and pd.notna(b['r_lo']):
+                    mets += [(f"r {CI_LEVEL:.0%} CI",f"{b['r_lo']:.2f} to {b['r_hi']:.2f}",conf_color),
+                             (f"Corr Attr {CI_LEVEL:.0%} CI",f"{fd(b['corr_attr_lo'])} to {fd(b['corr_attr_hi'])}",GRN)]
+                mets += [
+                    ("","",BD),
+                    ("Impressions",fn(b['impressions']),PUR),("Visitors",fn(b['visitors']),T1),
+                    ("Funnel Path A",fd(b['path_a']),GRN),("Funnel Path B",fd(b['path_b']),GRN),
+                    ("Funnel Attributed",fd(b['funnel_attr']),GRN),
+                    ("Est. AMZ Visitors",fn(b['total_amz_vis']),BLU),
+                ]
+                for lb,vl,co in mets:
+                    if not lb: st.markdown(f"<div style='border-top:1px solid {BD};margin:6px 0;'></div>",unsafe_allow_html=True);continue
+                    st.markdown(f'<div style="display:flex;justify-content:space-between;padding:4px 0;border-bottom:1px solid {BD};font:400 12px \'Inter\',monospace;"><span style="color:{T2}">{lb}</span><span style="color:{co};font-weight:700">{vl}</span></div>',unsafe_allow_html=True)
+
+            st.markdown(f"#### Monthly Detail ({wl})")
+            md = pd.DataFrame({'Month':WM,'TTS GMV':b['tts_series'],'AMZ Sales':b['amz_series'],'AMZ Organic':b['org_series']})
+            md['Ad Sales'] = [a-o for a,o in zip(b['amz_series'],b['org_series'])]
+            with span("table:deep_dive","render"):
+                st.dataframe(md.style.format({'TTS GMV':'${:,.0f}','AMZ Sales':'${:,.0f}','AMZ Organic':'${:,.0f}','Ad Sales':'${:,.0f}'}),use_container_width=True)
+
+            # ── PDF EXPORT ──
+            sec("Export Brand Report")
+            if st.button(f"📄 Download {sel} PDF Report", key="pdf_export_btn"):
+                from reports import brand_report, report_filename
+                with span("pdf:brand_report","render"):
+                    pdf = brand_report(b, WM, wl, ml)
+                st.download_button(
+                    label=f"⬇️ Save {sel} Report PDF",
+                    data=pdf,
+                    file_name=report_filename(sel, ml),
+                    mime="application/pdf",
+                    key="pdf_download_btn"
+                )
+
+# TAB 6: SENSITIVITY
+# Sidebar parameters: label, slider range in display units, display → model scale
+SENS = {"cap_mult":("GMV Cap Multiplier",2,8,1),"browse_rate":("Browse %",5,40,100),
+        "recall_rate":("Recall per 1000",1,10,1000),"amz_conv":("Amazon Conv %",5,20,100),
+        "amz_aov":("Amazon AOV ($)",15,75,1)}
+
+@st.fragment
+def sensitivity_tab():
+    with span("tab:Sensitivity","render"):
+        from charts import sweep_heatmap, tornado_chart
+        sec(f"Parameter Sensitivity - {ml}")
+        st.caption("Portfolio attributed sales across the sidebar's parameter ranges, with the other parameters at their current values")
+        current = dict(cap_mult=cap_mult,browse_rate=browse_rate,recall_rate=recall_rate,amz_conv=amz_conv,amz_aov=amz_aov)
+        names = list(SENS)
+        c1,c2,c3 = st.columns(3)
+        with c1: xp = st.selectbox("X parameter", names, index=1, format_func=lambda p: SENS[p][0], key="sens_x")
+        with c2: yp = st.selectbox("Y parameter", [p for p in names if p != xp], format_func=lambda p: SENS[p][0], key="sens_y")
+        with c3: metric = st.selectbox("Metric", ["funnel_attr","corr_attr"], key="sens_metric",
+                                       format_func={"funnel_attr":"Funnel Attributed","corr_attr":"Corr Attributed"}.get)
+        axes = {p: np.linspace(SENS[p][1], SENS[p][2], 41) for p in (xp, yp)}
+        with span("sensitivity:sweep","model",combos=41*41,brands=len(arrays["brand"])):
+            swept = sweep(arrays, {yp: axes[yp]/SENS[yp][3], xp: axes[xp]/SENS[xp][3]},
+                        **{p: v for p, v in current.items() if p not in (xp, yp)})
+            rows, base = tornado(arrays, {p: (SENS[p][1]/SENS[p][3], SENS[p][2]/SENS[p][3]) for p in names}, current, metric)
+        with span("figure:sensitivity","render"):
+            st.plotly_chart(sweep_heatmap(axes[xp], axes[yp], swept[metric], SENS[xp][0], SENS[yp][0],
+                                          marker=(current[xp]*SENS[xp][3], current[yp]*SENS[yp][3])),
+                            use_container_width=True)
+            st.markdown(f"#### One at a Time (base {fd(base)})")
+            st.caption("Each bar moves one parameter to the low / high end of its slider range")
+            st.plotly_chart(tornado_chart(rows, base, {p: SENS[p][0] for p in names}), use_container_width=True)
+
+{"Attribution":attribution_tab,"Funnel Model":funnel_tab,"Correlation":correlation_tab,
+ "Content Funnel":content_tab,"Deep Dive":deep_dive_tab,"Sensitivity":sensitivity_tab}[view]()
 
 # ═══════════════ EXPORT ═══════════════
 st.markdown("---"); sec("Export")
-ec = df[['brand','ps','jan_tts','tts_total','jan_amz','active_months','r_best','confidence','corr_rate','corr_attr','corr_capped','impressions','visitors','funnel_attr','path_a','path_b']].copy()
-ec.columns = ['Brand','Type',f'TTS GMV ({ml})','2025 TTS Total','AMZ Sales','Active Mo.','r','Confidence','Corr Rate','Corr Attributed','Capped','Impressions','Visitors','Funnel Attributed','Funnel Path A','Funnel Path B']
+ec = df[['ps','jan_tts','tts_total','jan_amz','active_months','r_best','confidence','corr_rate','corr_attr','corr_capped','impressions','visitors','funnel_attr','path_a','path_b']].reset_index()
+ec.columns = ['Brand','Type',f'TTS GMV ({ml})',f'TTS Total ({wl})','AMZ Sales','Active Mo.','r','Confidence','Corr Rate','Corr Attributed','Capped','Impressions','Visitors','Funnel Attributed','Funnel Path A','Funnel Path B']
+if 'lag_profile' in res.matrices:
+    pos = ec.columns.get_loc('r')+1
+    profiles = res.series('lag_profile', df.index)
+    for k in reversed(range(max_lag+1)):
+        ec.insert(pos, f'r Lag {k}', profiles[:,k])
+    ec.insert(pos, 'Best Lag', df['best_lag'].to_numpy())
+if 'r_lo' in df:
+    ci = f"{CI_LEVEL:.0%}"
+    for col,lo,hi in [('r','r_lo','r_hi'),('Corr Attributed','corr_attr_lo','corr_attr_hi')]:
+        pos = ec.columns.get_loc(col)+1
+        ec.insert(pos, f'{col} {ci} CI High', df[hi].to_numpy()); ec.insert(pos, f'{col} {ci} CI Low', df[lo].to_numpy())
 csv_out = ec.to_csv(index=False)
 st.download_button("Download Attribution Summary (CSV)",csv_out,"tts_lift_attribution.csv","text/csv")
+
+# All brand PDFs: rendered in a process pool on a background thread; the
+# fragment polls the job once a second while it runs
+# Every input behind res.records(): a change discards a finished export
+pdf_job_key = (file_keys, latest, window_months, max_lag, show_ci, cap_mult, browse_rate, recall_rate, amz_conv, amz_aov)
+def bulk_pdf_export():
+    job = st.session_state.get('bulk_pdf')
+    if job is not None and job['key'] != pdf_job_key and not job['export'].running:
+        job = st.session_state['bulk_pdf'] = None
+    if job is None:
+        if st.button(f"📄 Generate PDF Reports for All {len(df)} Brands", key="bulk_pdf_btn"):
+            from reports import BulkExport
+            st.session_state['bulk_pdf'] = {'key': pdf_job_key, 'export': BulkExport(res.records(), WM, wl, ml)}
+            st.rerun()
+        return
+    export = job['export']
+    if export.running:
+        st.progress(export.done/export.total if export.total else 1.0, text=f"Rendering brand PDFs: {export.done} of {export.total}")
+        if st.button("Cancel", key="bulk_pdf_cancel"):
+            export.cancel()
+    elif not job.get('shown'):
+        # Finished since the last full run: rerun once so polling stops
+        job['shown'] = True
+        st.rerun()
+    elif export.error is not None:
+        st.error(f"PDF export failed: {export.error}")
+        if st.button("Dismiss", key="bulk_pdf_dismiss"):
+            st.session_state['bulk_pdf'] = None; st.rerun(scope="fragment")
+    else:
+        st.download_button(f"⬇️ Download {export.done} Brand Reports (ZIP)", export.data,
+                           f"tts_lift_reports_{ml.replace(' ','_')}.zip", "application/zip", key="bulk_pdf_download")
+pdf_job = st.session_state.get('bulk_pdf')
+st.fragment(run_every=1.0 if pdf_job is not None and not pdf_job.get('shown') else None)(bulk_pdf_export)()
 st.caption(f"Pattern x NextWave | TTS → Amazon Lift Model v5 | {ml} | {len(df)} brands")
+
+# ═══════════════ DIAGNOSTICS PANEL ═══════════════
+if diag is not None:
+    import json
+    with st.sidebar, st.expander("Diagnostics", expanded=False):
+        st.caption("Spans for this run (cached stages show only the cache lookup)")
+        st.dataframe(pd.DataFrame(diag.summary()), use_container_width=True, hide_index=True)
+        for s in diag.spans:
+            if s['name'] == 'aggregate_sources' and 'resolver' in s['args']:
+                r = s['args']['resolver']
+                st.caption(f"Brand resolver: {r['hits']:,} hits, {r['misses']:,} misses, {r['currsize']:,} names cached")
+        st.download_button("Download trace (.json)", json.dumps(diag.chrome_trace()), "tts_lift_trace.json",
+                           "application/json", help="Open in chrome://tracing, ui.perfetto.dev or speedscope")
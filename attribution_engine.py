@@ -0,0 +1,887 @@
+"""
+attribution_engine.py — Columnar Correlation & Funnel Engine
+
+Brand-level attribution math for the dashboard, done on brand×month NumPy
+matrices instead of a per-brand Python loop. The monthly aggregates built
+by the parsers are pivoted once; every correlation variant, tier, cap and
+funnel path is then computed for all brands in a single batched pass.
+
+No Streamlit imports here, so benchmarks and batch jobs can use it directly.
+"""
+
+import numpy as np
+
+from diagnostics import span
+from time_axis import DEFAULT_WINDOW_MONTHS, TimeAxis, month_at, month_index, resolve_window
+
+# ── Model Constants ───────────────────────────────────────────────────────────
+
+# (min |r|, confidence, attribution rate) — checked top to bottom
+CONF_TIERS = [
+    (0.8, "HIGH", 0.17),
+    (0.5, "MED", 0.12),
+    (0.3, "LOW", 0.06),
+]
+WEAK_RATE = 0.02
+INSUF_RATE = 0.03
+MIN_ACTIVE_MONTHS = 3
+
+# Bootstrap intervals for r and corr_attr (off unless n_resamples > 0)
+DEFAULT_RESAMPLES = 2000
+CI_LEVEL = 0.90
+
+# Order matters: ties on |r| keep the earliest variant, as max() did
+R_TYPES = ["same", "org-same", "lag+1", "org-lag"]
+# Lag scan: lags past 1 add (TTS vs AMZ, TTS vs organic) variants after
+# R_TYPES, and are only candidates with this many overlapping months
+DEFAULT_MAX_LAG = 1
+MIN_LAG_OVERLAP = 3
+
+
+def r_types(max_lag: int = DEFAULT_MAX_LAG) -> list:
+    """Variant names for a lag scan over 0..max_lag months (R_TYPES for max_lag <= 1)."""
+    return R_TYPES + [t for k in range(2, max_lag + 1) for t in (f"lag+{k}", f"org-lag+{k}")]
+
+
+def variant_lags(max_lag: int = DEFAULT_MAX_LAG) -> np.ndarray:
+    """Lag in months of each variant in r_types(max_lag) order."""
+    return np.array([0, 0, 1, 1] + [k for k in range(2, max_lag + 1) for _ in range(2)])
+
+
+# ── Pivoting ──────────────────────────────────────────────────────────────────
+
+def pivot_monthly(monthly: dict, brands: list, months: list, field: str | None = None) -> np.ndarray:
+    """
+    Pivot a {brand: {(year, month): value}} mapping into a brand×month matrix.
+
+    `field` picks a key out of dict-valued cells (e.g. 'sales' from the
+    Amazon aggregates). Missing brands/months are 0.
+    """
+    out = np.zeros((len(brands), len(months)), dtype=float)
+    col = {k: j for j, k in enumerate(months)}
+    for i, brand in enumerate(brands):
+        series = monthly.get(brand)
+        if not series:
+            continue
+        for key, val in series.items():
+            j = col.get(key)
+            if j is None:
+                continue
+            out[i, j] = val[field] if field is not None else val
+    return out
+
+
+def group_monthly(brands: list, year: np.ndarray, month: np.ndarray, values: dict) -> tuple[list, dict, np.ndarray]:
+    """
+    Sum value columns per (brand, (year, month)) for column-oriented rows.
+
+    Rows whose brand is None are dropped. Returns (groups, sums, inverse):
+    the (brand, (year, month)) of each group, {field: per-group sums} and
+    each row's group index (-1 for dropped rows). Sums accumulate in row
+    order, so they equal a running `+=` over the same rows.
+    """
+    names = {}
+    code = np.fromiter((names.setdefault(b, len(names)) if b is not None else -1 for b in brands),
+                       dtype=np.int64, count=len(brands))
+    keep = code >= 0
+    inverse = np.full(len(brands), -1, dtype=np.int64)
+    if not keep.any():
+        return [], {f: np.zeros(0) for f in values}, inverse
+    keys = np.stack([code, np.asarray(year), np.asarray(month)], axis=1)[keep]
+    uniq, inv = np.unique(keys, axis=0, return_inverse=True)
+    inv = inv.ravel()
+    inverse[keep] = inv
+    labels = list(names)
+    groups = [(labels[c], (y, m)) for c, y, m in uniq.tolist()]
+    sums = {f: np.bincount(inv, weights=np.asarray(v, dtype=float)[keep], minlength=len(uniq))
+            for f, v in values.items()}
+    return groups, sums, inverse
+
+
+# ── Correlation ───────────────────────────────────────────────────────────────
+
+def batched_pearson(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Row-wise Pearson r for two (n_brands, n_months) matrices.
+
+    Mirrors the arithmetic of scipy.stats.pearsonr so results agree with
+    the per-brand calls it replaces. Rows where either input is constant
+    are NaN.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    xm = x - x.mean(axis=-1, keepdims=True)
+    ym = y - y.mean(axis=-1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        xmax = np.max(np.abs(xm), axis=-1, keepdims=True)
+        ymax = np.max(np.abs(ym), axis=-1, keepdims=True)
+        normxm = xmax * np.linalg.norm(xm / xmax, axis=-1, keepdims=True)
+        normym = ymax * np.linalg.norm(ym / ymax, axis=-1, keepdims=True)
+        r = np.sum(xm / normxm * ym / normym, axis=-1)
+    r = np.clip(r, -1.0, 1.0)
+    const = np.all(x == x[..., :1], axis=-1) | np.all(y == y[..., :1], axis=-1)
+    r[const] = np.nan
+    return r
+
+
+def variant_pairs(tts: np.ndarray, amz: np.ndarray, org: np.ndarray,
+                  max_lag: int = DEFAULT_MAX_LAG) -> list[tuple]:
+    """(x, y) matrices for each correlation variant, in r_types(max_lag) order."""
+    m = tts.shape[1]
+    return [
+        (tts, amz),
+        (tts, org),
+        (tts[:, :-1], amz[:, 1:]),
+        (tts[:, :-1], org[:, 1:]),
+    ] + [(tts[:, :m - k], y[:, k:]) for k in range(2, max_lag + 1) for y in (amz, org)]
+
+
+def pair_correlations(tts: np.ndarray, amz: np.ndarray, org: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    r for each correlation variant (see R_TYPES) and every brand.
+
+    Variants: TTS vs AMZ, TTS vs AMZ organic, and the same two with AMZ
+    lagged one month. Returns (r, ok), both shaped (len(R_TYPES), n_brands);
+    a variant is only a candidate (ok) when both of its series vary.
+    """
+    pairs = variant_pairs(tts, amz, org)
+    ok = pairs_vary(pairs)
+    r = np.full(ok.shape, np.nan)
+    for k, (x, y) in enumerate(pairs):
+        if ok[k].any():
+            r[k, ok[k]] = batched_pearson(x[ok[k]], y[ok[k]])
+    return r, ok
+
+
+def pairs_vary(pairs: list[tuple]) -> np.ndarray:
+    """
+    (len(pairs), n_brands) mask of the variants whose x and y both vary
+    (std > 0), the one rule for which variants are candidates.
+    """
+    n = pairs[0][0].shape[0]
+    ok = np.zeros((len(pairs), n), dtype=bool)
+    for k, (x, y) in enumerate(pairs):
+        ok[k] = (np.std(x, axis=1) > 0) & (np.std(y, axis=1) > 0)
+    return ok
+
+
+def lag_correlations(x: np.ndarray, y: np.ndarray, max_lag: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Row-wise Pearson r of x[t] vs y[t + k] for every lag k in 0..max_lag.
+
+    The lagged cross products for all lags come from one FFT
+    cross-correlation per row and the per-lag sums from prefix sums, so
+    the whole scan costs O(months log months) per brand whatever max_lag
+    is. Returns (r, ok) shaped (rows, max_lag + 1); ok is False where
+    fewer than MIN_LAG_OVERLAP months overlap or either overlapping
+    series is constant (up to rounding).
+    """
+    rows, m = x.shape
+    lags = np.arange(max_lag + 1)
+    c = np.maximum(m - lags, 0).astype(float)
+    # Pearson is shift invariant; centering keeps the sums small
+    x = x - x.mean(axis=1, keepdims=True)
+    y = y - y.mean(axis=1, keepdims=True)
+
+    size = 1 << int(2 * m - 1).bit_length()
+    sxy = np.fft.irfft(np.conj(np.fft.rfft(x, size)) * np.fft.rfft(y, size), size)
+    sxy = np.concatenate([sxy, np.zeros((rows, max(0, max_lag + 1 - size)))], axis=1)[:, :max_lag + 1]
+
+    def prefix(a):
+        p = np.zeros((rows, m + 1))
+        np.cumsum(a, axis=1, out=p[:, 1:])
+        return p
+
+    px, pxx, py, pyy = prefix(x), prefix(x * x), prefix(y), prefix(y * y)
+    head = np.clip(m - lags, 0, m)                 # x[:m - k]
+    tail = np.clip(lags, 0, m)                     # y[k:]
+    sx, sxx = px[:, head], pxx[:, head]
+    sy, syy = py[:, -1:] - py[:, tail], pyy[:, -1:] - pyy[:, tail]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vx = sxx - sx * sx / c
+        vy = syy - sy * sy / c
+        cov = sxy - sx * sy / c
+        ok = (c >= MIN_LAG_OVERLAP) & (vx > 1e-9 * sxx) & (vy > 1e-9 * syy)
+        r = np.clip(cov / np.sqrt(vx * vy), -1.0, 1.0)
+    r[~ok] = np.nan
+    return r, ok
+
+
+def scan_lags(tts: np.ndarray, amz: np.ndarray, org: np.ndarray, r_pairs: np.ndarray,
+              ok_pairs: np.ndarray, max_lag: int) -> tuple[np.ndarray, np.ndarray, dict]:
+    """
+    Extend pair_correlations output (R_TYPES variants) with lags 2..max_lag.
+
+    Returns (r, ok) over r_types(max_lag) and the per-brand lag profiles:
+    {'amz': r of TTS vs AMZ at lags 0..max_lag, 'org': the same vs
+    organic}. Lags 0 and 1 keep the exact values of r_pairs.
+    """
+    r_amz, ok_amz = lag_correlations(tts, amz, max_lag)
+    r_org, ok_org = lag_correlations(tts, org, max_lag)
+    for lag, (k_amz, k_org) in enumerate([(0, 1), (2, 3)][:max_lag + 1]):
+        r_amz[:, lag], ok_amz[:, lag] = np.where(ok_pairs[k_amz], r_pairs[k_amz], np.nan), ok_pairs[k_amz]
+        r_org[:, lag], ok_org[:, lag] = np.where(ok_pairs[k_org], r_pairs[k_org], np.nan), ok_pairs[k_org]
+    # Interleave (AMZ, organic) per lag after the R_TYPES rows
+    extra_r = np.stack([r_amz[:, 2:], r_org[:, 2:]], axis=2).reshape(len(tts), -1).T
+    extra_ok = np.stack([ok_amz[:, 2:], ok_org[:, 2:]], axis=2).reshape(len(tts), -1).T
+    return (np.concatenate([r_pairs, extra_r]), np.concatenate([ok_pairs, extra_ok]),
+            {"amz": r_amz, "org": r_org})
+
+
+def rolling_pearson(x: np.ndarray, y: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson r of x vs y over every n-column window, row-wise.
+
+    Window sums come from prefix sums, so scanning all end positions costs
+    one pass rather than one correlation per window. Returns (r, ok) shaped
+    (rows, cols - n + 1); column j is the window ending at column j + n - 1.
+    ok is False where either series is constant over the window (detected
+    exactly, by counting value changes).
+    """
+    rows, cols = x.shape
+    if cols < n or n < 2:
+        return np.full((rows, max(cols - n + 1, 0)), np.nan), np.zeros((rows, max(cols - n + 1, 0)), dtype=bool)
+    # Pearson is shift invariant; centering keeps the prefix sums small
+    xc = x - x.mean(axis=1, keepdims=True)
+    yc = y - y.mean(axis=1, keepdims=True)
+
+    def window_sum(a):
+        c = np.zeros((rows, cols + 1))
+        np.cumsum(a, axis=1, out=c[:, 1:])
+        return c[:, n:] - c[:, :-n]
+
+    sx, sy = window_sum(xc), window_sum(yc)
+    vx = window_sum(xc * xc) - sx * sx / n
+    vy = window_sum(yc * yc) - sy * sy / n
+    cov = window_sum(xc * yc) - sx * sy / n
+
+    def varies(a):
+        # changes between neighbours inside each window
+        ch = np.zeros((rows, cols))
+        ch[:, 1:] = a[:, 1:] != a[:, :-1]
+        c = np.cumsum(ch, axis=1)
+        return (c[:, n - 1:] - c[:, :cols - n + 1]) > 0
+
+    ok = varies(x) & varies(y)
+    r = np.full(ok.shape, np.nan)
+    r[ok] = np.clip(cov[ok] / np.sqrt(vx[ok] * vy[ok]), -1.0, 1.0)
+    return r, ok
+
+
+def rolling_pair_correlations(tts: np.ndarray, amz: np.ndarray, org: np.ndarray,
+                              n: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    pair_correlations for every trailing n-month window on a month axis.
+
+    Inputs are brand × month matrices over a contiguous axis (see
+    time_axis.TimeAxis). Returns (r, ok) shaped (len(R_TYPES), n_brands,
+    n_months); column t holds the window ending at month t, and columns
+    before the first full window are NaN / False.
+    """
+    b, t = tts.shape
+    r = np.full((len(R_TYPES), b, t), np.nan)
+    ok = np.zeros((len(R_TYPES), b, t), dtype=bool)
+    if t < n:
+        return r, ok
+    for k, (x, y, w) in enumerate([
+        (tts, amz, n),
+        (tts, org, n),
+        (tts[:, :-1], amz[:, 1:], n - 1),
+        (tts[:, :-1], org[:, 1:], n - 1),
+    ]):
+        rk, okk = rolling_pearson(x, y, w)
+        r[k, :, n - 1:] = rk
+        ok[k, :, n - 1:] = okk
+    return r, ok
+
+
+def select_best(r: np.ndarray, ok: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Keep the strongest candidate variant per brand by |r|.
+
+    Returns (r_best, r_type_index); brands with no candidate get r_best = 0
+    and index 0.
+    """
+    n = r.shape[1]
+    r_best = np.zeros(n)
+    r_idx = np.zeros(n, dtype=int)
+    best_abs = np.full(n, -np.inf)
+    seen = np.zeros(n, dtype=bool)
+    for k in range(r.shape[0]):
+        a = np.abs(r[k])
+        # First candidate seeds the max; later ones replace it only when
+        # strictly larger (NaN never wins a comparison)
+        take = ok[k] & (~seen | (a > best_abs))
+        r_best[take] = r[k, take]
+        r_idx[take] = k
+        best_abs[take] = a[take]
+        seen |= ok[k]
+    return r_best, r_idx
+
+
+def best_correlation(tts: np.ndarray, amz: np.ndarray, org: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """All four correlation variants for every brand, keeping the strongest by |r|."""
+    return select_best(*pair_correlations(tts, amz, org))
+
+
+def assign_confidence(r_best: np.ndarray, active: np.ndarray, has_amz: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Map r to confidence tier and attribution rate.
+
+    Returns (confidence, rate, scored) where `scored` marks brands with
+    enough TTS history and Amazon sales to be tiered on r at all.
+    """
+    scored = (active >= MIN_ACTIVE_MONTHS) & has_amz
+    a = np.abs(r_best)
+    conds = [scored & (a >= t) for t, _, _ in CONF_TIERS]
+    conds.append(active < MIN_ACTIVE_MONTHS)
+    conf = np.select(conds, [c for _, c, _ in CONF_TIERS] + ["INSUF"], default="WEAK").astype(object)
+    rate = np.select(conds, [r for _, _, r in CONF_TIERS] + [INSUF_RATE], default=WEAK_RATE)
+    return conf, rate, scored
+
+
+def tier_rate(abs_r: np.ndarray) -> np.ndarray:
+    """Attribution rate of a scored brand with correlation strength |r|."""
+    a = np.nan_to_num(abs_r)
+    return np.select([a >= t for t, _, _ in CONF_TIERS], [r for _, _, r in CONF_TIERS], default=WEAK_RATE)
+
+
+def apply_cap(amz: np.ndarray, tts: np.ndarray, rate: np.ndarray, cap_mult: float, eligible: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Attributed = min(AMZ × rate, TTS × cap_mult) where eligible, else 0."""
+    eligible = eligible & (tts > 0) & (amz > 0)
+    uc = amz * rate
+    cp = tts * cap_mult
+    attr = np.where(eligible, np.minimum(uc, cp), 0.0)
+    capped = eligible & (uc > cp)
+    return attr, capped
+
+
+# ── Uncertainty ───────────────────────────────────────────────────────────────
+
+def resample_weights(n_points: int, n_resamples: int, seed: int = 0) -> np.ndarray:
+    """
+    Bootstrap resamples of n_points as multinomial counts, shaped
+    (n_resamples, n_points): row b says how often each point was drawn.
+    """
+    rng = np.random.default_rng(seed)
+    return rng.multinomial(n_points, np.full(n_points, 1 / n_points), size=n_resamples).astype(float)
+
+
+def weighted_pearson(x: np.ndarray, y: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """
+    Row-wise Pearson r of x vs y under each row of weights `w`, shaped
+    (n_brands, n_resamples). With bootstrap counts as weights this is r of
+    every resample, and all of them come out of five matrix products
+    instead of a gather per resample. NaN where a resample leaves either
+    series constant.
+    """
+    # Pearson is shift invariant; centering keeps the weighted sums small
+    x = x - x.mean(axis=1, keepdims=True)
+    y = y - y.mean(axis=1, keepdims=True)
+    wt = w.T
+    n = w.sum(axis=1)
+    sx, sy = x @ wt, y @ wt
+    sxx, syy = (x * x) @ wt, (y * y) @ wt
+    vx = sxx - sx * sx / n
+    vy = syy - sy * sy / n
+    cov = (x * y) @ wt - sx * sy / n
+    # A constant resample leaves only rounding error in the variance
+    ok = (vx > 1e-9 * sxx) & (vy > 1e-9 * syy)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = np.clip(cov / np.sqrt(vx * vy), -1.0, 1.0)
+    r[~ok] = np.nan
+    return r
+
+
+def bootstrap_intervals(tts: np.ndarray, amz: np.ndarray, org: np.ndarray, r_idx: np.ndarray,
+                        scored: np.ndarray, n_resamples: int = DEFAULT_RESAMPLES,
+                        level: float = CI_LEVEL, seed: int = 0, chunk: int = 512,
+                        max_lag: int = DEFAULT_MAX_LAG) -> dict:
+    """
+    Percentile bootstrap intervals for each brand's selected correlation
+    variant (r_idx into r_types(max_lag), see select_best), resampling
+    months with replacement.
+
+    Returns {'r_lo', 'r_hi'} (interval for r) and {'abs_r_lo', 'abs_r_hi'}
+    (interval for |r|, which sets the tier); NaN for unscored brands. A
+    resample that leaves a series constant counts as r = 0, as an
+    unscorable variant does in the model. Every brand shares the same
+    resamples (per variant length), and brands go through in chunks of
+    `chunk` rows to bound memory.
+    """
+    n = tts.shape[0]
+    out = {k: np.full(n, np.nan) for k in ("r_lo", "r_hi", "abs_r_lo", "abs_r_hi")}
+    q = [(1 - level) / 2, (1 + level) / 2]
+    weights = {}
+    for k, (x, y) in enumerate(variant_pairs(tts, amz, org, max_lag)):
+        rows = np.flatnonzero(scored & (r_idx == k))
+        m = x.shape[1]
+        if not len(rows) or m < 2:
+            continue
+        if m not in weights:
+            weights[m] = resample_weights(m, n_resamples, seed + m)
+        for start in range(0, len(rows), chunk):
+            sel = rows[start:start + chunk]
+            r = np.nan_to_num(weighted_pearson(x[sel], y[sel], weights[m]), nan=0.0)
+            out["r_lo"][sel], out["r_hi"][sel] = np.quantile(r, q, axis=1)
+            out["abs_r_lo"][sel], out["abs_r_hi"][sel] = np.quantile(np.abs(r), q, axis=1)
+    return out
+
+
+# ── Funnel ────────────────────────────────────────────────────────────────────
+
+def dual_path_funnel(vis: np.ndarray, imp: np.ndarray, tts: np.ndarray,
+                     browse_rate: float, recall_rate: float,
+                     amz_conv: float, amz_aov: float) -> dict:
+    """
+    Dual-path funnel for every brand.
+
+    Path A: non-buying TTS visitors who browse to Amazon.
+    Path B: impression-only viewers who later recall the brand on Amazon.
+    """
+    has_vis = vis > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        buyers = tts / amz_aov if amz_aov > 0 else np.zeros_like(tts)
+        buy_rate = np.where(has_vis, np.minimum(buyers / vis, 0.5), 0.0)
+    non_buyers = vis * (1 - buy_rate)
+    path_a_vis = np.where(has_vis, non_buyers * browse_rate, 0.0)
+    path_a = np.where(has_vis, path_a_vis * amz_conv * amz_aov, 0.0)
+
+    has_view_only = imp > vis
+    path_b_vis = np.where(has_view_only, (imp - vis) * recall_rate, 0.0)
+    path_b = np.where(has_view_only, path_b_vis * amz_conv * amz_aov, 0.0)
+
+    return {
+        "path_a": path_a, "path_b": path_b,
+        "path_a_vis": path_a_vis, "path_b_vis": path_b_vis,
+        "funnel_attr": path_a + path_b,
+        "total_amz_vis": path_a_vis + path_b_vis,
+    }
+
+
+def funnel_audiences(arrays: dict, amz_aov) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (non-buying visitors, impression-only viewers) per brand: the
+    audiences dual_path_funnel multiplies by browse_rate and recall_rate.
+    `amz_aov` may be an array broadcasting against the brand axis.
+    """
+    tts, vis, imp = arrays["jan_tts"], arrays["visitors"], arrays["impressions"]
+    has_vis = vis > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        buyers = np.where(np.asarray(amz_aov) > 0, tts / amz_aov, 0.0)
+        buy_rate = np.where(has_vis, np.minimum(buyers / vis, 0.5), 0.0)
+    return np.where(has_vis, vis * (1 - buy_rate), 0.0), np.where(imp > vis, imp - vis, 0.0)
+
+
+# ── Sensitivity ───────────────────────────────────────────────────────────────
+
+# Slider parameters of the light stage, in sweep axis order
+SWEEP_PARAMS = ("cap_mult", "browse_rate", "recall_rate", "amz_conv", "amz_aov")
+SWEEP_DEFAULTS = {"cap_mult": 4, "browse_rate": 0.15, "recall_rate": 0.002, "amz_conv": 0.10, "amz_aov": 35}
+
+
+def sweep(arrays: dict, grid: dict, per_brand: bool = False, **fixed) -> dict:
+    """
+    corr_attr and funnel_attr over the Cartesian product of `grid`
+    ({param: values} for any of SWEEP_PARAMS), with the other parameters
+    at the scalar values in `fixed` (default SWEEP_DEFAULTS).
+
+    The model separates by parameter: corr_attr depends only on cap_mult,
+    and funnel_attr = amz_conv × amz_aov × (browse_rate × A(amz_aov) +
+    recall_rate × B), where A sums the non-buying visitors (which depend
+    on AOV) and B the impression-only viewers. Brand-level work is one
+    pass per cap_mult / AOV value; the grid itself is a broadcast product,
+    so 10^5+ combinations take well under a second.
+
+    Returns {'params': swept names in grid order, 'values': their value
+    arrays, 'corr_attr', 'funnel_attr'}: portfolio totals shaped by the
+    grid, or (n_brands, *grid) with per_brand=True. Totals agree with
+    summing apply_parameters at each point up to float rounding.
+    """
+    unknown = (set(grid) | set(fixed)) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"unknown sweep parameters: {sorted(unknown)}")
+    vals = {p: np.atleast_1d(np.asarray(grid[p] if p in grid else fixed.get(p, SWEEP_DEFAULTS[p]), dtype=float))
+            for p in SWEEP_PARAMS}
+    tts = arrays["jan_tts"]
+
+    # (value, brand) blocks for the two parameters that reach brand level
+    corr = apply_cap(arrays["jan_amz"], tts, arrays["corr_rate"], vals["cap_mult"][:, None], arrays["scored"])[0]
+    non_buyers, view_only = funnel_audiences(arrays, vals["amz_aov"][:, None])
+    view_only = view_only[None, :]
+    if not per_brand:
+        corr, non_buyers, view_only = (x.sum(axis=1, keepdims=True) for x in (corr, non_buyers, view_only))
+
+    # Axes: one per SWEEP_PARAMS entry, then brands (length 1 for totals)
+    def on(param, v):
+        shape = [1] * (len(SWEEP_PARAMS) + 1)
+        shape[SWEEP_PARAMS.index(param)] = v.shape[0]
+        shape[-1] = v.shape[1] if v.ndim > 1 else 1
+        return v.reshape(shape)
+
+    funnel = on("amz_conv", vals["amz_conv"]) * on("amz_aov", vals["amz_aov"]) * (
+        on("browse_rate", vals["browse_rate"]) * on("amz_aov", non_buyers)
+        + on("recall_rate", vals["recall_rate"]) * view_only.reshape((1,) * len(SWEEP_PARAMS) + (-1,)))
+    corr = on("cap_mult", corr)
+
+    # Brands first (when kept), then the swept axes in grid order; the
+    # fixed parameters' axes have length 1 and drop out in the reshape
+    swept = list(grid)
+    full = tuple(len(vals[p]) for p in SWEEP_PARAMS) + (corr.shape[-1],)
+    order = ([len(SWEEP_PARAMS)] + [SWEEP_PARAMS.index(p) for p in swept]
+             + [i for i, p in enumerate(SWEEP_PARAMS) if p not in grid])
+    shape = ((len(tts),) if per_brand else ()) + tuple(len(vals[p]) for p in swept)
+
+    def out(x):
+        return np.broadcast_to(x, full).transpose(order).reshape(shape)
+
+    return {"params": swept, "values": [vals[p] for p in swept],
+            "corr_attr": out(corr), "funnel_attr": out(funnel)}
+
+
+def tornado(arrays: dict, ranges: dict, base: dict | None = None,
+            metric: str = "funnel_attr") -> tuple[list, float]:
+    """
+    One-at-a-time sensitivity of portfolio `metric` ('corr_attr' or
+    'funnel_attr'). For each {param: (low, high)} in `ranges`, the total
+    with that parameter at low and at high and the rest at `base`
+    (default SWEEP_DEFAULTS). Returns ([(param, total at low, total at
+    high)] widest swing first, total at base).
+    """
+    base = {**SWEEP_DEFAULTS, **(base or {})}
+    rows = []
+    for p, (lo, hi) in ranges.items():
+        t = sweep(arrays, {p: [lo, hi]}, **{k: v for k, v in base.items() if k != p})[metric]
+        rows.append((p, float(t[0]), float(t[1])))
+    rows.sort(key=lambda r: abs(r[2] - r[1]), reverse=True)
+    return rows, float(sweep(arrays, {}, **base)[metric])
+
+
+# ── Calibration ───────────────────────────────────────────────────────────────
+
+# Plausible ranges (the sidebar's) that calibrate_funnel keeps rates inside
+CALIBRATION_BOUNDS = {"browse_rate": (0.05, 0.40), "recall_rate": (0.001, 0.010), "amz_conv": (0.05, 0.20)}
+CALIBRATION_STEPS = 301   # amz_conv values tried across its range
+
+
+def calibrate_funnel(arrays: dict, cap_mult: float = 4, amz_aov: float = 35,
+                     amz_conv: float = SWEEP_DEFAULTS["amz_conv"], by_tier: bool = False,
+                     bounds: dict | None = None) -> dict:
+    """
+    Fit browse_rate, recall_rate and amz_conv so funnel_attr matches
+    corr_attr (at cap_mult) brand by brand under least squares, within
+    `bounds` (default CALIBRATION_BOUNDS). With by_tier=True each
+    confidence tier is fitted on its own brands.
+
+    funnel_attr = amz_conv × amz_aov × (browse_rate × A + recall_rate × B)
+    for the fixed audiences A and B (funnel_audiences), so the squared
+    error is a quadratic in u = conv × browse and v = conv × recall whose
+    coefficients are five sums over brands. Only u and v are identified:
+    for each amz_conv on a grid over its range the box-constrained 2-D
+    problem is solved in closed form (interior optimum or the best point
+    on an edge), and among the conversions reaching the lowest error the
+    one nearest the given `amz_conv` is kept — conversion only moves when
+    the browse or recall bounds force it to.
+
+    Returns {group: fit} with group 'ALL' or each tier present, and fit a
+    dict of browse_rate, recall_rate, amz_conv, brands, corr_total,
+    funnel_total (at the fitted rates) and rmse (per brand, dollars).
+    """
+    bounds = {**CALIBRATION_BOUNDS, **(bounds or {})}
+    corr = apply_cap(arrays["jan_amz"], arrays["jan_tts"], arrays["corr_rate"], cap_mult, arrays["scored"])[0]
+    non_buyers, view_only = funnel_audiences(arrays, amz_aov)
+    a, b = amz_aov * non_buyers, amz_aov * view_only
+
+    conf = np.asarray(arrays["confidence"])
+    groups = [t for t in [c for _, c, _ in CONF_TIERS] + ["WEAK", "INSUF"] if (conf == t).any()] if by_tier else ["ALL"]
+    masks = np.array([conf == g for g in groups]) if by_tier else np.ones((1, len(corr)), dtype=bool)
+
+    # Normal-equation sums per group, as (group, 1) columns against the conv grid
+    m = masks.astype(float)
+    gaa, gab, gbb, ha, hb, cc = (m @ x for x in (a * a, a * b, b * b, a * corr, b * corr, corr * corr))
+    gaa, gab, gbb, ha, hb, cc = (x[:, None] for x in (gaa, gab, gbb, ha, hb, cc))
+
+    k = np.linspace(*bounds["amz_conv"], CALIBRATION_STEPS)[None, :]
+    u_lo, u_hi = k * bounds["browse_rate"][0], k * bounds["browse_rate"][1]
+    v_lo, v_hi = k * bounds["recall_rate"][0], k * bounds["recall_rate"][1]
+    shape = (len(groups), k.shape[1])
+
+    # Candidate optima per (group, conv): the interior solution when it is
+    # inside the box, else the best point of each edge
+    det = gaa * gbb - gab * gab
+    with np.errstate(invalid="ignore", divide="ignore"):
+        u_in = np.broadcast_to(np.where(det > 0, (ha * gbb - hb * gab) / det, np.nan), shape)
+        v_in = np.broadcast_to(np.where(det > 0, (hb * gaa - ha * gab) / det, np.nan), shape)
+        inside = (u_in >= u_lo) & (u_in <= u_hi) & (v_in >= v_lo) & (v_in <= v_hi)
+        cands = [(np.where(inside, u_in, u_lo), np.where(inside, v_in, v_lo))]
+        for v_edge in (v_lo, v_hi):
+            cands.append((np.clip(np.where(gaa > 0, (ha - v_edge * gab) / gaa, u_lo), u_lo, u_hi), v_edge))
+        for u_edge in (u_lo, u_hi):
+            cands.append((u_edge, np.clip(np.where(gbb > 0, (hb - u_edge * gab) / gbb, v_lo), v_lo, v_hi)))
+    u = np.stack([np.broadcast_to(c[0], shape) for c in cands])
+    v = np.stack([np.broadcast_to(c[1], shape) for c in cands])
+    sse = np.maximum(u * u * gaa + 2 * u * v * gab + v * v * gbb - 2 * (u * ha + v * hb) + cc, 0.0)
+
+    # Best candidate per (group, conv), then the conv nearest amz_conv among the best
+    best = sse.argmin(axis=0)
+    rows = np.arange(len(groups))[:, None]
+    cols = np.arange(k.shape[1])[None, :]
+    sse, u, v = (x[best, rows, cols] for x in (sse, u, v))
+    low = sse.min(axis=1, keepdims=True)
+    tied = sse <= low + 1e-9 * np.maximum(cc, 1.0)
+    pick = np.where(tied, np.abs(k - amz_conv), np.inf).argmin(axis=1)
+
+    fits = {}
+    for g, group in enumerate(groups):
+        j = pick[g]
+        conv = float(k[0, j])
+        n = int(masks[g].sum())
+        fits[group] = {"browse_rate": float(u[g, j] / conv), "recall_rate": float(v[g, j] / conv),
+                       "amz_conv": conv, "brands": n, "corr_total": float(corr[masks[g]].sum()),
+                       "funnel_total": float((u[g, j] * a + v[g, j] * b)[masks[g]].sum()),
+                       "rmse": float(np.sqrt(sse[g, j] / n)) if n else 0.0}
+    return fits
+
+
+# ── Brand Models ──────────────────────────────────────────────────────────────
+
+def prepare_brand_arrays(tts_monthly: dict, amz_monthly: dict, content: dict,
+                         tts_meta: dict, master_brands, latest: tuple,
+                         window=DEFAULT_WINDOW_MONTHS, n_resamples: int = 0,
+                         max_lag: int = DEFAULT_MAX_LAG) -> dict:
+    """
+    Heavy stage: pivot the monthly aggregates and score correlations.
+
+    Everything here depends only on the uploaded data, the report month
+    and the correlation window (months, or a trailing month count ending
+    at `latest`), so the result can be cached and reused across slider
+    changes. Returns a dict of per-brand arrays (one row per master brand,
+    sorted) for apply_parameters. With n_resamples > 0 the arrays also
+    carry bootstrap intervals (see bootstrap_intervals); max_lag > 1 scans
+    lags up to max_lag months (see scan_lags).
+    """
+    brands = sorted(master_brands)
+    months = resolve_window(window, latest)
+
+    with span("pivot", "model", brands=len(brands), months=len(months)):
+        tts = pivot_monthly(tts_monthly, brands, months)
+        amz = pivot_monthly(amz_monthly, brands, months, "sales")
+        org = pivot_monthly(amz_monthly, brands, months, "organic")
+
+        lc = [content.get(b, {}).get(latest, {}) for b in brands]
+        latest_content = {
+            "gmv": [c.get("gmv", 0) for c in lc],
+            "impressions": [c.get("impressions", 0) for c in lc],
+            "visitors": [c.get("visitors", 0) for c in lc],
+            "videos": [c.get("videos", 0) for c in lc],
+            "lives": [c.get("lives", 0) for c in lc],
+            "affiliate_gmv": [c.get("affiliate_gmv", 0) for c in lc],
+            "creators": [len(c["creators"]) if isinstance(c.get("creators"), set) else 0 for c in lc],
+        }
+        latest_tts = pivot_monthly(tts_monthly, brands, [latest])[:, 0]
+        latest_amz = pivot_monthly(amz_monthly, brands, [latest], "sales")[:, 0]
+
+    with span("correlate", "model", brands=len(brands)):
+        r, ok = pair_correlations(tts, amz, org)
+    with span("assemble", "model"):
+        return assemble_brand_arrays(brands, tts_meta, tts, amz, org, latest_tts, latest_amz,
+                                     latest_content, r, ok, window=months, n_resamples=n_resamples,
+                                     max_lag=max_lag)
+
+
+def prepare_panel_arrays(tts_monthly: dict, amz_monthly: dict, content: dict,
+                         tts_meta: dict, master_brands, report_months,
+                         window: int = DEFAULT_WINDOW_MONTHS, n_resamples: int = 0,
+                         max_lag: int = DEFAULT_MAX_LAG):
+    """
+    prepare_brand_arrays for many report months at once.
+
+    The aggregates are pivoted once onto a month axis spanning every
+    report month's trailing window, and all windows are scored together by
+    rolling_pair_correlations. Yields (report_month, arrays) in the order
+    given; r agrees with prepare_brand_arrays up to float rounding.
+    """
+    report_months = [tuple(ym) for ym in report_months]
+    if not report_months:
+        return
+    brands = sorted(master_brands)
+    first = month_index(min(report_months)) - window + 1
+    axis = TimeAxis(month_at(first), max(report_months))
+    months = axis.months
+
+    tts = pivot_monthly(tts_monthly, brands, months)
+    amz = pivot_monthly(amz_monthly, brands, months, "sales")
+    org = pivot_monthly(amz_monthly, brands, months, "organic")
+    r, ok = rolling_pair_correlations(tts, amz, org, window)
+
+    wanted = set(report_months)
+    cont = {f: pivot_monthly(content, brands, months, f) for f in
+            ("gmv", "impressions", "visitors", "videos", "lives", "affiliate_gmv")}
+    creators = np.zeros((len(brands), len(months)), dtype=int)
+    for i, b in enumerate(brands):
+        for ym, c in content.get(b, {}).items():
+            if ym in wanted and isinstance(c.get("creators"), set):
+                creators[i, axis.offset(ym)] = len(c["creators"])
+
+    for latest in report_months:
+        t = axis.offset(latest)
+        sl = axis.window(latest, window)
+        latest_content = {f: cont[f][:, t] for f in cont}
+        latest_content["creators"] = creators[:, t]
+        yield latest, assemble_brand_arrays(
+            brands, tts_meta, tts[:, sl], amz[:, sl], org[:, sl], tts[:, t], amz[:, t],
+            latest_content, r[:, :, t], ok[:, :, t], window=months[sl], n_resamples=n_resamples,
+            max_lag=max_lag)
+
+
+def assemble_brand_arrays(brands: list, tts_meta: dict, tts: np.ndarray, amz: np.ndarray,
+                          org: np.ndarray, latest_tts: np.ndarray, latest_amz: np.ndarray,
+                          latest_content: dict, r_pairs: np.ndarray, ok_pairs: np.ndarray,
+                          window: list | None = None, n_resamples: int = 0,
+                          max_lag: int = DEFAULT_MAX_LAG) -> dict:
+    """
+    Per-brand arrays for apply_parameters from window matrices, latest-month
+    values and per-variant correlations (as from pair_correlations).
+    `window` lists the months the matrix columns cover; n_resamples > 0
+    adds bootstrap intervals for r, and max_lag > 1 adds the lags past one
+    month as candidates plus each brand's best lag and lag profile.
+    """
+    imp = np.asarray(latest_content["impressions"], dtype=float)
+    vis = np.asarray(latest_content["visitors"], dtype=float)
+
+    # Latest-month TTS GMV, falling back to Broadway GMV
+    jan_tts = np.where(latest_tts == 0, np.asarray(latest_content["gmv"], dtype=float), latest_tts)
+
+    # Latest-month AMZ, falling back to the last positive month of the window
+    pos = amz > 0
+    last_pos = amz.shape[1] - 1 - np.argmax(pos[:, ::-1], axis=1)
+    fallback = np.where(pos.any(axis=1), amz[np.arange(len(brands)), last_pos], amz[:, 0])
+    jan_amz = np.where(latest_amz == 0, fallback, latest_amz)
+
+    active = (tts > 0).sum(axis=1)
+
+    # Correlation model (rate and tier only — the cap depends on cap_mult)
+    lags = {}
+    if max_lag > 1:
+        r_pairs, ok_pairs, profiles = scan_lags(tts, amz, org, r_pairs, ok_pairs, max_lag)
+    r_best, r_idx = select_best(r_pairs, ok_pairs)
+    conf, rate, scored = assign_confidence(r_best, active, pos.any(axis=1))
+    r_idx = np.where(scored, r_idx, 0)
+    if max_lag > 1:
+        # Profile against the Amazon series (total or organic) the chosen variant uses
+        lags = {"best_lag": variant_lags(max_lag)[r_idx],
+                "lag_profile": np.where((r_idx % 2 == 1)[:, None], profiles["org"], profiles["amz"])}
+    intervals = (bootstrap_intervals(tts, amz, org, r_idx, scored, n_resamples, max_lag=max_lag)
+                 if n_resamples > 0 else {})
+    variants = r_types(max_lag)
+
+    return {
+        "brand": brands,
+        "ps": [tts_meta.get(b, {}).get("ps", "") for b in brands],
+        "status": [tts_meta.get(b, {}).get("status", "") for b in brands],
+        "jan_tts": jan_tts, "jan_amz": jan_amz,
+        # Sequential row sums match Python's sum() bit for bit
+        "tts_total": np.cumsum(tts, axis=1)[:, -1],
+        "active_months": active,
+        "r_best": np.where(scored, r_best, 0.0),
+        "r_type": [variants[k] for k in r_idx],
+        "corr_rate": rate, "confidence": conf, "scored": scored,
+        "impressions": imp, "visitors": vis,
+        "videos": list(latest_content["videos"]),
+        "live_streams": list(latest_content["lives"]),
+        "creators": list(latest_content["creators"]),
+        "affiliate_gmv": list(latest_content["affiliate_gmv"]),
+        "tts_series": tts, "amz_series": amz, "org_series": org,
+        "window": list(window) if window is not None else [],
+        **lags,
+        **intervals,
+    }
+
+
+# Output row layout — the original build_model row keys, with the monthly
+# series generalized from calendar 2025 to the correlation window
+ROW_FIELDS = [
+    "brand", "ps", "status", "jan_tts", "jan_amz", "tts_total", "active_months",
+    # Correlation model
+    "r_best", "r_type", "corr_rate", "confidence", "corr_attr", "corr_capped",
+    # Funnel model
+    "funnel_attr", "path_a", "path_b", "path_a_vis", "path_b_vis", "total_amz_vis",
+    # Content
+    "impressions", "visitors", "videos", "live_streams", "creators", "affiliate_gmv",
+    # Monthly series over the correlation window
+    "tts_series", "amz_series", "org_series",
+]
+# Appended to the rows when the arrays carry a lag scan / bootstrap intervals
+LAG_FIELDS = ["best_lag", "lag_profile"]
+CI_FIELDS = ["r_lo", "r_hi", "corr_attr_lo", "corr_attr_hi"]
+
+
+def row_fields(arrays: dict) -> list:
+    """ROW_FIELDS, plus LAG_FIELDS (max_lag > 1) and CI_FIELDS (n_resamples > 0)."""
+    return (ROW_FIELDS + (LAG_FIELDS if "lag_profile" in arrays else [])
+            + (CI_FIELDS if "r_lo" in arrays else []))
+
+
+def parameter_arrays(arrays: dict, cap_mult: float = 4, browse_rate: float = 0.15,
+                     recall_rate: float = 0.002, amz_conv: float = 0.10,
+                     amz_aov: float = 35, fields: list | None = None) -> dict:
+    """
+    Light stage, column form: {field: array (or list, for the string
+    fields)} for `fields` (default: row_fields) after applying the GMV cap
+    and dual-path funnel. Fields passed through from `arrays` are not copied.
+    """
+    corr_attr, corr_capped = apply_cap(arrays["jan_amz"], arrays["jan_tts"],
+                                       arrays["corr_rate"], cap_mult, arrays["scored"])
+    fun = dual_path_funnel(arrays["visitors"], arrays["impressions"], arrays["jan_tts"],
+                           browse_rate, recall_rate, amz_conv, amz_aov)
+    cols = {**arrays, "corr_attr": corr_attr, "corr_capped": corr_capped, **fun}
+    if "abs_r_lo" in arrays:
+        # Attributed is non-decreasing in |r| (tier rate, then the cap), so
+        # the |r| interval ends map straight to corr_attr interval ends
+        for end in ("lo", "hi"):
+            cols[f"corr_attr_{end}"] = apply_cap(arrays["jan_amz"], arrays["jan_tts"], tier_rate(arrays[f"abs_r_{end}"]),
+                                                 cap_mult, arrays["scored"])[0]
+    fields = row_fields(arrays) if fields is None else fields
+    return {k: cols[k] for k in fields}
+
+
+def parameter_columns(arrays: dict, cap_mult: float = 4, browse_rate: float = 0.15,
+                      recall_rate: float = 0.002, amz_conv: float = 0.10,
+                      amz_aov: float = 35, fields: list | None = None) -> dict:
+    """parameter_arrays with every column as a list (for rows and batch output)."""
+    cols = parameter_arrays(arrays, cap_mult, browse_rate, recall_rate, amz_conv, amz_aov, fields)
+    return {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in cols.items()}
+
+
+def apply_parameters(arrays: dict, cap_mult: float = 4, browse_rate: float = 0.15,
+                     recall_rate: float = 0.002, amz_conv: float = 0.10,
+                     amz_aov: float = 35) -> list[dict]:
+    """
+    Light stage: apply the GMV cap and dual-path funnel to prepared arrays.
+
+    Only the slider-driven arithmetic runs here; returns the brand rows
+    build_model has always produced (plus CI_FIELDS with intervals).
+    """
+    with span("apply_parameters", "model", brands=len(arrays["brand"])):
+        cols = parameter_columns(arrays, cap_mult, browse_rate, recall_rate, amz_conv, amz_aov)
+        fields = row_fields(arrays)
+        return [dict(zip(fields, vals)) for vals in zip(*(cols[k] for k in fields))]
+
+
+def compute_brand_models(tts_monthly: dict, amz_monthly: dict, content: dict,
+                         tts_meta: dict, master_brands, latest: tuple,
+                         cap_mult: float = 4, browse_rate: float = 0.15,
+                         recall_rate: float = 0.002, amz_conv: float = 0.10,
+                         amz_aov: float = 35, window=DEFAULT_WINDOW_MONTHS,
+                         n_resamples: int = 0, max_lag: int = DEFAULT_MAX_LAG) -> list[dict]:
+    """
+    Build the per-brand model rows from the monthly aggregates.
+
+    Columnar equivalent of the old per-brand loop in build_model: same
+    keys, same values, one row per master brand in sorted order.
+    """
+    arrays = prepare_brand_arrays(tts_monthly, amz_monthly, content, tts_meta,
+                                  master_brands, latest, window=window, n_resamples=n_resamples,
+                                  max_lag=max_lag)
+    return apply_parameters(arrays, cap_mult=cap_mult, browse_rate=browse_rate,
+                            recall_rate=recall_rate, amz_conv=amz_conv, amz_aov=amz_aov)
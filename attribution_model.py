@@ -0,0 +1,196 @@
+"""
+attribution_model.py — Model Builder
+
+Turns parsed uploads into per-brand attribution rows: resolves brand
+names, aggregates every source by brand and month, and runs the
+attribution engine. Shared by the Streamlit app and the batch CLI; no
+Streamlit imports here.
+"""
+
+import os
+import threading
+from collections import defaultdict
+
+from attribution_engine import DEFAULT_MAX_LAG, group_monthly, prepare_brand_arrays, apply_parameters
+from brand_resolver import BrandResolver
+from diagnostics import span
+from monthly_store import MonthlyStore
+from time_axis import DEFAULT_WINDOW_MONTHS
+
+# ═══════════════ BRAND MAP ═══════════════
+# All known name variants → canonical name
+# Amazon report is the MASTER: only brands in Amazon report are included
+BRAND_MAP={
+    # Broadway shop → canonical
+    'Thorne Health Shop':'Thorne Research','Pure Encapsulations Shop':'Pure Encapsulations',
+    'Hims & Hers':'Hims & Hers','Vital Proteins Shop':'Vital Proteins',
+    'youtheory':'YouTheory','Philips Shop US':'Philips','PHILIPS':'Philips',
+    'TruNiagen':'Tru Niagen','SmartMouth':'SmartMouth','Sakura of America Shop':'Sakura',
+    'Strider Bikes':'Strider Bikes','Mercola Market Shop':'Dr. Mercola',
+    'Natural Factors':'Natural Factors','Herbs, Etc.':'Herbs, Etc.',
+    'Amazing Grass':'Amazing Grass','Emerald Labs':'Emerald Labs',
+    'Balance of Nature Shop':'Balance of Nature','AdvoCare':'AdvoCare',
+    'Brownmed':'Brownmed','New Chapter Inc':'New Chapter',
+    'Optimum Nutrition Shop':'Optimum Nutrition','Gaia Herbs':'Gaia',
+    # Amazon report → canonical
+    'Atrium - Pure Encapsulations':'Pure Encapsulations','Dr Mercola':'Dr. Mercola',
+    'Emerald Laboratories':'Emerald Labs','Herbs Etc.':'Herbs, Etc.',
+    'Glanbia Performance Nutrition':'Optimum Nutrition',
+    'Philips Avent':'Philips','Philips Norelco':'Philips','Philips Sonicare':'Philips',
+    'Strider':'Strider Bikes','Youtheory':'YouTheory',
+    # GMV CSV → canonical
+    'Advocare':'AdvoCare','Tru Niagen':'Tru Niagen',
+    'Vital Proteins':'Vital Proteins','Sakura':'Sakura',
+    'Thorne Research':'Thorne Research','Pure Encapsulations':'Pure Encapsulations',
+    'Hims & Hers':'Hims & Hers','YouTheory':'YouTheory',
+    'SmartMouth':'SmartMouth','Strider Bikes':'Strider Bikes',
+    'Dr. Mercola':'Dr. Mercola','Natural Factors':'Natural Factors',
+    'Herbs, Etc.':'Herbs, Etc.','Emerald Labs':'Emerald Labs',
+    'Balance of Nature':'Balance of Nature','AdvoCare':'AdvoCare',
+    'Brownmed':'Brownmed','New Chapter':'New Chapter',
+    'Optimum Nutrition':'Optimum Nutrition','Gaia':'Gaia',
+    'Amazing Grass':'Amazing Grass','Philips':'Philips',
+}
+
+CONTENT_MIN_YEAR=int(os.environ['TTS_CONTENT_MIN_YEAR']) if os.environ.get('TTS_CONTENT_MIN_YEAR') else None
+STORE_PATH=os.environ.get('TTS_STORE_PATH','')
+
+
+# ═══════════════ MODEL BUILDER ═══════════════
+
+def aggregate_sources(gmv_data, broadway, amazon_data, bm):
+    """Steps 1-3: per-brand monthly aggregates from every source."""
+    # One resolver for every source, so each raw name is normalized once
+    norm = bm if isinstance(bm, BrandResolver) else BrandResolver(bm)
+    with span("aggregate_sources","model") as args:
+        out = _aggregate_sources(gmv_data, broadway, amazon_data, norm)
+        args["resolver"] = norm.cache_info()._asdict()
+    return out
+
+def _aggregate_sources(gmv_data, broadway, amazon_data, norm):
+
+    # Step 1: Get Amazon master brand list
+    amz_monthly = defaultdict(lambda: defaultdict(lambda:{'sales':0,'ad_sales':0,'organic':0,'page_views':0}))
+    amz_brands = set()
+    if amazon_data:
+        fields=('sales','ad_sales','organic','page_views')
+        with span("resolve:amazon","model",rows=len(amazon_data['brand_raw'])):
+            names=[norm(b) for b in amazon_data['brand_raw']]
+        with span("aggregate:amazon","model"):
+            groups,sums,_=group_monthly(names,amazon_data['year'],amazon_data['month'],{f:amazon_data[f] for f in fields})
+        for g,(brand,ym) in enumerate(groups):
+            amz_brands.add(brand)
+            d = amz_monthly[brand][ym]
+            for f in fields: d[f] += sums[f][g]
+
+    # Step 2: TTS monthly from GMV CSV
+    tts_monthly = defaultdict(lambda: defaultdict(float))
+    tts_meta = {}
+    if gmv_data:
+        with span("aggregate:gmv","model",rows=len(gmv_data)):
+            for row in gmv_data:
+                brand = norm(row['brand'])
+                if not brand: continue
+                tts_meta[brand] = {'ps':row['ps'],'status':row['status']}
+                for (y,m),gmv in row['monthly'].items():
+                    tts_monthly[brand][(y,m)] += gmv
+
+    # Step 3: Content from Broadway (rows before CONTENT_MIN_YEAR, if set, are dropped by the parser;
+    # rows with a blank year or month parse as 0 and are dropped here either way)
+    content = defaultdict(lambda: defaultdict(lambda:{'gmv':0,'impressions':0,'visitors':0,'affiliate_gmv':0,'videos':0,'lives':0,'views':0,'likes':0,'creators':set()}))
+    if broadway:
+        for sheet,fields in (('pr',('gmv','impressions','visitors','affiliate_gmv')),('vr',('videos','lives')),('ct',('views','likes'))):
+            cols=broadway[sheet]
+            with span(f"resolve:broadway:{sheet}","model",rows=len(cols['shop'])):
+                dated=((cols['year']>0)&(cols['month']>0)).tolist()
+                names=[norm(s) if ok else None for s,ok in zip(cols['shop'],dated)]
+            with span(f"aggregate:broadway:{sheet}","model"):
+                groups,sums,inv=group_monthly(names,cols['year'],cols['month'],{f:cols[f] for f in fields})
+                for g,(brand,ym) in enumerate(groups):
+                    d=content[brand][ym]
+                    for f in fields: d[f]+=sums[f][g]
+                if sheet=='ct':
+                    for g,cr in zip(inv.tolist(),cols['creator']):
+                        if g>=0 and cr: content[groups[g][0]][groups[g][1]]['creators'].add(cr)
+
+    return tts_monthly, amz_monthly, content, tts_meta, amz_brands
+
+def upload_brands(tts_monthly, amz_brands) -> set:
+    """Master brand list for one upload: its Amazon brands, else its TTS brands."""
+    return amz_brands if amz_brands else set(tts_monthly.keys())
+
+def aggregate_model(gmv_data, broadway, amazon_data, bm, report_month=None, window=DEFAULT_WINDOW_MONTHS, n_resamples=0,
+                    max_lag=DEFAULT_MAX_LAG):
+    """Heavy stage: aggregate all sources and score correlations per brand (n_resamples > 0: with bootstrap intervals; max_lag > 1: lag scan)."""
+    tts_monthly, amz_monthly, content, tts_meta, amz_brands = aggregate_sources(gmv_data, broadway, amazon_data, bm)
+
+    # Use selected report month (or auto-detect)
+    if report_month:
+        latest = report_month
+    else:
+        content_months = set()
+        for b,ms in content.items():
+            for k in ms: content_months.add(k)
+        latest = max(content_months) if content_months else (2026,1)
+
+    # Step 4: Brand arrays — ONLY for Amazon master brands
+    master_brands = upload_brands(tts_monthly, amz_brands)
+    with span("prepare_brand_arrays","model"):
+        arrays = prepare_brand_arrays(tts_monthly, amz_monthly, content, tts_meta, master_brands, latest, window=window, n_resamples=n_resamples, max_lag=max_lag)
+
+    return arrays, latest
+
+# Open stores by path, kept across runs in this process (the window and sums
+# move in place, so a store is used by one run at a time)
+_STORES = {}
+_STORE_LOCK = threading.Lock()
+
+def store_aggregate(gmv_data, broadway, amazon_data, bm, report_month=None, window=DEFAULT_WINDOW_MONTHS, path=None, n_resamples=0,
+                    max_lag=DEFAULT_MAX_LAG):
+    """
+    aggregate_model against the incremental store: merge this upload's cells, then score from running sums.
+
+    The store is loaded once per process and written back only when the
+    upload changed it; a window move alone is not saved (the next load
+    slides from the saved window again).
+    """
+    path = path or STORE_PATH
+    aggregates = aggregate_sources(gmv_data, broadway, amazon_data, bm)
+    with _STORE_LOCK:
+        store = _STORES.get(path)
+        if store is None:
+            with span("store:load","model"):
+                store = _STORES[path] = MonthlyStore.load(path)
+        before = (len(store.brands), len(store.months), len(store.amz_brands), len(store.tts_brands),
+                  len(store.content_months), dict(store.tts_meta))
+        with span("store:merge","model"):
+            changed = store.merge(*aggregates)
+        if any(changed.values()) or before != (len(store.brands), len(store.months), len(store.amz_brands),
+                                               len(store.tts_brands), len(store.content_months), store.tts_meta):
+            with span("store:save","model"):
+                store.save(path)
+        latest = report_month or store.latest_content_month()
+        with span("store:brand_arrays","model"):
+            return store.brand_arrays(upload_brands(aggregates[0], aggregates[4]), latest, window, n_resamples,
+                                      max_lag), latest
+
+def build_model(gmv_data, broadway, amazon_data, bm, cap_mult=4,
+                browse_rate=0.15, recall_rate=0.002, amz_conv=0.10, amz_aov=35,
+                report_month=None, window=DEFAULT_WINDOW_MONTHS, n_resamples=0, max_lag=DEFAULT_MAX_LAG):
+    """Build the full model. Amazon brands = master list."""
+    arrays, latest = aggregate_model(gmv_data, broadway, amazon_data, bm, report_month=report_month, window=window,
+                                     n_resamples=n_resamples, max_lag=max_lag)
+    brands = apply_parameters(arrays, cap_mult=cap_mult, browse_rate=browse_rate,
+        recall_rate=recall_rate, amz_conv=amz_conv, amz_aov=amz_aov)
+    return brands, latest
+
+def available_months(gmv_data, broadway) -> set:
+    """Report months on offer: every dated Broadway month, else every GMV CSV month."""
+    months = set()
+    if broadway:
+        pr = broadway['pr']
+        months.update((y, m) for y, m in zip(pr['year'].tolist(), pr['month'].tolist()) if y > 0 and m > 0)
+    if not months and gmv_data:
+        for row in gmv_data:
+            months.update(row['monthly'])
+    return months
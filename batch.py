@@ -0,0 +1,188 @@
+"""
+batch.py — Headless Batch Run
+
+Runs the attribution model for every report month and every brand in one
+invocation, without Streamlit, and writes one long table (one row per
+report month × brand) to CSV or Parquet.
+
+Sources are parsed in parallel (ingest.py) and aggregated once; all
+report months are then scored together on a shared month axis
+(attribution_engine.prepare_panel_arrays). The per-month parameter stage
+is elementwise column arithmetic and runs in-process: shipping the arrays
+to a pool costs more than the work.
+
+Usage:
+    python batch.py --amazon AMZ.xlsx [--gmv GMV.csv] [--broadway BW.xlsm]
+                    -o results.csv [--months 2025-06:2026-01] [--window 12]
+                    [--workers N] [--max-lag 3] [--bootstrap 2000] [--cap-mult 4] ...
+
+The output format follows the file extension (.csv or .parquet), or
+--format. Parquet needs pyarrow.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+from attribution_engine import (ROW_FIELDS, CI_FIELDS, DEFAULT_MAX_LAG, parameter_columns,
+                                prepare_panel_arrays)
+from attribution_model import BRAND_MAP, CONTENT_MIN_YEAR, aggregate_sources, available_months
+from ingest import ingest, default_workers
+from parse_cache import ParseCache
+from time_axis import DEFAULT_WINDOW_MONTHS, month_index, month_range
+
+# Per-brand series are lists; they stay out of the flat output table
+SERIES_FIELDS = ("tts_series", "amz_series", "org_series")
+OUTPUT_FIELDS = ["report_month"] + [f for f in ROW_FIELDS if f not in SERIES_FIELDS]
+
+
+def output_fields(bootstrap: bool = False, max_lag: int = DEFAULT_MAX_LAG) -> list:
+    """
+    OUTPUT_FIELDS, plus best_lag and one r_lag<k> column per scanned lag
+    (max_lag > 1) and the interval columns when bootstrapping.
+    """
+    lags = ["best_lag"] + [f"r_lag{k}" for k in range(max_lag + 1)] if max_lag > 1 else []
+    return OUTPUT_FIELDS + lags + (CI_FIELDS if bootstrap else [])
+
+
+# ── Arguments ─────────────────────────────────────────────────────────────────
+
+def parse_month(s: str) -> tuple:
+    """'2026-01' -> (2026, 1)."""
+    try:
+        y, m = s.split("-")
+        ym = (int(y), int(m))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {s!r}")
+    if not 1 <= ym[1] <= 12:
+        raise argparse.ArgumentTypeError(f"month out of range in {s!r}")
+    return ym
+
+
+def parse_months(s: str) -> list[tuple]:
+    """'2025-06:2026-01' (inclusive range) or '2025-06,2025-09'."""
+    if ":" in s:
+        start, end = s.split(":", 1)
+        return month_range(parse_month(start), parse_month(end))
+    return [parse_month(p) for p in s.split(",") if p]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Run the TTS to Amazon lift model for every report month.")
+    p.add_argument("--amazon", required=True, help="Amazon Broadway report (.xlsx); defines the brand list")
+    p.add_argument("--gmv", help="Monthly GMV CSV (TTS history)")
+    p.add_argument("--broadway", help="Broadway Tool workbook (.xlsm/.xlsx)")
+    p.add_argument("-o", "--output", required=True, help="Output file (.csv or .parquet)")
+    p.add_argument("--format", choices=("csv", "parquet"), help="Output format (default: from extension)")
+    p.add_argument("--months", type=parse_months,
+                   help="Report months, YYYY-MM:YYYY-MM or a comma list (default: every available month)")
+    p.add_argument("--window", type=int, default=DEFAULT_WINDOW_MONTHS, help="Trailing correlation window in months")
+    p.add_argument("--workers", type=int, default=None, help="Parse worker processes (default: one per core)")
+    p.add_argument("--min-year", type=int, default=CONTENT_MIN_YEAR, help="Drop Broadway rows before this year")
+    p.add_argument("--max-lag", type=int, default=DEFAULT_MAX_LAG, metavar="K",
+                   help="Scan TTS -> Amazon lags of 0..K months (default: 1, the same-month and next-month variants)")
+    p.add_argument("--bootstrap", type=int, default=0, metavar="N",
+                   help="Add bootstrap intervals for r and corr_attr from N resamples (default: off)")
+    p.add_argument("--cap-mult", type=float, default=4)
+    p.add_argument("--browse-rate", type=float, default=0.15)
+    p.add_argument("--recall-rate", type=float, default=0.002)
+    p.add_argument("--amz-conv", type=float, default=0.10)
+    p.add_argument("--amz-aov", type=float, default=35)
+    p.add_argument("-q", "--quiet", action="store_true")
+    return p
+
+
+# ── Run ───────────────────────────────────────────────────────────────────────
+
+def _read(path):
+    if not path:
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def month_columns(latest: tuple, arrays: dict, params: dict) -> dict:
+    """Output columns for one report month."""
+    lag_profile = arrays.get("lag_profile")
+    max_lag = lag_profile.shape[1] - 1 if lag_profile is not None else DEFAULT_MAX_LAG
+    fields = [f for f in output_fields("r_lo" in arrays, max_lag)[1:] if not f.startswith("r_lag")]
+    cols = parameter_columns(arrays, fields=fields, **params)
+    if lag_profile is not None:
+        # The lag profile matrix goes out as one column per lag
+        cols.update({f"r_lag{k}": lag_profile[:, k].tolist() for k in range(max_lag + 1)})
+    cols["report_month"] = [f"{latest[0]}-{latest[1]:02d}"] * len(arrays["brand"])
+    return cols
+
+
+def run(gmv_bytes, bw_bytes, amz_bytes, months=None, window=DEFAULT_WINDOW_MONTHS,
+        workers=None, min_year=CONTENT_MIN_YEAR, params=None, n_resamples=0,
+        max_lag=DEFAULT_MAX_LAG, log=None):
+    """
+    Model every report month; returns a DataFrame with output_fields
+    (lag columns when max_lag > 1, CI_FIELDS when n_resamples > 0).
+
+    `months` defaults to every month the app would offer (Broadway months,
+    else GMV CSV months). `params` are apply_parameters keyword arguments.
+    """
+    import pandas as pd
+
+    log = log or (lambda msg: None)
+    workers = default_workers() if workers is None else max(1, workers)
+    t0 = time.perf_counter()
+    parsed = ingest(gmv_bytes, bw_bytes, amz_bytes, min_year=min_year,
+                    workers=workers, cache=ParseCache.from_env())
+    if not parsed["amazon"]:
+        raise ValueError("could not parse the Amazon report")
+    log(f"parsed in {time.perf_counter() - t0:.2f}s")
+
+    t0 = time.perf_counter()
+    tts_monthly, amz_monthly, content, tts_meta, amz_brands = aggregate_sources(
+        parsed["gmv"], parsed["broadway"], parsed["amazon"], dict(BRAND_MAP))
+    master_brands = amz_brands if amz_brands else set(tts_monthly.keys())
+    months = sorted(months or available_months(parsed["gmv"], parsed["broadway"]), key=month_index)
+    panel = list(prepare_panel_arrays(tts_monthly, amz_monthly, content, tts_meta,
+                                      master_brands, months, window=window, n_resamples=n_resamples,
+                                      max_lag=max_lag))
+    log(f"aggregated and scored {len(master_brands)} brands x {len(months)} months "
+        f"in {time.perf_counter() - t0:.2f}s")
+
+    t0 = time.perf_counter()
+    params = params or {}
+    parts = [month_columns(latest, {k: v for k, v in arrays.items() if k not in SERIES_FIELDS}, params)
+             for latest, arrays in panel]
+    fields = output_fields(n_resamples > 0, max_lag)
+    frames = [pd.DataFrame(cols, columns=fields) for cols in parts]
+    out = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=fields)
+    out = out.sort_values(["report_month", "brand"], kind="stable", ignore_index=True)
+    log(f"applied parameters in {time.perf_counter() - t0:.2f}s")
+    return out
+
+
+def write(df, path: str, fmt: str | None = None) -> None:
+    fmt = fmt or ("parquet" if path.lower().endswith((".parquet", ".pq")) else "csv")
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    log = (lambda msg: None) if args.quiet else (lambda msg: print(msg, file=sys.stderr))
+    params = {"cap_mult": args.cap_mult, "browse_rate": args.browse_rate,
+              "recall_rate": args.recall_rate, "amz_conv": args.amz_conv, "amz_aov": args.amz_aov}
+    try:
+        df = run(_read(args.gmv), _read(args.broadway), _read(args.amazon), months=args.months,
+                 window=args.window, workers=args.workers, min_year=args.min_year,
+                 params=params, n_resamples=args.bootstrap, max_lag=args.max_lag, log=log)
+        write(df, args.output, args.format)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    log(f"wrote {len(df)} rows to {os.path.abspath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+bench_bootstrap.py — Batched bootstrap vs a pearsonr loop
+
+Times attribution_engine.bootstrap_intervals (every resample of every
+brand from a few matrix products) against resampling each brand in a
+Python loop around scipy.stats.pearsonr, and checks they give the same
+intervals. The loop is run on --loop-brands brands and scaled up, since
+it takes minutes at portfolio size.
+
+Usage:
+    python benchmarks/bench_bootstrap.py [n_brands ...] [--resamples 2000] [--loop-brands 20]
+"""
+
+import os
+import sys
+import time
+import argparse
+import warnings
+
+import numpy as np
+from scipy.stats import pearsonr
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from attribution_engine import (  # noqa: E402
+    CI_LEVEL, assign_confidence, bootstrap_intervals, pair_correlations, resample_weights,
+    select_best, variant_pairs,
+)
+
+MONTHS = 12
+
+
+def matrices(n: int, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    tts = rng.gamma(2, 5_000, (n, MONTHS))
+    amz = 3 * tts + rng.gamma(2, 40_000, (n, MONTHS))
+    return tts, amz, amz * rng.uniform(.5, .9, (n, 1))
+
+
+def looped(tts, amz, org, r_idx, n_resamples: int) -> tuple[np.ndarray, np.ndarray]:
+    """Per-brand, per-resample pearsonr over the same resamples bootstrap_intervals draws."""
+    pairs = variant_pairs(tts, amz, org)
+    q = [(1 - CI_LEVEL) / 2, (1 + CI_LEVEL) / 2]
+    lo, hi = np.zeros(len(tts)), np.zeros(len(tts))
+    for i, k in enumerate(r_idx):
+        x, y = pairs[k][0][i], pairs[k][1][i]
+        w = resample_weights(len(x), n_resamples, len(x)).astype(int)
+        rs = []
+        for counts in w:
+            ix = np.repeat(np.arange(len(x)), counts)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                r = pearsonr(x[ix], y[ix])[0] if np.ptp(x[ix]) and np.ptp(y[ix]) else 0.0
+            rs.append(r)
+        lo[i], hi[i] = np.quantile(rs, q)
+    return lo, hi
+
+
+def main(sizes: list[int], n_resamples: int, loop_brands: int) -> None:
+    print(f"{'brands':>7} {'batched s':>10} {'loop s (est)':>13} {'speedup':>8}  match")
+    for n in sizes:
+        tts, amz, org = matrices(n)
+        r_best, r_idx = select_best(*pair_correlations(tts, amz, org))
+        _, _, scored = assign_confidence(r_best, (tts > 0).sum(axis=1), np.ones(n, dtype=bool))
+        t0 = time.perf_counter()
+        ci = bootstrap_intervals(tts, amz, org, r_idx, scored, n_resamples)
+        t_batch = time.perf_counter() - t0
+
+        k = min(loop_brands, n)
+        t0 = time.perf_counter()
+        lo, hi = looped(tts[:k], amz[:k], org[:k], r_idx[:k], n_resamples)
+        t_loop = (time.perf_counter() - t0) * n / k
+        match = "yes" if np.allclose(lo, ci["r_lo"][:k]) and np.allclose(hi, ci["r_hi"][:k]) else "NO"
+        print(f"{n:>7} {t_batch:>10.3f} {t_loop:>13.1f} {t_loop / t_batch:>7.0f}x  {match}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("sizes", nargs="*", type=int, default=[200, 1000])
+    ap.add_argument("--resamples", type=int, default=2000)
+    ap.add_argument("--loop-brands", type=int, default=20)
+    args = ap.parse_args()
+    main(args.sizes, args.resamples, args.loop_brands)
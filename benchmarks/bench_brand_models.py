@@ -0,0 +1,164 @@
+"""
+bench_brand_models.py — Per-brand loop vs columnar engine
+
+Times the original per-brand build_model loop (kept verbatim below as the
+reference) against attribution_engine.compute_brand_models on synthetic
+monthly aggregates, and checks both produce the same brand rows.
+
+Usage:
+    python benchmarks/bench_brand_models.py [n_brands ...]
+"""
+
+import os
+import sys
+import time
+import math
+
+import numpy as np
+from scipy import stats
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from attribution_engine import compute_brand_models  # noqa: E402
+from synthetic import make_aggregates  # noqa: E402
+
+
+# ── Reference: original per-brand loop ───────────────────────────────────────
+
+def legacy_brand_models(tts_monthly, amz_monthly, content, tts_meta, master_brands, latest,
+                        cap_mult=4, browse_rate=0.15, recall_rate=0.002, amz_conv=0.10, amz_aov=35):
+    brands = []
+    for brand in sorted(master_brands):
+        tts_2025 = [tts_monthly[brand].get((2025,m),0) for m in range(1,13)]
+        amz_2025 = [amz_monthly[brand].get((2025,m),{}).get('sales',0) for m in range(1,13)]
+        org_2025 = [amz_monthly[brand].get((2025,m),{}).get('organic',0) for m in range(1,13)]
+        active = sum(1 for v in tts_2025 if v > 0)
+        lc = content[brand].get(latest,{})
+        imp = lc.get('impressions',0) if isinstance(lc,dict) else 0
+        vis = lc.get('visitors',0) if isinstance(lc,dict) else 0
+        vid = lc.get('videos',0) if isinstance(lc,dict) else 0
+        liv = lc.get('lives',0) if isinstance(lc,dict) else 0
+        cre = len(lc.get('creators',set())) if isinstance(lc,dict) and isinstance(lc.get('creators'),set) else 0
+        aff = lc.get('affiliate_gmv',0) if isinstance(lc,dict) else 0
+        jan_tts = tts_monthly[brand].get(latest,0)
+        if jan_tts == 0: jan_tts = lc.get('gmv',0) if isinstance(lc,dict) else 0
+        jan_amz = amz_monthly[brand].get(latest,{}).get('sales',0)
+        if jan_amz == 0:
+            for m in range(12,0,-1):
+                jan_amz = amz_monthly[brand].get((2025,m),{}).get('sales',0)
+                if jan_amz > 0: break
+        meta = tts_meta.get(brand,{})
+        r_best=0;r_type='same';conf='INSUF';corr_rate=0.03
+        corr_attr=0;corr_capped=False
+        if active >= 3 and any(v>0 for v in amz_2025):
+            ta=np.array(tts_2025,dtype=float);aa=np.array(amz_2025,dtype=float);oa=np.array(org_2025,dtype=float)
+            cors=[]
+            if np.std(ta)>0 and np.std(aa)>0:
+                r,p=stats.pearsonr(ta,aa);cors.append((abs(r),r,'same'))
+            if np.std(ta)>0 and np.std(oa)>0:
+                r,p=stats.pearsonr(ta,oa);cors.append((abs(r),r,'org-same'))
+            if np.std(ta[:-1])>0 and np.std(aa[1:])>0:
+                r,p=stats.pearsonr(ta[:-1],aa[1:]);cors.append((abs(r),r,'lag+1'))
+            if np.std(ta[:-1])>0 and np.std(oa[1:])>0:
+                r,p=stats.pearsonr(ta[:-1],oa[1:]);cors.append((abs(r),r,'org-lag'))
+            if cors:
+                best=max(cors,key=lambda x:x[0]);r_best=best[1];r_type=best[2]
+            if abs(r_best)>=0.8:conf='HIGH';corr_rate=0.17
+            elif abs(r_best)>=0.5:conf='MED';corr_rate=0.12
+            elif abs(r_best)>=0.3:conf='LOW';corr_rate=0.06
+            else:conf='WEAK';corr_rate=0.02
+            if jan_tts>0 and jan_amz>0:
+                uc=jan_amz*corr_rate;cp=jan_tts*cap_mult
+                corr_attr=min(uc,cp);corr_capped=uc>cp
+        elif active<3:conf='INSUF';corr_rate=0.03
+        else:conf='WEAK';corr_rate=0.02
+        funnel_attr = 0; path_a = 0; path_b = 0; path_a_amz_vis = 0; path_b_amz_vis = 0
+        if vis > 0:
+            tts_buyer_count = jan_tts / amz_aov if amz_aov > 0 else 0
+            tts_buy_rate = min(tts_buyer_count / vis, 0.5) if vis > 0 else 0
+            non_buyers = vis * (1 - tts_buy_rate)
+            path_a_amz_vis = non_buyers * browse_rate
+            path_a = path_a_amz_vis * amz_conv * amz_aov
+        if imp > vis:
+            view_only = imp - vis
+            path_b_amz_vis = view_only * recall_rate
+            path_b = path_b_amz_vis * amz_conv * amz_aov
+        funnel_attr = path_a + path_b
+        total_amz_vis = path_a_amz_vis + path_b_amz_vis
+        brands.append({
+            'brand':brand, 'ps':meta.get('ps',''), 'status':meta.get('status',''),
+            'jan_tts':jan_tts, 'jan_amz':jan_amz, 'tts_total':sum(tts_2025),
+            'active_months':active,
+            'r_best':r_best, 'r_type':r_type, 'corr_rate':corr_rate,
+            'confidence':conf, 'corr_attr':corr_attr, 'corr_capped':corr_capped,
+            'funnel_attr':funnel_attr, 'path_a':path_a, 'path_b':path_b,
+            'path_a_vis':path_a_amz_vis, 'path_b_vis':path_b_amz_vis,
+            'total_amz_vis':total_amz_vis,
+            'impressions':imp, 'visitors':vis, 'videos':vid,
+            'live_streams':liv, 'creators':cre, 'affiliate_gmv':aff,
+            'tts_2025':tts_2025, 'amz_2025':amz_2025, 'org_2025':org_2025,
+        })
+    return brands
+
+
+# ── Comparison ────────────────────────────────────────────────────────────────
+
+def _same(a, b) -> bool:
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        return a == b or (math.isnan(a) and math.isnan(b))
+    return a == b
+
+
+def diff_rows(ref: list[dict], new: list[dict]) -> list[str]:
+    """Describe every field where the two brand lists disagree."""
+    if len(ref) != len(new):
+        return [f"row count {len(ref)} != {len(new)}"]
+    out = []
+    for r, n in zip(ref, new):
+        if r.keys() != n.keys():
+            out.append(f"{r['brand']}: keys differ")
+            continue
+        for k in r:
+            if not _same(r[k], n[k]):
+                out.append(f"{r['brand']}.{k}: {r[k]!r} != {n[k]!r}")
+    return out
+
+
+def _time(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+# The legacy loop always correlated over calendar 2025; its series keys
+# were renamed when the window became configurable
+WINDOW_2025 = [(2025, m) for m in range(1, 13)]
+LEGACY_KEYS = {'tts_2025': 'tts_series', 'amz_2025': 'amz_series', 'org_2025': 'org_series'}
+
+
+def legacy_rows(*args) -> list[dict]:
+    return [{LEGACY_KEYS.get(k, k): v for k, v in row.items()} for row in legacy_brand_models(*args)]
+
+
+def main(sizes: list[int]) -> None:
+    latest = (2026, 1)
+    print(f"{'brands':>8} {'legacy s':>10} {'columnar s':>11} {'speedup':>8}  match")
+    for n in sizes:
+        agg = make_aggregates(n)
+        ref = legacy_rows(*agg, latest)
+        new = compute_brand_models(*agg, latest, window=WINDOW_2025)
+        diffs = diff_rows(ref, new)
+        t_ref = _time(lambda: legacy_brand_models(*agg, latest))
+        t_new = _time(lambda: compute_brand_models(*agg, latest, window=WINDOW_2025))
+        print(f"{n:>8} {t_ref:>10.3f} {t_new:>11.3f} {t_ref / t_new:>7.1f}x  "
+              f"{'yes' if not diffs else f'NO ({len(diffs)} diffs)'}")
+        for d in diffs[:10]:
+            print("    ", d)
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000])
@@ -0,0 +1,110 @@
+"""
+bench_broadway_parser.py — openpyxl Broadway parse vs streaming reader
+
+Writes a synthetic Broadway workbook (synthetic.py), then times and memory-profiles the
+original openpyxl parse_broadway (kept verbatim below as the reference)
+against parsers.read_broadway, and checks both yield the same rows.
+
+Usage:
+    python benchmarks/bench_broadway_parser.py [n_rows_per_sheet ...]
+
+The defaults (2k and 10k rows per sheet) finish in under a minute; pass
+larger sizes, e.g. 100000, for the memory comparison at scale (the
+openpyxl reference alone takes minutes there).
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from parsers import sf, read_broadway  # noqa: E402
+from synthetic import make_broadway, MIN_YEAR  # noqa: E402
+
+
+# ── Reference: original openpyxl parser ───────────────────────────────────────
+
+def legacy_parse_broadway(fb):
+    import openpyxl
+    wb=openpyxl.load_workbook(BytesIO(fb),read_only=True,data_only=True)
+    pr,vr,ct=[],[],[]
+    if 'Partner Raw' in wb.sheetnames:
+        for i,row in enumerate(wb['Partner Raw'].iter_rows(values_only=True)):
+            if i==0:continue
+            v=list(row)
+            if not v[0]:continue
+            pr.append({'shop':str(v[0]),'gmv':sf(v[1]),
+                'impressions':sf(v[13]) if len(v)>13 else 0,
+                'visitors':sf(v[14]) if len(v)>14 else 0,
+                'affiliate_gmv':sf(v[10]) if len(v)>10 else 0,
+                'month':int(sf(v[18])) if len(v)>18 and v[18] else 0,
+                'year':int(sf(v[20])) if len(v)>20 and v[20] else 0})
+    if 'Partner Video Raw' in wb.sheetnames:
+        for i,row in enumerate(wb['Partner Video Raw'].iter_rows(values_only=True)):
+            if i==0:continue
+            v=list(row)
+            if not v[0]:continue
+            vr.append({'shop':str(v[0]),
+                'videos':sf(v[10]) if len(v)>10 else 0,
+                'lives':sf(v[9]) if len(v)>9 else 0,
+                'month':int(sf(v[13])) if len(v)>13 and v[13] else 0,
+                'year':int(sf(v[15])) if len(v)>15 and v[15] else 0})
+    if 'Retainer Creator TAP Data' in wb.sheetnames:
+        for i,row in enumerate(wb['Retainer Creator TAP Data'].iter_rows(values_only=True)):
+            if i==0:continue
+            v=list(row)
+            if not v[0]:continue
+            ct.append({'creator':str(v[5]) if len(v)>5 and v[5] else '',
+                'shop':str(v[10]) if len(v)>10 and v[10] else '',
+                'views':sf(v[18]) if len(v)>18 else 0,
+                'likes':sf(v[19]) if len(v)>19 else 0,
+                'month':int(sf(v[24])) if len(v)>24 and v[24] else 0,
+                'year':int(sf(v[26])) if len(v)>26 and v[26] else 0})
+    wb.close()
+    return {'pr':pr,'vr':vr,'ct':ct}
+
+
+def mismatches(ref: dict, new: dict) -> list[str]:
+    """Compare legacy rows (year-filtered) with the columnar output."""
+    out = []
+    for key in ("pr", "vr", "ct"):
+        rows = [r for r in ref[key] if r["year"] >= MIN_YEAR]
+        cols = new[key]
+        n = len(next(iter(cols.values())))
+        if len(rows) != n:
+            out.append(f"{key}: {len(rows)} rows != {n}")
+            continue
+        for f, col in cols.items():
+            vals = col.tolist() if hasattr(col, "tolist") else col
+            if [r[f] for r in rows] != vals:
+                out.append(f"{key}.{f} differs")
+    return out
+
+
+def _measure(fn):
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'rows/sheet':>10} {'openpyxl s':>11} {'stream s':>9} {'speedup':>8} "
+          f"{'openpyxl MB':>12} {'stream MB':>10}  match")
+    for n in sizes:
+        fb = make_broadway(n)
+        diffs = mismatches(legacy_parse_broadway(fb), read_broadway(fb, min_year=MIN_YEAR))
+        t_ref, m_ref = _measure(lambda: legacy_parse_broadway(fb))
+        t_new, m_new = _measure(lambda: read_broadway(fb, min_year=MIN_YEAR))
+        print(f"{n:>10} {t_ref:>11.2f} {t_new:>9.2f} {t_ref / t_new:>7.1f}x "
+              f"{m_ref:>12.1f} {m_new:>10.1f}  {'yes' if not diffs else diffs}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [2_000, 10_000])
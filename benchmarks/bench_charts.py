@@ -0,0 +1,60 @@
+"""
+bench_charts.py — Per-brand correlation charts vs one small-multiples grid
+
+Builds the Correlation view's figures both ways for synthetic brand ×
+month matrices: one Plotly figure per brand (as the Per brand layout
+draws them) and a single charts.correlation_grid figure. Reports build
+time and the JSON payload that st.plotly_chart would send the browser.
+
+Usage:
+    python benchmarks/bench_charts.py [n_brands ...]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from charts import correlation_grid  # noqa: E402
+from theme import BLU, GRN, CORAL, pthem  # noqa: E402
+
+MONTHS = [f"M{i + 1}" for i in range(12)]
+
+
+def matrices(n: int, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    tts = rng.gamma(2, 5_000, (n, len(MONTHS)))
+    amz = rng.gamma(2, 40_000, (n, len(MONTHS)))
+    return [f"Brand {i:04d}" for i in range(n)], tts, amz, amz * rng.uniform(.5, .9, (n, 1))
+
+
+def per_brand(names, tts, amz, org) -> list:
+    figs = []
+    for i in range(len(names)):
+        fig = make_subplots(specs=[[{"secondary_y": True}]])
+        fig.add_trace(go.Scatter(x=MONTHS, y=amz[i], name='AMZ', fill='tozeroy', line=dict(color=BLU, width=2)), secondary_y=False)
+        fig.add_trace(go.Scatter(x=MONTHS, y=org[i], name='Organic', line=dict(color=GRN, width=1.5, dash='dash')), secondary_y=False)
+        fig.add_trace(go.Bar(x=MONTHS, y=tts[i], name='TTS', marker=dict(color=CORAL, opacity=.75), width=.4), secondary_y=True)
+        figs.append(pthem(fig, 220))
+    return figs
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'brands':>7} {'layout':>10} {'figures':>8} {'build s':>8} {'JSON KB':>9}")
+    for n in sizes:
+        names, tts, amz, org = matrices(n)
+        for layout, build in (("per brand", lambda: per_brand(names, tts, amz, org)),
+                              ("grid", lambda: [correlation_grid(names, tts, amz, org, MONTHS)])):
+            t0 = time.perf_counter()
+            figs = build()
+            t_build = time.perf_counter() - t0
+            kb = sum(len(f.to_json()) for f in figs) / 1024
+            print(f"{n:>7} {layout:>10} {len(figs):>8} {t_build:>8.3f} {kb:>9.0f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [50, 500])
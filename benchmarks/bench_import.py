@@ -0,0 +1,66 @@
+"""
+bench_import.py — Import-time budget
+
+Measures cold import time of the headless modules with `python -X
+importtime` (best of several fresh interpreters) and checks each against
+its budget. Also fails if any of them pulls in the UI/plotting stack,
+which would slow down batch runs and ingest worker processes.
+
+Usage:
+    python benchmarks/bench_import.py [--repeat N]
+
+Exits non-zero when a budget is exceeded or a heavy module is imported.
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# module -> budget in ms (cumulative, including numpy)
+BUDGETS = {
+    "attribution_model": 150,
+    "ingest": 150,
+    "batch": 200,
+}
+
+# Never imported by the headless modules
+HEAVY = ("streamlit", "plotly", "scipy", "pandas", "matplotlib", "reportlab", "openpyxl")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure(module: str) -> tuple[float, set]:
+    """(cumulative ms for `module`, top-level packages imported) in a fresh interpreter."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    total, loaded = 0.0, set()
+    for m in _LINE.finditer(out):
+        name = m.group(4)
+        loaded.add(name.split(".")[0])
+        if name == module and len(m.group(3)) == 1:   # top level, not nested
+            total = int(m.group(2)) / 1000
+    return total, loaded
+
+
+def main(repeat: int) -> int:
+    failed = False
+    print(f"{'module':<20} {'ms':>8} {'budget':>8}  heavy imports")
+    for module, budget in BUDGETS.items():
+        runs = [measure(module) for _ in range(repeat)]
+        best = min(ms for ms, _ in runs)
+        heavy = sorted(set(HEAVY) & runs[0][1])
+        over = best > budget
+        failed |= over or bool(heavy)
+        print(f"{module:<20} {best:>8.1f} {budget:>8}  {', '.join(heavy) or '-'}"
+              f"{'  OVER BUDGET' if over else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    sys.exit(main(ap.parse_args().repeat))
@@ -0,0 +1,49 @@
+"""
+bench_ingest.py — Serial vs process-pool upload ingestion
+
+Times ingest.ingest with one worker against the process pool on synthetic
+uploads, and checks both return the same parsed data. Speedup depends on
+available cores (os.cpu_count()).
+
+Usage:
+    python benchmarks/bench_ingest.py [n_rows_per_sheet] [workers]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import ingest  # noqa: E402
+from synthetic import make_amazon, make_broadway, make_gmv, MIN_YEAR  # noqa: E402
+
+
+def same(a, b) -> bool:
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, np.ndarray):
+        return np.array_equal(a, b)
+    return a == b
+
+
+def main(n_rows: int, workers: int | None) -> None:
+    files = dict(gmv_bytes=make_gmv(), bw_bytes=make_broadway(n_rows), amz_bytes=make_amazon())
+    workers = workers or ingest.default_workers()
+    t0 = time.perf_counter()
+    serial = ingest.ingest(**files, min_year=MIN_YEAR, workers=1)
+    t_serial = time.perf_counter() - t0
+    ingest.ingest(**files, min_year=MIN_YEAR, workers=workers)   # warm the pool
+    t0 = time.perf_counter()
+    pooled = ingest.ingest(**files, min_year=MIN_YEAR, workers=workers)
+    t_pool = time.perf_counter() - t0
+    ingest.shutdown()
+    print(f"rows/sheet={n_rows} cores={os.cpu_count()} workers={workers}")
+    print(f"serial {t_serial:.2f}s  pool {t_pool:.2f}s  speedup {t_serial / t_pool:.1f}x  "
+          f"match {'yes' if same(serial, pooled) else 'NO'}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(args[0] if args else 20_000, args[1] if len(args) > 1 else None)
@@ -0,0 +1,56 @@
+"""
+bench_lag_scan.py — FFT lag scan vs one correlation per lag
+
+Times attribution_engine.lag_correlations (all lags 0..K from one FFT
+cross-correlation plus prefix sums) against calling batched_pearson on
+each lag's overlapping slices, and checks the two agree.
+
+Usage:
+    python benchmarks/bench_lag_scan.py [n_brands ...] [--months 24] [--max-lag 12]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from attribution_engine import batched_pearson, lag_correlations  # noqa: E402
+
+
+def per_lag(x: np.ndarray, y: np.ndarray, max_lag: int) -> np.ndarray:
+    m = x.shape[1]
+    return np.stack([batched_pearson(x[:, :m - k], y[:, k:]) for k in range(max_lag + 1)], axis=1)
+
+
+def _time(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(sizes: list[int], months: int, max_lag: int) -> None:
+    print(f"{'brands':>7} {'lags':>5} {'per-lag s':>10} {'fft s':>8} {'speedup':>8}  match")
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        x = rng.gamma(2, 5_000, (n, months))
+        y = 3 * x + rng.gamma(2, 40_000, (n, months))
+        ref, (new, _) = per_lag(x, y, max_lag), lag_correlations(x, y, max_lag)
+        match = "yes" if np.allclose(ref, new, equal_nan=True) else "NO"
+        t_ref = _time(lambda: per_lag(x, y, max_lag))
+        t_new = _time(lambda: lag_correlations(x, y, max_lag))
+        print(f"{n:>7} {max_lag + 1:>5} {t_ref:>10.3f} {t_new:>8.3f} {t_ref / t_new:>7.1f}x  {match}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("sizes", nargs="*", type=int, default=[1_000, 10_000])
+    ap.add_argument("--months", type=int, default=24)
+    ap.add_argument("--max-lag", type=int, default=12)
+    args = ap.parse_args()
+    main(args.sizes, args.months, args.max_lag)
@@ -0,0 +1,113 @@
+"""
+bench_lift_engine.py — Staged vs fused lift pipeline
+
+Times lift_engine's staged functions (prepare_data → compute_rolling_baseline
+→ compute_lift_metrics → apply_confidence_flags) against run_fused_pipeline
+on synthetic brand × month detail frames, and checks both give the same
+frame. With --workers, also times run_parallel_pipeline (detail + summary)
+at each worker count against fused + compute_brand_summary. With
+--compact, compares the object-dtype detail frame with the compact schema
+(run_compact_pipeline): memory, pipeline time and brand-summary groupby
+time.
+
+Usage:
+    python benchmarks/bench_lift_engine.py [n_brands ...] [--workers 1,2,4] [--compact]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lift_engine import (  # noqa: E402
+    prepare_data, compute_rolling_baseline, compute_lift_metrics,
+    apply_confidence_flags, run_fused_pipeline, run_parallel_pipeline, run_compact_pipeline,
+    compute_brand_summary, PARALLEL_MIN_ROWS,
+)
+from synthetic import make_lift_frame  # noqa: E402
+
+WINDOW = 3
+
+
+def staged(df: pd.DataFrame) -> pd.DataFrame:
+    df = prepare_data(df)
+    df = compute_rolling_baseline(df, window=WINDOW)
+    df = compute_lift_metrics(df)
+    return apply_confidence_flags(df, window=WINDOW)
+
+
+def _time(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def fused_with_summary(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    detail = run_fused_pipeline(df, window=WINDOW)
+    return detail, compute_brand_summary(detail)
+
+
+def scaling(sizes: list[int], workers: list[int]) -> None:
+    """Frames under PARALLEL_MIN_ROWS run fused (path 'fused'); the pool is warm after the first call."""
+    print(f"\n{'rows':>10} {'workers':>8} {'path':>6} {'fused s':>8} {'parallel s':>11} {'speedup':>8}  match")
+    for n in sizes:
+        df = make_lift_frame(n)
+        ref = fused_with_summary(df)
+        t_ref = _time(lambda: fused_with_summary(df))
+        for w in workers:
+            new = run_parallel_pipeline(df, window=WINDOW, workers=w)
+            try:
+                pd.testing.assert_frame_equal(ref[0], new[0], check_exact=False, rtol=1e-9)
+                pd.testing.assert_frame_equal(ref[1], new[1], check_exact=False, rtol=1e-9)
+                match = "yes"
+            except AssertionError as e:
+                match = f"NO ({str(e).splitlines()[0]})"
+            t_new = _time(lambda: run_parallel_pipeline(df, window=WINDOW, workers=w))
+            path = "fused" if len(df) < PARALLEL_MIN_ROWS else "pool" if w > 1 else "serial"
+            print(f"{len(df):>10} {w:>8} {path:>6} {t_ref:>8.3f} {t_new:>11.3f} {t_ref / t_new:>7.1f}x  {match}")
+
+
+def compact(sizes: list[int]) -> None:
+    print(f"\n{'rows':>10} {'schema':>7} {'MB':>8} {'pipeline s':>11} {'summary s':>10}")
+    for n in sizes:
+        df = make_lift_frame(n)
+        for name, fn in (("object", run_fused_pipeline), ("compact", run_compact_pipeline)):
+            detail = fn(df, window=WINDOW)
+            mb = detail.memory_usage(deep=True).sum() / 1e6
+            t_run = _time(lambda: fn(df, window=WINDOW))
+            t_sum = _time(lambda: compute_brand_summary(detail))
+            print(f"{len(df):>10} {name:>7} {mb:>8.1f} {t_run:>11.3f} {t_sum:>10.3f}")
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'rows':>10} {'staged s':>9} {'fused s':>8} {'speedup':>8}  match")
+    for n in sizes:
+        df = make_lift_frame(n)
+        ref, new = staged(df), run_fused_pipeline(df, window=WINDOW)
+        try:
+            pd.testing.assert_frame_equal(ref, new, check_exact=False, rtol=1e-9)
+            match = "yes"
+        except AssertionError as e:
+            match = f"NO ({str(e).splitlines()[0]})"
+        t_ref = _time(lambda: staged(df))
+        t_new = _time(lambda: run_fused_pipeline(df, window=WINDOW))
+        print(f"{len(df):>10} {t_ref:>9.3f} {t_new:>8.3f} {t_ref / t_new:>7.1f}x  {match}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("sizes", nargs="*", type=int, default=[1_000, 10_000])
+    ap.add_argument("--workers", help="comma list of worker counts for the parallel pipeline")
+    ap.add_argument("--compact", action="store_true", help="compare the compact schema with object dtypes")
+    args = ap.parse_args()
+    main(args.sizes)
+    if args.compact:
+        compact(args.sizes)
+    if args.workers:
+        scaling(args.sizes, [int(w) for w in args.workers.split(",")])
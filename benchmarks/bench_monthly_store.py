@@ -0,0 +1,141 @@
+"""
+bench_monthly_store.py — Full rebuild vs incremental month merge
+
+Builds a MonthlyStore from synthetic history and scores last month's
+trailing window, as the previous run would have. Then merges one new
+month (plus a restated window month) and scores the new month, whose
+window has moved by one month:
+
+  full     prepare_brand_arrays over the whole history
+  rebuild  merge, then recompute the running sums over the new window
+  slide    merge, then slide the sums by the month leaving / entering
+  sums     the slide's sum update alone (vs. the rebuild's)
+
+and checks the store's arrays agree with the full recompute and the slid
+sums with a rebuild. A second table times merge() alone at a fixed window
+for a growing number of restated cells, against a rebuild of the sums.
+
+Usage:
+    python benchmarks/bench_monthly_store.py [n_brands ...]
+"""
+
+import os
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+from attribution_engine import prepare_brand_arrays  # noqa: E402
+from monthly_store import MonthlyStore, RESYNC_SLIDES  # noqa: E402
+from time_axis import resolve_window  # noqa: E402
+from synthetic import make_aggregates  # noqa: E402
+
+
+def new_month(tts_monthly, amz_monthly, content, ym, restate, seed=1):
+    """Only the cells a monthly export adds: month `ym`, plus a restated window month."""
+    rng = np.random.default_rng(seed)
+    tts = defaultdict(dict)
+    amz = defaultdict(dict)
+    con = defaultdict(dict)
+    for b in amz_monthly:
+        tts[b][ym] = float(rng.uniform(0, 5e4))
+        amz[b][ym] = {'sales': float(rng.uniform(1e3, 5e5)), 'ad_sales': 0.0, 'organic': 0.0, 'page_views': 0}
+        amz[b][ym]['organic'] = amz[b][ym]['sales']
+        con[b][ym] = {'gmv': tts[b][ym], 'impressions': float(rng.uniform(0, 1e6)), 'visitors': 0,
+                      'affiliate_gmv': 0, 'videos': 0, 'lives': 0, 'views': 0, 'likes': 0, 'creators': set()}
+        if b in tts_monthly and restate in tts_monthly[b]:
+            tts[b][restate] = tts_monthly[b][restate] * 1.01
+    return tts, amz, con
+
+
+def _apply(history, delta):
+    for h, d in zip(history, delta):
+        for b, ms in d.items():
+            h[b].update(ms)
+
+
+def agree(ref: dict, new: dict) -> bool:
+    for k, a in ref.items():
+        b = new[k]
+        if isinstance(a, np.ndarray) and a.dtype.kind == "f":
+            if not np.allclose(a, b, rtol=1e-9, atol=1e-9, equal_nan=True):
+                return False
+        elif list(a) != list(b):
+            return False
+    return True
+
+
+def primed_store(aggregates, prev: tuple) -> MonthlyStore:
+    store = MonthlyStore()
+    store.merge(*aggregates)
+    store.brand_arrays(aggregates[4], prev)
+    return store
+
+
+def _timed(fn) -> tuple:
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main(sizes: list[int]) -> None:
+    prev, ym, restate = (2026, 1), (2026, 2), (2025, 6)
+    print(f"{'brands':>8} {'full s':>8} {'rebuild s':>10} {'slide s':>8} {'speedup':>8} "
+          f"{'sums x':>7}  agree")
+    for n in sizes:
+        aggregates = make_aggregates(n)
+        tts_monthly, amz_monthly, content, tts_meta, names = aggregates
+        slid, rebuilt = primed_store(aggregates, prev), primed_store(aggregates, prev)
+        rebuilt.slides = RESYNC_SLIDES   # forces the rebuild path
+
+        delta = new_month(tts_monthly, amz_monthly, content, ym, restate)
+        _apply((tts_monthly, amz_monthly, content), delta)
+
+        ref, t_full = _timed(lambda: prepare_brand_arrays(tts_monthly, amz_monthly, content, tts_meta, names, ym))
+        _, t_rebuild = _timed(lambda: (rebuilt.merge(*delta), rebuilt.brand_arrays(names, ym)))
+        got = None
+
+        def run_slide():
+            nonlocal got
+            slid.merge(*delta)
+            got = slid.brand_arrays(names, ym)
+        _, t_slide = _timed(run_slide)
+
+        # The sum update alone, on fresh copies moved from last month's window
+        window = resolve_window(12, ym)
+        a, b = primed_store(aggregates, prev), primed_store(aggregates, prev)
+        b.slides = RESYNC_SLIDES
+        _, t_sums_slide = _timed(lambda: a.set_window(window))
+        _, t_sums_rebuild = _timed(lambda: b.set_window(window))
+
+        ok = agree(ref, got) and np.allclose(slid.sums, rebuilt.sums, rtol=1e-9, atol=1e-6)
+        print(f"{n:>8} {t_full:>8.3f} {t_rebuild:>10.3f} {t_slide:>8.3f} {t_full / t_slide:>7.1f}x "
+              f"{t_sums_rebuild / t_sums_slide:>6.1f}x  {'yes' if ok else 'NO'}")
+
+
+def delta_scaling(n: int, counts=(10, 100, 1_000, 10_000)) -> None:
+    """merge() time for `counts` restated window cells, window fixed."""
+    aggregates = make_aggregates(n)
+    tts_monthly = aggregates[0]
+    store = primed_store(aggregates, (2026, 1))
+    cells = [(b, ym) for b, ms in tts_monthly.items() for ym in ms if ym in set(store.window)]
+    _, t_rebuild = _timed(store.rebuild)
+    print(f"\n{n} brands, window fixed: rebuild() {t_rebuild:.4f} s")
+    print(f"{'changed':>8} {'merge s':>8} {'per cell us':>12}")
+    for k in counts:
+        if k > len(cells):
+            break
+        delta = defaultdict(dict)
+        for b, ym in cells[:k]:
+            delta[b][ym] = tts_monthly[b][ym] * 1.01 + 1
+        _, t = _timed(lambda: store.merge(delta))
+        print(f"{k:>8} {t:>8.4f} {t / k * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [1_000, 10_000]
+    main(sizes)
+    delta_scaling(max(sizes))
@@ -0,0 +1,152 @@
+"""
+bench_suite.py — End-to-end regression benchmark
+
+Generates a synthetic upload set per scale (synthetic.py), then times and
+memory-profiles each stage a month-end run goes through:
+
+  read_broadway     Broadway workbook parse (streaming reader)
+  parse_amazon      Amazon "Brands > Aggregations" parse
+  parse_gmv_csv     GMV CSV parse
+  build_model       aggregate + correlate + parameters for the latest month
+  run_lift_analysis lift_engine on a detail frame of the same brand count
+
+Each stage is timed as the best of --repeat runs and then run once more
+under tracemalloc for its peak traced allocation. Results go to a JSON
+file with the environment alongside, and --compare checks them against an
+earlier run.
+
+Usage:
+    python benchmarks/bench_suite.py [--scales 200:5000,1000:50000] [--repeat 3]
+                                     [-o results.json] [--compare baseline.json]
+                                     [--tolerance 0.25]
+
+A scale is BRANDS:ROWS (Broadway rows per sheet). --compare exits
+non-zero when any stage is slower than the baseline by more than
+--tolerance (a fraction).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from parsers import read_broadway, parse_amazon, parse_gmv_csv  # noqa: E402
+from attribution_model import BRAND_MAP, build_model  # noqa: E402
+from lift_engine import run_lift_analysis  # noqa: E402
+from synthetic import make_dataset, make_lift_frame, MIN_YEAR  # noqa: E402
+
+DEFAULT_SCALES = "200:5000,1000:50000"
+SCHEMA_VERSION = 1
+
+
+def _measure(fn, repeat: int) -> dict:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(best, 6), "peak_mb": round(peak / 2**20, 3)}
+
+
+def stages(n_brands: int, n_rows: int) -> list[tuple]:
+    """(name, fn) for every benchmarked stage at one scale."""
+    files = make_dataset(n_brands, n_rows)
+    gmv = parse_gmv_csv(files["gmv"])
+    broadway = read_broadway(files["broadway"], min_year=MIN_YEAR)
+    amazon = parse_amazon(files["amazon"])
+    lift = make_lift_frame(n_brands)
+    return [
+        ("read_broadway", lambda: read_broadway(files["broadway"], min_year=MIN_YEAR)),
+        ("parse_amazon", lambda: parse_amazon(files["amazon"])),
+        ("parse_gmv_csv", lambda: parse_gmv_csv(files["gmv"])),
+        ("build_model", lambda: build_model(gmv, broadway, amazon, dict(BRAND_MAP))),
+        ("run_lift_analysis", lambda: run_lift_analysis(lift)),
+    ]
+
+
+def environment() -> dict:
+    import numpy as np
+    import pandas as pd
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(scales: list[tuple], repeat: int, log=print) -> dict:
+    results = []
+    for n_brands, n_rows in scales:
+        for name, fn in stages(n_brands, n_rows):
+            r = {"stage": name, "brands": n_brands, "rows": n_rows, **_measure(fn, repeat)}
+            results.append(r)
+            log(f"{name:<18} {n_brands:>7} {n_rows:>8} {r['seconds']:>9.3f} {r['peak_mb']:>9.1f}")
+    return {"schema": SCHEMA_VERSION, "environment": environment(), "repeat": repeat, "results": results}
+
+
+def compare(current: dict, baseline: dict, tolerance: float, log=print) -> bool:
+    """Print per-stage ratios against `baseline`; False if any stage regressed."""
+    ref = {(r["stage"], r["brands"], r["rows"]): r for r in baseline["results"]}
+    ok = True
+    log(f"\n{'stage':<18} {'brands':>7} {'rows':>8} {'time x':>7} {'mem x':>7}")
+    for r in current["results"]:
+        b = ref.get((r["stage"], r["brands"], r["rows"]))
+        if b is None:
+            continue
+        t_ratio = r["seconds"] / b["seconds"] if b["seconds"] else float("inf")
+        m_ratio = r["peak_mb"] / b["peak_mb"] if b["peak_mb"] else float("inf")
+        slow = t_ratio > 1 + tolerance
+        ok &= not slow
+        log(f"{r['stage']:<18} {r['brands']:>7} {r['rows']:>8} {t_ratio:>6.2f}x {m_ratio:>6.2f}x"
+            f"{'  REGRESSION' if slow else ''}")
+    return ok
+
+
+def parse_scales(s: str) -> list[tuple]:
+    return [tuple(int(x) for x in part.split(":")) for part in s.split(",") if part]
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scales", type=parse_scales, default=parse_scales(DEFAULT_SCALES))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("-o", "--output", default="bench_results.json")
+    ap.add_argument("--compare", help="earlier results JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    args = ap.parse_args(argv)
+
+    print(f"{'stage':<18} {'brands':>7} {'rows':>8} {'seconds':>9} {'peak MB':>9}")
+    current = run(args.scales, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"wrote {os.path.abspath(args.output)}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(current, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
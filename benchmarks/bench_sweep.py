@@ -0,0 +1,67 @@
+"""
+bench_sweep.py — Parameter sweep vs one light-stage pass per combination
+
+Times attribution_engine.sweep over a full five-parameter grid against
+running parameter_columns at every grid point (the sliders' light stage,
+once per combination) on a subsample of the points, and checks the
+portfolio totals agree there.
+
+Usage:
+    python benchmarks/bench_sweep.py [n_brands ...] [--steps 10] [--check 200]
+"""
+
+import os
+import sys
+import time
+import argparse
+import itertools
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from attribution_engine import SWEEP_PARAMS, parameter_columns, sweep, tier_rate  # noqa: E402
+
+# Sidebar slider ranges, in model units
+RANGES = {"cap_mult": (2, 8), "browse_rate": (0.05, 0.40), "recall_rate": (0.001, 0.010),
+          "amz_conv": (0.05, 0.20), "amz_aov": (15, 75)}
+
+
+def make_arrays(n: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    tts = rng.gamma(2, 5_000, n)
+    return {"jan_tts": tts, "jan_amz": rng.gamma(2, 40_000, n),
+            "corr_rate": tier_rate(rng.uniform(0, 1, n)), "scored": rng.uniform(size=n) < 0.8,
+            "visitors": rng.gamma(2, 2_000, n), "impressions": rng.gamma(2, 200_000, n)}
+
+
+def main(sizes: list[int], steps: int, check: int) -> None:
+    grid = {p: np.linspace(*RANGES[p], steps) for p in SWEEP_PARAMS}
+    print(f"{'brands':>7} {'combos':>8} {'sweep s':>8} {'loop s (est)':>13} {'speedup':>8}  match")
+    for n in sizes:
+        arrays = make_arrays(n)
+        t0 = time.perf_counter()
+        res = sweep(arrays, grid)
+        t_sweep = time.perf_counter() - t0
+
+        points = list(itertools.product(*(range(steps) for _ in SWEEP_PARAMS)))
+        sample = np.random.default_rng(1).choice(len(points), size=min(check, len(points)), replace=False)
+        ok = True
+        t0 = time.perf_counter()
+        for i in sample:
+            idx = points[i]
+            cols = parameter_columns(arrays, **{p: grid[p][j] for p, j in zip(SWEEP_PARAMS, idx)},
+                                     fields=["corr_attr", "funnel_attr"])
+            ok &= np.isclose(sum(cols["corr_attr"]), res["corr_attr"][idx], rtol=1e-9)
+            ok &= np.isclose(sum(cols["funnel_attr"]), res["funnel_attr"][idx], rtol=1e-9)
+        t_loop = (time.perf_counter() - t0) / len(sample) * len(points)
+        print(f"{n:>7} {len(points):>8} {t_sweep:>8.3f} {t_loop:>13.2f} {t_loop / t_sweep:>7.0f}x  "
+              f"{'yes' if ok else 'NO'}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("sizes", nargs="*", type=int, default=[300, 3_000])
+    ap.add_argument("--steps", type=int, default=10, help="values per parameter (combos = steps^5)")
+    ap.add_argument("--check", type=int, default=200, help="grid points run through parameter_columns")
+    args = ap.parse_args()
+    main(args.sizes, args.steps, args.check)
@@ -0,0 +1,94 @@
+"""
+bench_validate.py — Single-pass validation
+
+Times the previous validate_data + prepare_data (Month parsed twice,
+column-by-column checks, first structural error wins) against
+validate_frame + prepare_data reusing the report's parsed months, on large
+synthetic detail frames. Also injects bad rows and prints what each
+version reports.
+
+Usage:
+    python benchmarks/bench_validate.py [n_brands ...]
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+from lift_engine import REQUIRED_COLUMNS, validate_frame, prepare_data  # noqa: E402
+from bench_lift_engine import _time  # noqa: E402
+from synthetic import make_lift_frame  # noqa: E402
+
+
+def legacy_validate(df: pd.DataFrame) -> tuple[bool, list[str]]:
+    """validate_data as it was before validate_frame."""
+    errors = []
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        errors.append(f"Missing required columns: {', '.join(missing)}")
+        return False, errors
+    if len(df) == 0:
+        errors.append("Dataset is empty.")
+        return False, errors
+    for col in [c for c in REQUIRED_COLUMNS if c not in ("Brand", "Month")]:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            errors.append(f"Column '{col}' must be numeric.")
+    if (df["Amazon_Sales"] < 0).any():
+        errors.append("Amazon_Sales contains negative values.")
+    try:
+        pd.to_datetime(df["Month"], format="%Y-%m")
+    except (ValueError, TypeError):
+        errors.append("Month column must be in YYYY-MM format (e.g., 2024-01).")
+    return len(errors) == 0, errors
+
+
+def legacy(df: pd.DataFrame) -> pd.DataFrame:
+    legacy_validate(df)
+    return prepare_data(df)
+
+
+def single_pass(df: pd.DataFrame) -> pd.DataFrame:
+    return prepare_data(df, validate_frame(df))
+
+
+def with_bad_rows(df: pd.DataFrame, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    rows = rng.choice(len(df), 12, replace=False)
+    df.loc[rows[:4], "Amazon_Sales"] = -1.0
+    df["Month"] = df["Month"].astype(object)
+    df.loc[rows[4:8], "Month"] = "Jan 2024"
+    df["TikTok_Clicks"] = df["TikTok_Clicks"].astype(object)
+    df.loc[rows[8:], "TikTok_Clicks"] = "n/a"
+    return df
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'rows':>10} {'stage':>16} {'legacy s':>9} {'single s':>9} {'speedup':>8}  match")
+    for n in sizes:
+        df = make_lift_frame(n)
+        ref, new = legacy(df), single_pass(df)
+        match = "yes" if ref.equals(new) else "NO"
+        for stage, old_fn, new_fn in (("validate", legacy_validate, validate_frame),
+                                      ("validate+prepare", legacy, single_pass)):
+            t_ref = _time(lambda: old_fn(df))
+            t_new = _time(lambda: new_fn(df))
+            print(f"{len(df):>10} {stage:>16} {t_ref:>9.3f} {t_new:>9.3f} {t_ref / t_new:>7.1f}x  {match}")
+
+    bad = with_bad_rows(make_lift_frame(sizes[0]))
+    print("\nlegacy errors:")
+    for e in legacy_validate(bad)[1]:
+        print(f"  {e}")
+    report = validate_frame(bad)
+    print("validate_frame errors:")
+    for e in report.errors:
+        print(f"  {e}")
+    print("problem rows:", {k: len(v) for k, v in report.problems.items()})
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000])
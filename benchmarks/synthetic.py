@@ -0,0 +1,299 @@
+"""
+synthetic.py — Deterministic Synthetic Uploads
+
+Generates every input the app and the lift engine read, at any scale and
+byte-for-byte reproducible for a given seed:
+
+  - Broadway Tool workbook (.xlsm): Partner Raw, Partner Video Raw and
+    Retainer Creator TAP Data, in the column layout parsers.BROADWAY_SHEETS
+    reads
+  - Amazon "Brands > Aggregations" report (.xlsx), one row per brand and
+    month
+  - Monthly GMV CSV, one row per brand with a "<Month> <Year>" column per
+    month
+  - lift_engine detail frames (sample_data.csv layout)
+  - build_model-shaped monthly aggregates
+
+Brands share one TTS GMV / Amazon sales signal across the files (Amazon
+sales follow TTS GMV with brand-specific strength and noise), and raw names
+carry the decorations the brand resolver strips ("Shop", "(US)"), so a
+generated set exercises name resolution and gives non-trivial correlations.
+
+Usage (writes gmv.csv, broadway.xlsm, amazon.xlsx and lift.csv):
+    python benchmarks/synthetic.py OUT_DIR [--brands 400] [--rows 20000] [--seed 0]
+"""
+
+import os
+import re
+import sys
+import zipfile
+import argparse
+import datetime
+from collections import defaultdict
+from io import BytesIO
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from time_axis import month_range  # noqa: E402
+
+# Report months the generators cover by default: Jan 2024 – Jan 2026
+DEFAULT_MONTHS = month_range((2024, 1), (2026, 1))
+MIN_YEAR = 2025
+N_BRANDS = 400
+
+# Fixed workbook and archive timestamps, so output depends only on the seed
+_STAMP = datetime.datetime(2026, 1, 1)
+
+
+def brand_names(n_brands: int) -> list[str]:
+    """Canonical brand names, as the Amazon report spells them."""
+    return [f"Brand {i:04d}" for i in range(n_brands)]
+
+
+def _shop_name(brand: str, i: int) -> str:
+    """Broadway shop name for a brand: mostly '<brand> Shop'."""
+    return f"{brand} Shop" if i % 3 else brand
+
+
+def brand_signals(n_brands: int = N_BRANDS, months=None, seed: int = 0) -> dict:
+    """
+    Per-brand monthly signals, brand × month arrays shared by every file:
+    'tts' (TTS GMV), 'amz' (Amazon total sales), 'ad_share' (ad sales
+    fraction) and 'page_views'. One brand in ten has no TTS activity and
+    one in five a weak (noise-dominated) Amazon response.
+    """
+    months = list(months or DEFAULT_MONTHS)
+    rng = np.random.default_rng(seed)
+    t = np.arange(len(months))
+    season = 1 + 0.25 * np.sin(2 * np.pi * (np.array([m for _, m in months]) - 3) / 12)
+    level = rng.lognormal(9, 1.2, (n_brands, 1))
+    trend = 1 + rng.normal(0.02, 0.03, (n_brands, 1)) * t
+    tts = level * season * np.clip(trend, 0.1, None) * rng.lognormal(0, 0.35, (n_brands, len(months)))
+    tts[np.arange(n_brands) % 10 == 0] = 0
+    # Launch months: no TTS before a brand's start
+    start = rng.integers(0, len(months) // 2, n_brands)
+    tts[t[None, :] < start[:, None]] = 0
+
+    base = rng.lognormal(10.5, 1.0, (n_brands, 1))
+    beta = rng.uniform(0.5, 4, (n_brands, 1))
+    beta[np.arange(n_brands) % 5 == 1] = 0.05
+    amz = base * season + beta * tts + rng.normal(0, 1, tts.shape) * base * 0.15
+    amz = np.maximum(amz, 0)
+    return {
+        "months": months,
+        "brands": brand_names(n_brands),
+        "tts": tts,
+        "amz": amz,
+        "ad_share": rng.uniform(0, 0.4, tts.shape),
+        "page_views": amz / rng.uniform(20, 60, (n_brands, 1)),
+    }
+
+
+def _save(wb) -> bytes:
+    """Workbook bytes with fixed timestamps (openpyxl stamps 'now' on save)."""
+    wb.properties.created = _STAMP
+    raw = BytesIO()
+    wb.save(raw)
+    stamp = _STAMP.strftime("%Y-%m-%dT%H:%M:%SZ").encode()
+    out = BytesIO()
+    with zipfile.ZipFile(raw) as src, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            data = src.read(info)
+            if info.filename == "docProps/core.xml":
+                data = re.sub(rb"(<dcterms:modified[^>]*>)[^<]*", rb"\g<1>" + stamp, data)
+            dst.writestr(zipfile.ZipInfo(info.filename, _STAMP.timetuple()[:6]), data)
+    return out.getvalue()
+
+
+# ── Upload Files ──────────────────────────────────────────────────────────────
+
+def make_gmv(n_brands: int = N_BRANDS, months=None, seed: int = 0) -> bytes:
+    """Monthly GMV CSV bytes: Brand, Type, Owner, Status, then one column per month."""
+    sig = brand_signals(n_brands, months, seed)
+    rng = np.random.default_rng(seed + 1)
+    header = ["Brand", "Type", "Owner", "Status"] + [
+        datetime.date(y, m, 1).strftime("%B %Y") for y, m in sig["months"]]
+    lines = [",".join(header)]
+    kinds = np.array(["Partner", "Retainer", "Partner", "Self-Serve"])
+    for i, brand in enumerate(sig["brands"]):
+        status = "Active" if rng.random() < 0.9 else "Paused"
+        values = ",".join(f"{v:.2f}" if v else "" for v in sig["tts"][i])
+        lines.append(f'"{brand}",{kinds[i % 4]},owner{i % 17},{status},{values}')
+    lines.append("Total,,,," + ",".join(f"{v:.2f}" for v in sig["tts"].sum(axis=0)))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def make_amazon(n_brands: int = N_BRANDS, months=None, seed: int = 0) -> bytes:
+    """Amazon 'Brands > Aggregations' XLSX bytes, one row per brand and month."""
+    import openpyxl
+    sig = brand_signals(n_brands, months, seed)
+    rng = np.random.default_rng(seed + 2)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Brands > Aggregations")
+    ws.append(["Brand", "Start Date", "End Date", "Total Sales $", "Ad Sales $", "Total Page Views"])
+    for i, brand in enumerate(sig["brands"]):
+        raw = f"{brand} (US)" if i % 11 == 0 else brand
+        for k, (y, m) in enumerate(sig["months"]):
+            sales = float(sig["amz"][i, k])
+            if sales <= 0:
+                continue
+            start = datetime.datetime(y, m, 1)
+            end = datetime.datetime(y + m // 12, m % 12 + 1, 1) - datetime.timedelta(days=1)
+            # Some exports carry dates as text
+            if rng.random() < 0.05:
+                start, end = start.strftime("%Y-%m-%d 00:00:00"), end.strftime("%Y-%m-%d 00:00:00")
+            ws.append([raw, start, end, round(sales, 2), round(sales * sig["ad_share"][i, k], 2),
+                       int(sig["page_views"][i, k])])
+    return _save(wb)
+
+
+def make_broadway(n_rows: int, seed: int = 0, n_brands: int = N_BRANDS, months=None) -> bytes:
+    """
+    Broadway-shaped XLSM bytes with n_rows data rows per sheet. Rows are
+    spread over random brand-months; Partner Raw GMV splits each
+    brand-month's TTS signal across its rows.
+    """
+    import openpyxl
+    sig = brand_signals(n_brands, months, seed)
+    months = sig["months"]
+    rng = np.random.default_rng(seed + 3)
+    shops = [_shop_name(b, i) for i, b in enumerate(sig["brands"])]
+    wb = openpyxl.Workbook(write_only=True)
+
+    def cells():
+        b = rng.integers(0, n_brands, n_rows)
+        k = rng.integers(0, len(months), n_rows)
+        return b, k
+
+    ws = wb.create_sheet("Partner Raw")
+    ws.append([f"h{i}" for i in range(22)])
+    b, k = cells()
+    per_cell = np.bincount(b * len(months) + k, minlength=n_brands * len(months))[b * len(months) + k]
+    gmv = sig["tts"][b, k] / per_cell * rng.uniform(0.5, 1.5, n_rows)
+    filler = rng.random((n_rows, 22))
+    for r in range(n_rows):
+        y, m = months[k[r]]
+        row = filler[r].tolist()
+        row[0] = shops[b[r]]; row[1] = round(float(gmv[r]), 2)
+        row[10] = round(float(gmv[r]) * 0.1, 2); row[13] = int(gmv[r] * 20) + int(filler[r, 13] * 1000)
+        row[14] = int(gmv[r] / 5); row[18] = m; row[20] = y
+        ws.append(row)
+
+    ws = wb.create_sheet("Partner Video Raw")
+    ws.append([f"h{i}" for i in range(16)])
+    b, k = cells()
+    lives, videos = rng.integers(0, 5, n_rows), rng.integers(0, 60, n_rows)
+    for r in range(n_rows):
+        y, m = months[k[r]]
+        row = [shops[b[r]]] + [None] * 15
+        row[9] = int(lives[r]); row[10] = int(videos[r]); row[13] = m; row[15] = y
+        ws.append(row)
+
+    ws = wb.create_sheet("Retainer Creator TAP Data")
+    ws.append([f"h{i}" for i in range(27)])
+    b, k = cells()
+    creators = rng.integers(0, max(50, n_rows // 4), n_rows)
+    views, likes = rng.integers(0, 10**5, n_rows), rng.integers(0, 10**4, n_rows)
+    for r in range(n_rows):
+        y, m = months[k[r]]
+        row = [r + 1] + [None] * 26
+        row[5] = f"creator{creators[r]}"; row[10] = shops[b[r]]
+        row[18] = int(views[r]); row[19] = int(likes[r]); row[24] = m; row[26] = y
+        ws.append(row)
+
+    return _save(wb)
+
+
+# ── Engine Inputs ─────────────────────────────────────────────────────────────
+
+def make_lift_frame(n_brands: int, n_months: int = 36, seed: int = 0):
+    """Shuffled lift_engine detail rows in the sample_data.csv layout, with gaps and events."""
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    months = pd.period_range("2022-01", periods=n_months, freq="M").strftime("%Y-%m")
+    brand = np.repeat([f"Brand{i:06d}" for i in range(n_brands)], n_months)
+    month = np.tile(months, n_brands)
+    n = len(brand)
+    sales = rng.uniform(1e4, 5e5, n)
+    sales[rng.random(n) < 0.01] = np.nan
+    spend = rng.uniform(0, 2e4, n)
+    spend[rng.random(n) < 0.1] = 0
+    events = np.where(rng.random(n) < 0.05, "Prime Day", None)
+    df = pd.DataFrame({
+        "Brand": brand, "Month": month, "Amazon_Sales": sales, "TikTok_Spend": spend,
+        "TikTok_Impressions": rng.uniform(0, 1e6, n), "TikTok_Views": rng.uniform(0, 4e5, n),
+        "TikTok_Engagements": rng.integers(0, 3e4, n), "TikTok_Clicks": rng.integers(0, 5e3, n),
+        "External_Event": events,
+    })
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def make_aggregates(n_brands: int, seed: int = 0):
+    """Monthly aggregates shaped like build_model's steps 1-3."""
+    rng = np.random.default_rng(seed)
+    months = [(2025, m) for m in range(1, 13)] + [(2026, 1)]
+    amz_monthly = defaultdict(lambda: defaultdict(lambda: {'sales': 0, 'ad_sales': 0, 'organic': 0, 'page_views': 0}))
+    tts_monthly = defaultdict(lambda: defaultdict(float))
+    content = defaultdict(lambda: defaultdict(lambda: {'gmv': 0, 'impressions': 0, 'visitors': 0, 'affiliate_gmv': 0, 'videos': 0, 'lives': 0, 'views': 0, 'likes': 0, 'creators': set()}))
+    tts_meta = {}
+    names = [f"Brand {i:05d}" for i in range(n_brands)]
+    for i, b in enumerate(names):
+        kind = i % 7
+        base = rng.uniform(1e3, 5e5)
+        tts_meta[b] = {'ps': 'Partner', 'status': 'Active'}
+        tts = rng.uniform(0, 5e4, len(months))
+        if kind == 0:
+            tts[:] = 0                     # no TTS history
+        elif kind == 1:
+            tts[rng.random(len(months)) < 0.8] = 0   # sparse history
+        for k, key in enumerate(months):
+            if kind != 2 or k % 4 == 0:    # kind 2: Amazon gaps
+                sales = base + 3 * tts[k] + rng.normal(0, base * 0.1)
+                ad = sales * rng.uniform(0, 0.4) if kind != 3 else 0
+                d = amz_monthly[b][key]
+                d['sales'] += sales; d['ad_sales'] += ad; d['organic'] += sales - ad
+            if tts[k] > 0:
+                tts_monthly[b][key] += tts[k]
+            if kind != 4:
+                c = content[b][key]
+                c['gmv'] += tts[k]; c['impressions'] += rng.uniform(0, 1e6)
+                c['visitors'] += rng.uniform(0, 2e4); c['videos'] += int(rng.integers(0, 50))
+                c['creators'].update(f"c{j}" for j in range(int(rng.integers(0, 5))))
+    return tts_monthly, amz_monthly, content, tts_meta, set(names)
+
+
+# ── Dataset ───────────────────────────────────────────────────────────────────
+
+def make_dataset(n_brands: int = N_BRANDS, n_rows: int = 20_000, months=None, seed: int = 0) -> dict:
+    """Every upload for one synthetic portfolio: {'gmv', 'broadway', 'amazon'} bytes."""
+    return {
+        "gmv": make_gmv(n_brands, months, seed),
+        "broadway": make_broadway(n_rows, seed, n_brands, months),
+        "amazon": make_amazon(n_brands, months, seed),
+    }
+
+
+def write_dataset(out_dir: str, n_brands: int = N_BRANDS, n_rows: int = 20_000, seed: int = 0) -> dict:
+    """Write make_dataset's files plus lift.csv to out_dir; returns {name: path}."""
+    os.makedirs(out_dir, exist_ok=True)
+    files = make_dataset(n_brands, n_rows, seed=seed)
+    paths = {}
+    for key, name in (("gmv", "gmv.csv"), ("broadway", "broadway.xlsm"), ("amazon", "amazon.xlsx")):
+        paths[key] = os.path.join(out_dir, name)
+        with open(paths[key], "wb") as f:
+            f.write(files[key])
+    paths["lift"] = os.path.join(out_dir, "lift.csv")
+    make_lift_frame(n_brands, seed=seed).to_csv(paths["lift"], index=False)
+    return paths
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Write a synthetic upload set.")
+    ap.add_argument("out_dir")
+    ap.add_argument("--brands", type=int, default=N_BRANDS)
+    ap.add_argument("--rows", type=int, default=20_000, help="Broadway rows per sheet")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    for key, path in write_dataset(args.out_dir, args.brands, args.rows, args.seed).items():
+        print(f"{key:<9} {path}")
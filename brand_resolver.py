@@ -0,0 +1,80 @@
+"""
+brand_resolver.py — Brand Name Resolution
+
+Maps raw shop/brand names from every source (Amazon report, GMV CSV,
+Broadway sheets) to one canonical brand name. One resolver is shared by
+all sources in a model build so each distinct raw name is resolved once.
+
+Resolution order matches the original norm():
+  1. exact match in the brand map
+  2. case-insensitive match (first map entry wins)
+  3. strip "(...)" suffixes, Shop/Official/Store/US/USA and DO NOT/no more
+     notes; the cleaned name is remembered for later case-insensitive hits
+"""
+
+import re
+from functools import lru_cache
+
+# ── Cleanup Patterns ──────────────────────────────────────────────────────────
+
+_PAREN_SUFFIX = re.compile(r"\s*\(.*?\)\s*$")
+_STORE_SUFFIX = re.compile(r"\s*(Shop|Official|Store|US|USA)\s*$", re.IGNORECASE)
+_STATUS_NOTE = re.compile(r"\s*(DO NOT|DONT|no more|No Longer).*$", re.IGNORECASE)
+
+DEFAULT_CACHE_SIZE = 65536
+
+
+def clean_name(name: str) -> str:
+    """Strip decorations that don't change which brand a name refers to."""
+    clean = _PAREN_SUFFIX.sub("", name)
+    clean = _STORE_SUFFIX.sub("", clean).strip()
+    clean = _STATUS_NOTE.sub("", clean).strip()
+    return clean or name
+
+
+# ── Resolver ──────────────────────────────────────────────────────────────────
+
+class BrandResolver:
+    """
+    Indexed, memoized replacement for the linear-scan norm().
+
+    The brand map is indexed once by exact and lower-cased name, so each
+    lookup is a couple of dict probes. Resolved raw names are kept in a
+    bounded LRU; cache_info() reports its hits and misses.
+    """
+
+    def __init__(self, brand_map: dict, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.brand_map = dict(brand_map)
+        self._folded = {}
+        for k, v in self.brand_map.items():
+            self._folded.setdefault(k.lower(), v)
+        self._cached = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def __call__(self, name) -> str | None:
+        return self._cached(name)
+
+    def resolve(self, name) -> str | None:
+        """Canonical brand for a raw name, or None for blank names."""
+        return self._cached(name)
+
+    def cache_info(self):
+        """functools-style (hits, misses, maxsize, currsize) of the raw-name LRU."""
+        return self._cached.cache_info()
+
+    def cache_clear(self) -> None:
+        self._cached.cache_clear()
+
+    def _resolve(self, name) -> str | None:
+        if not name or not str(name).strip():
+            return None
+        name = str(name).strip()
+        if name in self.brand_map:
+            return self.brand_map[name]
+        folded = name.lower()
+        if folded in self._folded:
+            return self._folded[folded]
+        clean = clean_name(name)
+        # Remember the cleaned name, as norm() did by writing back into the map
+        self.brand_map[name] = clean
+        self._folded.setdefault(folded, clean)
+        return clean
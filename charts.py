@@ -0,0 +1,175 @@
+"""
+charts.py — Batched Plotly Figures
+
+Figure builders that draw many brands at once. The per-brand correlation
+charts cost one full figure (three traces, layout and theme) per brand,
+so payload and browser render time grow with the portfolio.
+correlation_grid instead lays every brand out as a small multiple on one
+shared pair of axes and draws each series kind as a single WebGL trace,
+with brands separated by gaps (lag_heatmap likewise shows every brand's
+lag profile as one heatmap):
+
+    fig = correlation_grid(names, tts[rows], amz[rows], org[rows], months)
+
+Each panel is scaled to its own brand: Amazon total and organic share
+one scale, TTS GMV (drawn as bars) its own, like the two y-axes of the
+per-brand chart. Hovering a point shows its unscaled dollar value.
+
+Imports plotly, so app.py loads this module inside the views that chart.
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+
+from theme import BLU, GRN, CORAL, PUR, T1, CC, T3, fd, pthem
+
+PANEL_HEIGHT = 130   # px per grid row
+_PAD_X = 0.06        # panel padding, as a fraction of a cell
+_PLOT_H = 0.68       # share of a cell's height the series use
+
+
+def _scale(m: np.ndarray) -> np.ndarray:
+    """Rows of `m` divided by their row max (0 where the row is all zero)."""
+    top = m.max(axis=1, keepdims=True) if m.size else m
+    return np.divide(m, top, out=np.zeros_like(m, dtype=float), where=top > 0)
+
+
+def _panels(n: int, n_months: int, cols: int) -> tuple[np.ndarray, np.ndarray]:
+    """x (n, n_months) and baseline y (n, 1) of each brand's panel."""
+    row, col = np.divmod(np.arange(n), cols)
+    step = (1 - 2 * _PAD_X) / max(n_months - 1, 1)
+    x = col[:, None] + _PAD_X + step * np.arange(n_months)[None, :]
+    return x, -row[:, None] + (1 - _PLOT_H) / 2 - 0.05
+
+
+def _gapped(*cols: np.ndarray) -> list[np.ndarray]:
+    """Flatten (n, k) arrays row by row with a NaN after each row, so a
+    single line trace breaks between brands."""
+    return [np.hstack([c, np.full((c.shape[0], 1), np.nan)]).ravel() for c in cols]
+
+
+def correlation_grid(names: list, tts: np.ndarray, amz: np.ndarray, org: np.ndarray,
+                     months: list, titles: list | None = None, colors: list | None = None,
+                     cols: int = 4) -> go.Figure:
+    """
+    One WebGL figure of per-brand small multiples: Amazon total (line),
+    Amazon organic (dashed) and TTS GMV (bars) for each row of the brand ×
+    month matrices. `titles` (default: the names) label each panel and
+    `colors` colour the titles. `months` labels the month axis of each
+    panel along the bottom row.
+    """
+    n, n_months = tts.shape
+    cols = max(1, min(cols, n))
+    x, base = _panels(n, n_months, cols)
+    amz_org_top = np.maximum(amz.max(axis=1, initial=0), org.max(axis=1, initial=0))[:, None]
+    scale = lambda m: np.divide(m, amz_org_top, out=np.zeros(m.shape), where=amz_org_top > 0)
+    y_amz = base + _PLOT_H * scale(amz)
+    y_org = base + _PLOT_H * scale(org)
+    y_tts = base + _PLOT_H * 0.9 * _scale(tts)
+
+    # Coordinates only need screen precision; hover values are whole dollars.
+    # Both keep the JSON small, which is most of what the browser pays for.
+    x, y_amz, y_org, y_tts = (np.round(a, 4) for a in (x, y_amz, y_org, y_tts))
+    hover = "%{meta}: $%{customdata:,.0f}<extra></extra>"
+
+    fig = go.Figure()
+    for label, ys, raw, line in (
+        ("AMZ", y_amz, amz, dict(color=BLU, width=1.5)),
+        ("Organic", y_org, org, dict(color=GRN, width=1, dash="dash")),
+    ):
+        gx, gy, gv = _gapped(x, ys, np.round(raw))
+        fig.add_trace(go.Scattergl(x=gx, y=gy, mode="lines", name=label, line=line, meta=label,
+                                   customdata=gv, hovertemplate=hover))
+
+    # TTS bars as vertical strokes: (x, base) → (x, top), then a gap; only
+    # the top of a stroke carries a hover value
+    gap = np.full(x.size, np.nan)
+    bx = np.column_stack([x.ravel(), x.ravel(), gap]).ravel()
+    by = np.column_stack([np.broadcast_to(base, x.shape).ravel(), y_tts.ravel(), gap]).ravel()
+    bv = np.column_stack([gap, np.round(tts).ravel(), gap]).ravel()
+    fig.add_trace(go.Scattergl(x=bx, y=by, mode="lines", name="TTS", meta="TTS",
+                               line=dict(color=CORAL, width=max(2, 24 // max(n_months, 1))),
+                               opacity=0.75, customdata=bv, hovertemplate=hover))
+
+    # Panel titles: one text trace rather than an annotation per brand
+    titles = list(titles) if titles is not None else list(names)
+    row, col = np.divmod(np.arange(n), cols)
+    fig.add_trace(go.Scatter(x=col + _PAD_X, y=-row + 0.92, mode="text", text=titles,
+                             textposition="middle right", hoverinfo="skip", showlegend=False,
+                             textfont=dict(size=10, color=colors if colors is not None else T1)))
+
+    rows = -(-n // cols)
+    pthem(fig, max(200, rows * PANEL_HEIGHT + 60))
+    fig.update_layout(hovermode="closest", dragmode="pan")
+    # First and last window month under each column of panels
+    ends = [months[0], months[-1]] if len(months) else ["", ""]
+    fig.update_xaxes(range=[0, cols], showgrid=False, zeroline=False,
+                     tickvals=[c + e for c in range(cols) for e in (_PAD_X, 1 - _PAD_X)],
+                     ticktext=ends * cols)
+    fig.update_yaxes(visible=False, range=[-rows + 0.98, 1.02])
+    return fig
+
+
+def lag_heatmap(names: list, profiles: np.ndarray, best_lag: np.ndarray) -> go.Figure:
+    """
+    r of TTS vs Amazon at each lag (columns of `profiles`, 0..K months)
+    per brand, one row each, with each brand's chosen lag marked.
+    """
+    lags = np.arange(profiles.shape[1])
+    fig = go.Figure(go.Heatmap(
+        z=np.round(profiles, 3), x=lags, y=names, zmin=-1, zmax=1, zmid=0,
+        colorscale=[[0, BLU], [0.5, "#111111"], [1, CORAL]], xgap=2, ygap=2,
+        colorbar=dict(title="r", thickness=10),
+        hovertemplate="%{y}<br>lag %{x} mo: r = %{z:.3f}<extra></extra>"))
+    fig.add_trace(go.Scatter(x=best_lag, y=names, mode="markers", name="best lag", hoverinfo="skip",
+                             marker=dict(symbol="circle-open", size=9, color=T1, line=dict(width=2))))
+    pthem(fig, max(200, 22 * len(names) + 80))
+    fig.update_layout(hovermode="closest", showlegend=False)
+    fig.update_xaxes(title="TTS leads Amazon by (months)", dtick=1, showgrid=False)
+    fig.update_yaxes(autorange="reversed", showgrid=False)
+    return fig
+
+
+def sweep_heatmap(x: np.ndarray, y: np.ndarray, z: np.ndarray, x_label: str, y_label: str,
+                  marker: tuple | None = None) -> go.Figure:
+    """Portfolio total z (len(y) × len(x)) over a two-parameter sweep; `marker` = (x, y) of the current settings."""
+    fig = go.Figure(go.Heatmap(
+        z=z, x=x, y=y, colorscale=[[0, "#111111"], [0.5, PUR], [1, GRN]],
+        colorbar=dict(thickness=10, tickprefix="$", tickformat=",.2s"),
+        hovertemplate=f"{x_label} %{{x}}<br>{y_label} %{{y}}<br>$%{{z:,.0f}}<extra></extra>"))
+    if marker is not None:
+        fig.add_trace(go.Scatter(x=[marker[0]], y=[marker[1]], mode="markers", hoverinfo="skip",
+                                 marker=dict(symbol="x", size=12, color=T1)))
+    pthem(fig, 420)
+    fig.update_layout(hovermode="closest", showlegend=False)
+    fig.update_xaxes(title=x_label, showgrid=False)
+    fig.update_yaxes(title=y_label, showgrid=False)
+    return fig
+
+
+def tornado_chart(rows: list, base: float, labels: dict) -> go.Figure:
+    """
+    Tornado of (param, total at low, total at high) rows from
+    attribution_engine.tornado: bars run from the base total to each end.
+    """
+    rows = rows[::-1]   # widest swing on top
+    names = [labels.get(p, p) for p, _, _ in rows]
+    fig = go.Figure()
+    for end, side, color in ((1, "low", BLU), (2, "high", CORAL)):
+        fig.add_trace(go.Bar(y=names, x=[r[end] - base for r in rows], base=base, orientation="h",
+                             name=side, marker=dict(color=color, opacity=.8), customdata=[r[end] for r in rows],
+                             hovertemplate="%{y} " + side + ": $%{customdata:,.0f}<extra></extra>"))
+    fig.add_vline(x=base, line=dict(color=T1, width=1, dash="dot"))
+    pthem(fig, max(220, 60 * len(rows) + 80))
+    fig.update_layout(barmode="overlay", hovermode="closest")
+    fig.update_xaxes(tickprefix="$", tickformat=",.2s")
+    return fig
+
+
+def correlation_titles(table) -> tuple[list, list]:
+    """Panel titles and title colours for correlation_grid from a brand-indexed results table."""
+    conf = table['confidence'].astype(str).tolist()
+    titles = [f"<b>{name}</b>  r={r:.2f} ({t}) {c}  {fd(a)}" for name, r, t, c, a in
+              zip(table.index, table['r_best'], table['r_type'].astype(str), conf, table['corr_attr'])]
+    colors = [CC.get(c, T3) for c in conf]
+    return titles, colors
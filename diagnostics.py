@@ -0,0 +1,183 @@
+"""
+diagnostics.py — Timing and Memory Spans
+
+Opt-in instrumentation for finding where a slow run spends its time.
+Parsers, model stages and app renders are wrapped in named spans:
+
+    with span("aggregate_sources", "model") as args:
+        ...
+        args["brands"] = len(brands)     # extra detail shown with the span
+
+Spans are recorded only while a Recorder is active in the current
+context (use()), so they cost one context-variable lookup otherwise. The
+TTS_DIAGNOSTICS environment variable turns recording on in the app:
+
+    TTS_DIAGNOSTICS=1       wall time per span
+    TTS_DIAGNOSTICS=memory  wall time and peak traced memory (tracemalloc;
+                            slows everything down noticeably)
+
+A recording exports as Chrome trace JSON (chrome_trace()), which
+chrome://tracing, Perfetto and speedscope open directly. Spans from
+worker processes come back with the task results (traced_call) and are
+merged into the parent recording.
+
+Stdlib only; no Streamlit imports here.
+"""
+
+import os
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+ENV_VAR = "TTS_DIAGNOSTICS"
+
+_CURRENT: ContextVar = ContextVar("diagnostics_recorder", default=None)
+
+
+def mode_from_env() -> str:
+    """'' (off), 'time' or 'memory' from TTS_DIAGNOSTICS."""
+    value = os.environ.get(ENV_VAR, "").strip().lower()
+    if value in ("", "0", "off", "false", "no"):
+        return ""
+    return "memory" if value in ("memory", "mem") else "time"
+
+
+class Recorder:
+    """
+    Collects spans as dicts: name, cat, ts (µs since the epoch), dur (µs),
+    depth, pid, tid, args, and peak_mb when tracing memory. peak_mb is the
+    span's peak traced allocation above what was live when it started.
+    """
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls) -> "Recorder | None":
+        mode = mode_from_env()
+        return cls(memory=mode == "memory") if mode else None
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str, cat: str = "stage", **args):
+        stack = self._stack()
+        frame = {"peak": 0, "base": 0}
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            # Open spans keep the peak seen so far before it is reset for this one
+            for outer in stack:
+                outer["peak"] = max(outer["peak"], peak)
+            tracemalloc.reset_peak()
+            frame["base"] = frame["peak"] = current
+        stack.append(frame)
+        ts = time.time_ns() // 1000
+        t0 = time.perf_counter()
+        try:
+            yield args
+        finally:
+            dur = (time.perf_counter() - t0) * 1e6
+            stack.pop()
+            record = {"name": name, "cat": cat, "ts": ts, "dur": dur, "depth": len(stack),
+                      "pid": os.getpid(), "tid": threading.get_ident(), "args": args}
+            if self.memory and tracemalloc.is_tracing():
+                _, peak = tracemalloc.get_traced_memory()
+                frame["peak"] = max(frame["peak"], peak)
+                if stack:
+                    stack[-1]["peak"] = max(stack[-1]["peak"], frame["peak"])
+                record["peak_mb"] = (frame["peak"] - frame["base"]) / 2**20
+            with self._lock:
+                self.spans.append(record)
+
+    def add(self, spans: list[dict]) -> None:
+        """Merge spans recorded elsewhere (e.g. in a worker process)."""
+        with self._lock:
+            self.spans.extend(spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans = []
+
+    def summary(self) -> list[dict]:
+        """Spans in start order as rows for a table: name, cat, ms, peak MB, depth."""
+        rows = []
+        for s in sorted(self.spans, key=lambda s: (s["ts"], s["depth"])):
+            row = {"span": "  " * s["depth"] + s["name"], "cat": s["cat"], "ms": round(s["dur"] / 1000, 2)}
+            if "peak_mb" in s:
+                row["peak MB"] = round(s["peak_mb"], 2)
+            rows.append(row)
+        return rows
+
+    def chrome_trace(self) -> dict:
+        """Trace Event Format ('X' complete events) for chrome://tracing / Perfetto."""
+        events = []
+        for s in self.spans:
+            args = {k: _jsonable(v) for k, v in s["args"].items()}
+            if "peak_mb" in s:
+                args["peak_mb"] = round(s["peak_mb"], 3)
+            events.append({"name": s["name"], "cat": s["cat"], "ph": "X", "ts": s["ts"],
+                           "dur": round(s["dur"], 1), "pid": s["pid"], "tid": s["tid"], "args": args})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _jsonable(v):
+    if isinstance(v, (str, int, float, bool)) or v is None:
+        return v
+    if isinstance(v, dict):
+        return {str(k): _jsonable(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple)):
+        return [_jsonable(x) for x in v]
+    return str(v)
+
+
+# ── Context ───────────────────────────────────────────────────────────────────
+
+def use(recorder: Recorder | None):
+    """Make `recorder` the active one for this context (thread / script run)."""
+    _CURRENT.set(recorder)
+
+
+def current() -> Recorder | None:
+    return _CURRENT.get()
+
+
+@contextmanager
+def _no_span(args):
+    yield args
+
+
+def span(name: str, cat: str = "stage", **args):
+    """Span on the active recorder; a no-op context when none is active."""
+    recorder = _CURRENT.get()
+    if recorder is None:
+        return _no_span(args)
+    return recorder.span(name, cat, **args)
+
+
+def traced_call(memory: bool, name: str, cat: str, fn, *args):
+    """
+    Run fn(*args) in a span on a fresh recorder and return (result, spans),
+    so a worker process can ship its spans back with the result.
+    """
+    recorder = Recorder(memory=memory)
+    started = memory and not tracemalloc.is_tracing()
+    use(recorder)
+    try:
+        with recorder.span(name, cat):
+            result = fn(*args)
+    finally:
+        use(None)
+        if started:
+            tracemalloc.stop()
+    return result, recorder.spans
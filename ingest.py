@@ -0,0 +1,151 @@
+"""
+ingest.py — Parallel Upload Ingestion
+
+Parses the GMV CSV, the Broadway workbook and the Amazon report at the
+same time in a process pool. The Broadway workbook is split further: its
+shared strings are parsed once here and each of its three sheets is its
+own task, sent only that sheet's XML. Results come back as the compact
+column arrays from parsers.py.
+
+Workers only import parsers.py (no Streamlit), and the pool is created
+once per process and reused, so repeat loads don't pay worker startup.
+With a ParseCache, uploads seen before are loaded from disk and only the
+rest are parsed.
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import diagnostics
+import parsers
+from parse_cache import content_hash
+
+_POOL = None
+_POOL_WORKERS = 0
+
+
+def default_workers() -> int:
+    """One worker per task (GMV, Amazon, three Broadway sheets), capped by cores."""
+    return max(1, min(os.cpu_count() or 1, 2 + len(parsers.BROADWAY_SHEETS)))
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _POOL, _POOL_WORKERS
+    if _POOL is None or _POOL_WORKERS != workers:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+        # spawn, not fork: the app process runs server threads
+        _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _POOL_WORKERS = workers
+    return _POOL
+
+
+def shutdown() -> None:
+    """Stop the shared worker pool (it is recreated on next use)."""
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=True)
+        _POOL = None
+
+
+def _tasks(gmv_bytes, bw_bytes, amz_bytes, min_year) -> list[tuple]:
+    """(slot, function, args) per parse task, largest first."""
+    tasks = []
+    if bw_bytes:
+        # Shared strings are parsed once here; each task gets one sheet's XML
+        xml, strings = parsers.broadway_sheet_xml(bw_bytes)
+        for key in parsers.BROADWAY_SHEETS:
+            tasks.append((("broadway", key), parsers.read_broadway_xml, (key, xml[key], strings, min_year)))
+    if amz_bytes:
+        tasks.append((("amazon", None), parsers.parse_amazon, (amz_bytes,)))
+    if gmv_bytes:
+        tasks.append((("gmv", None), parsers.parse_gmv_csv, (gmv_bytes,)))
+    return tasks
+
+
+def _collect(results: list[tuple]) -> dict:
+    out = {"gmv": None, "broadway": None, "amazon": None}
+    for (source, key), value in results:
+        if source == "broadway":
+            out["broadway"] = {**(out["broadway"] or {}), **value}
+        else:
+            out[source] = value
+    return out
+
+
+def _span_name(slot: tuple) -> str:
+    source, key = slot
+    return f"parse:{source}" + (f":{key}" if key else "")
+
+
+def _run(tasks: list[tuple], workers: int) -> dict:
+    recorder = diagnostics.current()
+    if workers > 1 and len(tasks) > 1:
+        try:
+            pool = _get_pool(workers)
+            if recorder is None:
+                futures = [(slot, pool.submit(fn, *args)) for slot, fn, args in tasks]
+                return _collect([(slot, f.result()) for slot, f in futures])
+            # Workers record their own spans and send them back with the result
+            futures = [(slot, pool.submit(diagnostics.traced_call, recorder.memory, _span_name(slot),
+                                          "parse", fn, *args)) for slot, fn, args in tasks]
+            results = []
+            for slot, f in futures:
+                value, spans = f.result()
+                recorder.add(spans)
+                results.append((slot, value))
+            return _collect(results)
+        except BrokenProcessPool:
+            shutdown()
+    results = []
+    for slot, fn, args in tasks:
+        with diagnostics.span(_span_name(slot), "parse"):
+            results.append((slot, fn(*args)))
+    return _collect(results)
+
+
+def cache_key(source: str, fb: bytes, min_year: int | None = None) -> str:
+    """Parse-cache key: source, parser version, Broadway year cut, content hash."""
+    cut = f"-y{min_year}" if source == "broadway" and min_year is not None else ""
+    return f"{source}-v{parsers.PARSER_VERSION}{cut}-{content_hash(fb)}"
+
+
+def ingest(gmv_bytes: bytes | None = None, bw_bytes: bytes | None = None,
+           amz_bytes: bytes | None = None, min_year: int | None = None,
+           workers: int | None = None, cache=None) -> dict:
+    """
+    Parse all uploads, in parallel where it helps.
+
+    Returns {'gmv', 'broadway', 'amazon'} with the same values as
+    parse_gmv_csv, read_broadway(min_year=...) and parse_amazon (None for
+    sources not uploaded). With workers=1, or a single task, everything
+    runs in-process; if the pool breaks, it falls back to that. `cache`
+    is an optional parse_cache.ParseCache consulted before parsing and
+    filled afterwards.
+    """
+    sources = {"gmv": gmv_bytes, "broadway": bw_bytes, "amazon": amz_bytes}
+    out = {}
+    keys = {}
+    if cache is not None:
+        for source, fb in sources.items():
+            if not fb:
+                continue
+            with diagnostics.span(f"parse_cache:{source}", "parse") as args:
+                keys[source] = cache_key(source, fb, min_year)
+                hit, value = cache.get(keys[source])
+                args["hit"] = hit
+            if hit:
+                out[source] = value
+                sources[source] = None
+
+    tasks = _tasks(sources["gmv"], sources["broadway"], sources["amazon"], min_year)
+    parsed = _run(tasks, default_workers() if workers is None else workers)
+    for source, fb in sources.items():
+        if source in out:
+            continue
+        out[source] = parsed[source]
+        if fb and source in keys:
+            cache.put(keys[source], parsed[source])
+    return out
@@ -7,6 +7,8 @@ in other scripts, run it in notebooks, or swap out the baseline logic
 later without touching the dashboard.
 """
 
+import os
+
 import pandas as pd
 import numpy as np
 
@@ -28,49 +30,170 @@ OPTIONAL_COLUMNS = ["External_Event"]
 
 # ── Validation ────────────────────────────────────────────────────────────────
 
-def validate_data(df: pd.DataFrame) -> tuple[bool, list[str]]:
+NUMERIC_COLUMNS = [c for c in REQUIRED_COLUMNS if c not in ("Brand", "Month")]
+
+# Row indices listed per problem in error messages
+_MAX_LISTED_ROWS = 5
+
+# Order errors are reported in, by check key
+_CHECK_ORDER = {key: i for i, key in enumerate(
+    ["missing_columns", "empty", *(f"non_numeric:{c}" for c in NUMERIC_COLUMNS),
+     "negative_sales", "month_format"])}
+
+
+def _describe_rows(rows: np.ndarray) -> str:
+    listed = ", ".join(str(r) for r in rows[:_MAX_LISTED_ROWS])
+    more = f" and {len(rows) - _MAX_LISTED_ROWS} more" if len(rows) > _MAX_LISTED_ROWS else ""
+    return f"{len(rows)} row{'s' if len(rows) != 1 else ''}: {listed}{more}"
+
+
+class ValidationReport:
     """
-    Validates the input dataframe has required columns and reasonable values.
-    Returns (is_valid, list_of_errors).
+    Result of validate_frame: every error found, the rows behind each
+    row-level problem, and the typed columns parsed along the way.
+
+    problems maps a problem key ('month_format', 'negative_sales',
+    'non_numeric:<column>') to the sorted row positions it affects, so a
+    clean run stores nothing per row; mask() expands one to a boolean
+    array. month_date (datetime64, NaT where unparsed) and numeric
+    (column -> float64 array) are in input row order and are reused by
+    prepare_data and the fused pipelines instead of parsing again.
+
+    offset is the position of row 0 in the whole input when df is one
+    chunk of a larger file: error messages count rows from there, while
+    problems stays relative to the chunk. add() folds chunk reports into
+    one whose errors match validating the whole file at once.
     """
-    errors = []
 
-    # Check required columns
+    def __init__(self, n_rows: int, offset: int = 0):
+        self.n_rows = n_rows
+        self.offset = offset
+        self.messages = {}
+        self.problems = {}
+        self.month_date = None
+        self.numeric = {}
+
+    @property
+    def errors(self) -> list[str]:
+        return [f"{message} ({_describe_rows(self.problems[key] + self.offset)})" if key in self.problems
+                else message
+                for key, message in sorted(self.messages.items(), key=lambda km: _CHECK_ORDER[km[0]])]
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.messages
+
+    def error(self, check: str, message: str) -> None:
+        self.messages.setdefault(check, message)
+
+    def flag(self, problem: str, mask: np.ndarray, message: str) -> None:
+        """Record `message` with the rows in `mask`, if there are any."""
+        rows = np.flatnonzero(mask)
+        if len(rows):
+            self.problems[problem] = rows
+            self.messages[problem] = message
+
+    def add(self, other: "ValidationReport") -> None:
+        """Fold in the problems of a later chunk of the same input."""
+        shift = other.offset - self.offset
+        for key, message in other.messages.items():
+            self.error(key, message)
+            if key in other.problems:
+                rows = other.problems[key] + shift
+                self.problems[key] = np.concatenate([self.problems[key], rows]) if key in self.problems else rows
+        self.n_rows = max(self.n_rows, shift + other.n_rows)
+
+    def mask(self, problem: str) -> np.ndarray:
+        out = np.zeros(self.n_rows, dtype=bool)
+        out[self.problems.get(problem, [])] = True
+        return out
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        return self.month_date is not None and len(df) == self.n_rows
+
+
+def _parse_months(values: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """
+    YYYY-MM strings -> (datetime64 array, NaT where missing or malformed;
+    mask of malformed, i.e. present but unparsed). Each distinct value is
+    parsed once.
+    """
+    codes, uniques = pd.factorize(values, sort=False)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format="%Y-%m", errors="coerce").to_numpy()
+    # Code -1 (missing) picks the trailing NaT / False
+    parsed = np.append(parsed, np.datetime64("NaT")).astype("datetime64[ns]")
+    malformed = np.append(np.isnat(parsed[:-1]), False)
+    return parsed[codes], malformed[codes]
+
+
+def validate_frame(df: pd.DataFrame, offset: int = 0) -> ValidationReport:
+    """
+    Validate every column and row in one pass and collect all problems.
+
+    Checks required columns, numeric columns (listing the rows that do not
+    parse as numbers), negative Amazon_Sales and malformed Month values.
+    Missing columns do not stop the remaining checks. Pass the number of
+    rows read before df as `offset` when validating one chunk of a file.
+    """
+    report = ValidationReport(len(df), offset)
+
     missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
     if missing:
-        errors.append(f"Missing required columns: {', '.join(missing)}")
-        return False, errors
+        report.error("missing_columns", f"Missing required columns: {', '.join(missing)}")
 
-    # Check for empty data
     if len(df) == 0:
-        errors.append("Dataset is empty.")
-        return False, errors
+        report.error("empty", "Dataset is empty.")
+        return report
 
-    # Check numeric columns
-    numeric_cols = [c for c in REQUIRED_COLUMNS if c not in ("Brand", "Month")]
-    for col in numeric_cols:
-        if not pd.api.types.is_numeric_dtype(df[col]):
-            errors.append(f"Column '{col}' must be numeric.")
+    for col in NUMERIC_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values):
+            report.numeric[col] = values.to_numpy(dtype=float, na_value=np.nan)
+            continue
+        coerced = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        bad = np.isnan(coerced) & values.notna().to_numpy()
+        report.numeric[col] = coerced
+        message = f"Column '{col}' must be numeric."
+        if bad.any():
+            report.flag(f"non_numeric:{col}", bad, message)
+        else:
+            report.error(f"non_numeric:{col}", message)
 
-    # Check for negative sales
-    if (df["Amazon_Sales"] < 0).any():
-        errors.append("Amazon_Sales contains negative values.")
+    if "Amazon_Sales" in report.numeric:
+        report.flag("negative_sales", report.numeric["Amazon_Sales"] < 0,
+                    "Amazon_Sales contains negative values.")
 
-    # Check month format
-    try:
-        pd.to_datetime(df["Month"], format="%Y-%m")
-    except (ValueError, TypeError):
-        errors.append("Month column must be in YYYY-MM format (e.g., 2024-01).")
+    if "Month" in df.columns:
+        report.month_date, bad = _parse_months(df["Month"])
+        report.flag("month_format", bad, "Month column must be in YYYY-MM format (e.g., 2024-01).")
+
+    return report
 
-    return len(errors) == 0, errors
+
+def validate_data(df: pd.DataFrame) -> tuple[bool, list[str]]:
+    """
+    Validates the input dataframe has required columns and reasonable values.
+    Returns (is_valid, list_of_errors). See validate_frame for row details.
+    """
+    report = validate_frame(df)
+    return report.is_valid, report.errors
 
 
 # ── Data Preparation ──────────────────────────────────────────────────────────
 
-def prepare_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Clean and sort data for analysis."""
+def _month_dates(df: pd.DataFrame, report: ValidationReport | None) -> np.ndarray:
+    """Month_Date values, from the validation report when it covers df."""
+    if report is not None and report.matches(df):
+        return report.month_date
+    return pd.to_datetime(df["Month"], format="%Y-%m")
+
+
+def prepare_data(df: pd.DataFrame, report: ValidationReport | None = None) -> pd.DataFrame:
+    """Clean and sort data for analysis (reusing `report`'s parsed months)."""
     df = df.copy()
-    df["Month_Date"] = pd.to_datetime(df["Month"], format="%Y-%m")
+    df["Month_Date"] = _month_dates(df, report)
     df = df.sort_values(["Brand", "Month_Date"]).reset_index(drop=True)
 
     # Fill optional columns
@@ -91,7 +214,7 @@ def compute_rolling_baseline(df: pd.DataFrame, window: int = 3) -> pd.DataFrame:
     df = df.copy()
 
     df["Baseline_Sales"] = (
-        df.groupby("Brand")["Amazon_Sales"]
+        df.groupby("Brand", observed=True)["Amazon_Sales"]
         .transform(lambda x: x.shift(1).rolling(window=window, min_periods=1).mean())
     )
 
@@ -157,7 +280,7 @@ def apply_confidence_flags(df: pd.DataFrame, window: int = 3) -> pd.DataFrame:
     df = df.copy()
 
     # Count months of history per brand up to each row
-    df["Months_Of_History"] = df.groupby("Brand").cumcount()
+    df["Months_Of_History"] = df.groupby("Brand", observed=True).cumcount()
 
     conditions = []
     choices = []
@@ -168,15 +291,17 @@ def apply_confidence_flags(df: pd.DataFrame, window: int = 3) -> pd.DataFrame:
     )
     choices.append("Inconclusive")
 
+    has_event = df["External_Event"].str.len() > 0
+
     # Low: external event + negative lift
     conditions.append(
-        (df["External_Event"].str.len() > 0) & (df["Lift_Dollars"] < 0)
+        has_event & (df["Lift_Dollars"] < 0)
     )
     choices.append("Low")
 
     # Medium: external event OR negative lift
     conditions.append(
-        (df["External_Event"].str.len() > 0) | (df["Lift_Dollars"] < 0)
+        has_event | (df["Lift_Dollars"] < 0)
     )
     choices.append("Medium")
 
@@ -189,12 +314,222 @@ def apply_confidence_flags(df: pd.DataFrame, window: int = 3) -> pd.DataFrame:
     return df
 
 
+# ── Fused Pipeline ────────────────────────────────────────────────────────────
+
+def _group_positions(codes: np.ndarray) -> np.ndarray:
+    """Row position within its run of equal codes (codes sorted by group)."""
+    n = len(codes)
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = codes[1:] != codes[:-1]
+    start_idx = np.flatnonzero(starts)
+    run = np.repeat(start_idx, np.diff(np.append(start_idx, n)))
+    return np.arange(n) - run
+
+
+def shifted_rolling_mean(values: np.ndarray, pos: np.ndarray, window: int) -> np.ndarray:
+    """
+    Mean of the previous `window` values in each row's group, skipping NaN
+    (min_periods=1): groupby().shift(1).rolling(window, min_periods=1).mean()
+    without a per-group callback. Rows are grouped contiguously and `pos`
+    is each row's position in its group. Rows with no history are NaN.
+    """
+    total = np.zeros(len(values))
+    count = np.zeros(len(values))
+    valid = ~np.isnan(values)
+    clean = np.where(valid, values, 0.0)
+    for k in range(1, window + 1):
+        # Value k rows back, only where it belongs to the same group
+        take = pos[k:] >= k
+        total[k:] += np.where(take, clean[:-k], 0.0)
+        count[k:] += take & valid[:-k]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def _prepare_sorted(df: pd.DataFrame, report: ValidationReport | None = None) -> pd.DataFrame:
+    """prepare_data with a single copy (the sort's)."""
+    df = df.assign(Month_Date=_month_dates(df, report))
+    df.sort_values(["Brand", "Month_Date"], inplace=True, ignore_index=True)
+    if "External_Event" not in df.columns:
+        df["External_Event"] = ""
+    df["External_Event"] = df["External_Event"].fillna("").astype(str)
+    return df
+
+
+# Confidence labels in flag precedence order; codes index into this
+CONFIDENCE_LEVELS = ("Inconclusive", "Low", "Medium", "High")
+
+
+def _lift_arrays(sales, spend, views, impressions, has_event, baseline, history,
+                 window: int) -> dict:
+    """
+    Baseline, lift, efficiency and confidence columns as NumPy arrays.
+
+    `baseline` is the raw shifted rolling mean (NaN where there is no
+    history yet) and `history` the months of history before each row.
+    Confidence comes back as int8 codes into CONFIDENCE_LEVELS.
+    """
+    baseline = np.where(np.isnan(baseline), sales, baseline)
+    lift = sales - baseline
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "Baseline_Sales": baseline,
+            "Lift_Dollars": lift,
+            "Lift_Pct": np.where(baseline > 0, (lift / baseline) * 100, 0),
+            "Lift_ROAS": np.where(spend > 0, lift / spend, 0),
+            "Cost_Per_Lift_Dollar": np.where(lift > 0, spend / lift, np.nan),
+            "Lift_Per_1K_Views": np.where(views > 0, lift / (views / 1000), 0),
+            "Lift_Per_1K_Impressions": np.where(impressions > 0, lift / (impressions / 1000), 0),
+            "Months_Of_History": history,
+            "Confidence": np.select(
+                [(history < window) | (spend == 0),
+                 has_event & (lift < 0),
+                 has_event | (lift < 0)],
+                [0, 1, 2],
+                default=3,
+            ).astype(np.int8),
+        }
+
+
+def _add_lift_columns(df: pd.DataFrame, baseline: np.ndarray, history: np.ndarray,
+                      window: int) -> pd.DataFrame:
+    """Add the _lift_arrays columns to a prepared frame, in place."""
+    derived = _lift_arrays(
+        df["Amazon_Sales"].to_numpy(dtype=float), df["TikTok_Spend"].to_numpy(dtype=float),
+        df["TikTok_Views"].to_numpy(dtype=float), df["TikTok_Impressions"].to_numpy(dtype=float),
+        df["External_Event"].str.len().to_numpy() > 0, baseline, history, window,
+    )
+    derived["Confidence"] = np.array(CONFIDENCE_LEVELS, dtype=object)[derived["Confidence"]]
+    for col, values in derived.items():
+        df[col] = values
+    return df
+
+
+def run_fused_pipeline(df: pd.DataFrame, window: int = 3, compact: bool = False,
+                       report: ValidationReport | None = None) -> pd.DataFrame:
+    """
+    prepare → baseline → lift → confidence in one pass.
+
+    Same columns and values as the staged functions, but the input is
+    copied once (by the sort) and every derived column is computed on
+    NumPy arrays and added in place — no per-stage df.copy() and no
+    per-brand lambdas.
+
+    compact=True returns the compact schema instead (see
+    run_compact_pipeline). `report` is validate_frame's result for df,
+    whose parsed columns are reused.
+    """
+    if compact:
+        return run_compact_pipeline(df, window=window, report=report)
+    df = _prepare_sorted(df, report)
+    codes, _ = pd.factorize(df["Brand"], sort=False)
+    pos = _group_positions(codes)
+    grouped = codes >= 0          # groupby drops null brands
+
+    sales = df["Amazon_Sales"].to_numpy(dtype=float)
+    baseline = np.where(grouped, shifted_rolling_mean(sales, pos, window), np.nan)
+    history = pos if grouped.all() else np.where(grouped, pos, np.nan)
+    return _add_lift_columns(df, baseline, history, window)
+
+
+# ── Compact Schema ────────────────────────────────────────────────────────────
+
+# Largest integer float32 holds exactly
+_FLOAT32_EXACT = 2**24
+
+
+def _compact_counts(values: pd.Series) -> pd.Series:
+    """
+    Smallest exact dtype for a count column: int32 (int64 past its range)
+    for whole numbers, float32 for whole numbers with gaps up to 2**24,
+    float64 for larger gapped counts and fractions.
+    """
+    arr = values.to_numpy(dtype=float)
+    finite = arr[~np.isnan(arr)]
+    whole = np.array_equal(finite, np.round(finite))
+    top = np.abs(finite).max() if len(finite) else 0
+    if whole and len(finite) == len(arr):
+        return pd.Series(arr.astype(np.int32 if top < 2**31 else np.int64), index=values.index)
+    if whole and top <= _FLOAT32_EXACT:
+        return pd.Series(arr.astype(np.float32), index=values.index)
+    return pd.Series(arr, index=values.index)
+
+
+def prepare_compact(df: pd.DataFrame, report: ValidationReport | None = None) -> pd.DataFrame:
+    """
+    prepare_data with compact dtypes: Brand, External_Event categorical,
+    Month a monthly Period (integer-backed; replaces Month_Date), a boolean
+    Has_Event, and the engagement/click counts as int32 (see _compact_counts
+    for gaps, fractions and large counts). Money, views and impressions
+    stay float64 since the lift math and summary sums run on them. Parsed
+    months and numeric arrays come from `report` when given.
+    """
+    cached = report.numeric if report is not None and report.matches(df) else {}
+
+    def floats(col):
+        return cached[col] if col in cached else df[col].to_numpy(dtype=float)
+
+    events = df["External_Event"] if "External_Event" in df.columns else pd.Series("", index=df.index)
+    events = events.fillna("").astype(str).astype("category")
+    out = pd.DataFrame({
+        "Brand": df["Brand"].astype("category"),
+        "Month": pd.PeriodIndex(pd.DatetimeIndex(_month_dates(df, report)), freq="M"),
+        "Amazon_Sales": floats("Amazon_Sales"),
+        "TikTok_Spend": floats("TikTok_Spend"),
+        "TikTok_Impressions": floats("TikTok_Impressions"),
+        "TikTok_Views": floats("TikTok_Views"),
+        "TikTok_Engagements": _compact_counts(df["TikTok_Engagements"]),
+        "TikTok_Clicks": _compact_counts(df["TikTok_Clicks"]),
+        "External_Event": events,
+        # Event flag per category, then looked up by code: no per-row str.len()
+        "Has_Event": np.asarray(events.cat.categories.str.len() > 0)[events.cat.codes.to_numpy()],
+    })
+    extra = [c for c in df.columns if c not in out.columns]
+    if extra:
+        out = pd.concat([out, df[extra]], axis=1)
+    # Categories are sorted, so this is the same row order as prepare_data
+    out.sort_values(["Brand", "Month"], inplace=True, ignore_index=True)
+    return out
+
+
+def run_compact_pipeline(df: pd.DataFrame, window: int = 3,
+                         report: ValidationReport | None = None) -> pd.DataFrame:
+    """
+    run_fused_pipeline on the prepare_compact schema.
+
+    Same values as the object-dtype path, with Confidence an ordered
+    categorical over CONFIDENCE_LEVELS and Months_Of_History int32
+    (float32 when some brands are missing, float64 past 2**24 rows).
+    Brand codes come straight from the categorical, so no factorize pass
+    is needed.
+    """
+    df = prepare_compact(df, report)
+    codes = df["Brand"].cat.codes.to_numpy()
+    pos = _group_positions(codes)
+    grouped = codes >= 0
+
+    sales = df["Amazon_Sales"].to_numpy()
+    baseline = np.where(grouped, shifted_rolling_mean(sales, pos, window), np.nan)
+    if grouped.all():
+        history = pos.astype(np.int32)
+    else:
+        history = np.where(grouped, pos, np.nan).astype(np.float32 if len(pos) <= _FLOAT32_EXACT else np.float64)
+    derived = _lift_arrays(
+        sales, df["TikTok_Spend"].to_numpy(), df["TikTok_Views"].to_numpy(),
+        df["TikTok_Impressions"].to_numpy(), df["Has_Event"].to_numpy(), baseline, history, window,
+    )
+    derived["Confidence"] = pd.Categorical.from_codes(derived["Confidence"], CONFIDENCE_LEVELS, ordered=True)
+    for col, values in derived.items():
+        df[col] = values
+    return df
+
+
 # ── Brand Summary ─────────────────────────────────────────────────────────────
 
 def compute_brand_summary(df: pd.DataFrame) -> pd.DataFrame:
     """Aggregate lift metrics at the brand level."""
     summary = (
-        df.groupby("Brand")
+        df.groupby("Brand", observed=True)
         .agg(
             Total_Amazon_Sales=("Amazon_Sales", "sum"),
             Total_Baseline_Sales=("Baseline_Sales", "sum"),
@@ -209,6 +544,10 @@ def compute_brand_summary(df: pd.DataFrame) -> pd.DataFrame:
         .reset_index()
     )
 
+    return _add_overall_metrics(summary)
+
+
+def _add_overall_metrics(summary: pd.DataFrame) -> pd.DataFrame:
     # Overall ROAS
     summary["Overall_Lift_ROAS"] = np.where(
         summary["Total_TikTok_Spend"] > 0,
@@ -231,24 +570,43 @@ def compute_brand_summary(df: pd.DataFrame) -> pd.DataFrame:
 def run_lift_analysis(
     df: pd.DataFrame,
     window: int = 3,
+    fused: bool = False,
+    workers: int | None = None,
+    compact: bool = False,
 ) -> dict:
     """
     Full pipeline: validate → prepare → baseline → lift → confidence → summarize.
 
+    fused=True runs the middle stages as run_fused_pipeline (one copy, no
+    per-brand lambdas) instead of the staged functions. workers > 1 runs
+    them, and the summary, across processes (run_parallel_pipeline).
+    compact=True runs the fused stages on the compact schema
+    (run_compact_pipeline): categorical Brand/Confidence, period Month;
+    it cannot be combined with workers > 1 (ValueError).
+
     Returns a dict with:
       - 'detail': row-level dataframe
       - 'summary': brand-level summary
       - 'errors': list of validation errors (empty if clean)
       - 'window': rolling window used
     """
-    is_valid, errors = validate_data(df)
-    if not is_valid:
-        return {"detail": None, "summary": None, "errors": errors, "window": window}
+    parallel = workers is not None and workers > 1
+    if parallel and compact:
+        raise ValueError("compact=True is not supported with workers > 1")
+    report = validate_frame(df)
+    if not report.is_valid:
+        return {"detail": None, "summary": None, "errors": report.errors, "window": window}
 
-    df = prepare_data(df)
-    df = compute_rolling_baseline(df, window=window)
-    df = compute_lift_metrics(df)
-    df = apply_confidence_flags(df, window=window)
+    if parallel:
+        df, summary = run_parallel_pipeline(df, window=window, workers=workers, report=report)
+        return {"detail": df, "summary": summary, "errors": [], "window": window}
+    if fused or compact:
+        df = run_fused_pipeline(df, window=window, compact=compact, report=report)
+    else:
+        df = prepare_data(df, report)
+        df = compute_rolling_baseline(df, window=window)
+        df = compute_lift_metrics(df)
+        df = apply_confidence_flags(df, window=window)
     summary = compute_brand_summary(df)
 
     return {
@@ -257,3 +615,429 @@ def run_lift_analysis(
         "errors": [],
         "window": window,
     }
+
+
+# ── Chunked Pipeline ──────────────────────────────────────────────────────────
+
+class SummaryAccumulator:
+    """
+    compute_brand_summary built from running per-brand totals, so detail
+    rows can be summarized chunk by chunk and then discarded.
+    """
+
+    def __init__(self):
+        self.totals = None
+
+    def update(self, df: pd.DataFrame) -> None:
+        part = df.groupby("Brand", observed=True).agg(
+            Total_Amazon_Sales=("Amazon_Sales", "sum"),
+            Total_Baseline_Sales=("Baseline_Sales", "sum"),
+            Total_Lift_Dollars=("Lift_Dollars", "sum"),
+            Total_TikTok_Spend=("TikTok_Spend", "sum"),
+            Total_Views=("TikTok_Views", "sum"),
+            Total_Impressions=("TikTok_Impressions", "sum"),
+            Months_Tracked=("Month", "count"),
+            Lift_Sum=("Lift_Dollars", "sum"),
+            Lift_Count=("Lift_Dollars", "count"),
+            Pct_Sum=("Lift_Pct", "sum"),
+            Pct_Count=("Lift_Pct", "count"),
+        )
+        self.totals = part if self.totals is None else self.totals.add(part, fill_value=0)
+
+    def summary(self) -> pd.DataFrame:
+        if self.totals is None:
+            return compute_brand_summary(pd.DataFrame(columns=[
+                "Brand", "Month", "Amazon_Sales", "Baseline_Sales", "Lift_Dollars",
+                "TikTok_Spend", "TikTok_Views", "TikTok_Impressions", "Lift_Pct"]))
+        t = self.totals.sort_index()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg_lift = np.where(t["Lift_Count"] > 0, t["Lift_Sum"] / t["Lift_Count"], np.nan)
+            avg_pct = np.where(t["Pct_Count"] > 0, t["Pct_Sum"] / t["Pct_Count"], np.nan)
+        summary = t.drop(columns=["Lift_Sum", "Lift_Count", "Pct_Sum", "Pct_Count"])
+        summary["Months_Tracked"] = summary["Months_Tracked"].astype("int64")
+        summary["Avg_Monthly_Lift"] = avg_lift
+        summary["Avg_Lift_Pct"] = avg_pct
+        return _add_overall_metrics(summary.reset_index())
+
+
+class _DetailWriter:
+    """Appends detail chunks to a CSV (or, by extension, Parquet) file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = str(path).lower().endswith((".parquet", ".pq"))
+        self._writer = None
+        self._started = False
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            df.to_csv(self.path, mode="a" if self._started else "w", header=not self._started, index=False)
+        self._started = True
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _chunk_baseline(df: pd.DataFrame, state: dict, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Shifted rolling baseline and months of history for one sorted chunk,
+    continuing each brand from `state` ({brand: (last sales, count,
+    last month)}), which is updated in place.
+    """
+    codes, uniques = pd.factorize(df["Brand"], sort=False)
+    n_groups = len(uniques)
+    grouped = codes >= 0
+    sales = df["Amazon_Sales"].to_numpy(dtype=float)
+    months = df["Month_Date"].to_numpy()
+
+    # Prepend each brand's carried tail so the rolling window spans chunks
+    n_tail = np.zeros(n_groups, dtype=np.int64)
+    carried = np.zeros(n_groups, dtype=np.int64)
+    key = np.where(grouped, codes, n_groups)       # null brands sort last, as in the chunk
+    first_row = np.searchsorted(key, np.arange(n_groups), side="left")
+    tail_codes, tail_vals = [], []
+    for g, brand in enumerate(uniques):
+        prev = state.get(brand)
+        if prev is None:
+            continue
+        vals, count, last_month = prev
+        if months[first_row[g]] < last_month:
+            raise ValueError(
+                f"Rows for brand {brand!r} are out of month order across chunks. "
+                "Sort the file by Brand then Month (or by Month) for chunked runs."
+            )
+        n_tail[g], carried[g] = len(vals), count
+        tail_codes.append(np.full(len(vals), g))
+        tail_vals.append(vals)
+
+    ext_key = np.concatenate(tail_codes + [key]) if tail_codes else key
+    ext_vals = np.concatenate(tail_vals + [sales]) if tail_vals else sales
+    is_real = np.concatenate([np.zeros(len(ext_key) - len(df), dtype=bool), np.ones(len(df), dtype=bool)])
+    order = np.argsort(ext_key, kind="stable")
+    ext_key, ext_vals, is_real = ext_key[order], ext_vals[order], is_real[order]
+
+    pos = _group_positions(ext_key)
+    rolled = shifted_rolling_mean(ext_vals, pos, window)[is_real]
+    pos = pos[is_real]
+
+    baseline = np.where(grouped, rolled, np.nan)
+    safe = np.where(grouped, codes, 0)
+    history = carried[safe] + pos - n_tail[safe]
+    if not grouped.all():
+        history = np.where(grouped, history, np.nan)
+
+    # Carry the last `window` sales of every brand into the next chunk
+    ends = np.searchsorted(ext_key, np.arange(n_groups), side="right")
+    n_real = np.bincount(codes[grouped], minlength=n_groups)
+    last_row = np.searchsorted(key, np.arange(n_groups), side="right") - 1
+    for g, brand in enumerate(uniques):
+        k = min(window, int(n_tail[g] + n_real[g]))
+        state[brand] = (ext_vals[ends[g] - k:ends[g]].copy(), int(carried[g] + n_real[g]), months[last_row[g]])
+    return baseline, history
+
+
+def run_lift_analysis_chunked(
+    source,
+    detail_path: str,
+    window: int = 3,
+    chunksize: int = 100_000,
+    **read_csv_kwargs,
+) -> dict:
+    """
+    Out-of-core run_lift_analysis for CSVs too large to hold in memory.
+
+    Reads `source` (a CSV path or buffer) `chunksize` rows at a time, keeps
+    only each brand's last `window` sales and row count between chunks, and
+    appends each chunk's detail rows to `detail_path` (CSV, or Parquet by
+    extension). The brand summary comes from running totals, so peak
+    memory follows the chunk size, not the file size.
+
+    Each brand's rows must arrive in month order across chunks (a file
+    sorted by Brand, or by Month, works). Detail rows are written sorted
+    by Brand and Month within each chunk.
+
+    Every chunk is validated and the reports are merged, so errors list
+    file rows and match what run_lift_analysis reports for the same data;
+    after the first error, later chunks are only checked, not processed,
+    and the run is rejected once all errors are collected.
+
+    Returns a dict with:
+      - 'detail': detail_path (None on validation errors)
+      - 'summary': brand-level summary
+      - 'errors': list of validation errors (empty if clean)
+      - 'window': rolling window used
+      - 'rows': detail rows written
+    """
+    state = {}
+    acc = SummaryAccumulator()
+    writer = _DetailWriter(detail_path)
+    rows = 0
+    offset = 0
+    checked = ValidationReport(0)
+    errors = []
+    header = pd.DataFrame()
+    try:
+        for chunk in pd.read_csv(source, chunksize=chunksize, **read_csv_kwargs):
+            if len(chunk) == 0:
+                header = chunk
+                continue
+            report = validate_frame(chunk, offset)
+            offset += len(chunk)
+            checked.add(report)
+            if not checked.is_valid:
+                continue
+            df = _prepare_sorted(chunk, report)
+            baseline, history = _chunk_baseline(df, state, window)
+            df = _add_lift_columns(df, baseline, history, window)
+            acc.update(df)
+            writer.write(df)
+            rows += len(df)
+        errors = checked.errors
+        if not errors and rows == 0:
+            # Header-only file: missing columns come before the empty error, as in validate_frame
+            errors = validate_frame(header).errors
+    except ValueError as e:
+        errors = [str(e)]
+    finally:
+        writer.close()
+
+    if errors:
+        if writer._started and os.path.exists(detail_path):
+            os.remove(detail_path)
+        return {"detail": None, "summary": None, "errors": errors, "window": window, "rows": 0}
+    return {
+        "detail": detail_path,
+        "summary": acc.summary(),
+        "errors": [],
+        "window": window,
+        "rows": rows,
+    }
+
+
+# ── Parallel Pipeline ─────────────────────────────────────────────────────────
+
+# Numeric inputs shared with workers, and the float outputs they fill in
+_SHARED_INPUTS = ("Amazon_Sales", "TikTok_Spend", "TikTok_Views", "TikTok_Impressions")
+_SHARED_OUTPUTS = ("Baseline_Sales", "Lift_Dollars", "Lift_Pct", "Lift_ROAS",
+                   "Cost_Per_Lift_Dollar", "Lift_Per_1K_Views", "Lift_Per_1K_Impressions",
+                   "Months_Of_History")
+# Per-brand summary sums; counts are kept alongside for the NaN-skipping means
+_SUMMARY_SUMS = {
+    "Total_Amazon_Sales": "Amazon_Sales",
+    "Total_Baseline_Sales": "Baseline_Sales",
+    "Total_Lift_Dollars": "Lift_Dollars",
+    "Total_TikTok_Spend": "TikTok_Spend",
+    "Total_Views": "TikTok_Views",
+    "Total_Impressions": "TikTok_Impressions",
+}
+# Below this many rows the fused pipeline beats dispatching to the pool
+PARALLEL_MIN_ROWS = 500_000
+
+_POOL = None
+_POOL_WORKERS = 0
+
+
+def _get_pool(workers: int):
+    global _POOL, _POOL_WORKERS
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    if _POOL is None or _POOL_WORKERS != workers:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+        # spawn, not fork: the app process runs server threads
+        _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _POOL_WORKERS = workers
+    return _POOL
+
+
+def shutdown_pool() -> None:
+    """Stop the shared worker pool (it is recreated on next use)."""
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=True)
+        _POOL = None
+
+
+def _attach(spec: tuple):
+    """(SharedMemory, ndarray view) for a (name, shape, dtype) spec."""
+    from multiprocessing import shared_memory
+    name, shape, dtype = spec
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before 3.13 attaching registers the block again, but pool workers
+        # share the parent's resource tracker, so that is a no-op there
+        shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+class _SharedBlock:
+    """Shared-memory arrays created by the parent and unlinked on close()."""
+
+    def __init__(self):
+        from multiprocessing import shared_memory
+        self._shared_memory = shared_memory
+        self.blocks = []
+        self.specs = {}
+        self.arrays = {}
+
+    def alloc(self, key: str, shape: tuple, dtype) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(shape)) * dtype.itemsize)
+        shm = self._shared_memory.SharedMemory(create=True, size=size)
+        self.blocks.append(shm)
+        self.specs[key] = (shm.name, shape, dtype.str)
+        self.arrays[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        return self.arrays[key]
+
+    def put(self, key: str, values: np.ndarray) -> None:
+        self.alloc(key, values.shape, values.dtype)[...] = values
+
+    def close(self) -> None:
+        self.arrays.clear()
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks.clear()
+
+
+def _run_shard(specs: dict, start: int, stop: int, window: int) -> dict:
+    """
+    Worker: baseline → lift → confidence for rows [start, stop), which hold
+    whole brands. Reads inputs from and writes outputs to shared memory;
+    returns the shard's per-brand summary sums.
+    """
+    handles = {}
+    try:
+        arr = {}
+        for key, spec in specs.items():
+            shm, a = _attach(spec)
+            handles[key] = shm
+            arr[key] = a[start:stop]
+        codes = arr["codes"]
+        grouped = codes >= 0
+        pos = _group_positions(codes)
+        sales = arr["Amazon_Sales"]
+        baseline = np.where(grouped, shifted_rolling_mean(sales, pos, window), np.nan)
+        history = np.where(grouped, pos, np.nan)
+        out = _lift_arrays(sales, arr["TikTok_Spend"], arr["TikTok_Views"],
+                           arr["TikTok_Impressions"], arr["has_event"], baseline, history, window)
+        for key in _SHARED_OUTPUTS:
+            arr[key][:] = out[key]
+        arr["Confidence"][:] = out["Confidence"]
+
+        # Brands in this shard: codes are contiguous and sorted
+        g = codes[grouped]
+        if not len(g):
+            return {"codes": np.empty(0, dtype=np.int64)}
+        lo, hi = int(g[0]), int(g[-1]) + 1
+        local = g - lo
+        rows = np.flatnonzero(grouped)
+
+        def sums(values):
+            v = values[rows]
+            ok = ~np.isnan(v)
+            return (np.bincount(local, weights=np.where(ok, v, 0.0), minlength=hi - lo),
+                    np.bincount(local, weights=ok, minlength=hi - lo))
+
+        result = {"codes": np.arange(lo, hi)}
+        for col, src in _SUMMARY_SUMS.items():
+            result[col] = sums(arr[src])[0]
+        result["Lift_Sum"], result["Lift_Count"] = sums(arr["Lift_Dollars"])
+        result["Pct_Sum"], result["Pct_Count"] = sums(arr["Lift_Pct"])
+        result["Months_Tracked"] = np.bincount(local, weights=arr["month_present"][rows], minlength=hi - lo)
+        return result
+    finally:
+        for shm in handles.values():
+            shm.close()
+
+
+def _shard_bounds(codes: np.ndarray, n_shards: int) -> list[tuple[int, int]]:
+    """Split sorted rows into about n_shards ranges without splitting a brand."""
+    n = len(codes)
+    cuts = [0]
+    for k in range(1, n_shards):
+        i = k * n // n_shards
+        # Move the cut forward to the next brand boundary
+        while 0 < i < n and codes[i] == codes[i - 1]:
+            i = int(np.searchsorted(codes, codes[i], side="right")) if codes[i] >= 0 else n
+        if i > cuts[-1]:
+            cuts.append(i)
+    if cuts[-1] < n:
+        cuts.append(n)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def run_parallel_pipeline(df: pd.DataFrame, window: int = 3, workers: int | None = None,
+                          shards_per_worker: int = 4,
+                          report: ValidationReport | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    run_fused_pipeline + compute_brand_summary across a process pool.
+
+    The prepared frame is sharded by Brand (whole brands per shard). The
+    numeric columns go to workers through shared memory rather than
+    pickling, workers write their output columns back in place, and only
+    the small per-brand summary sums travel back. Returns (detail, summary).
+
+    The spawn pool is created once per process and reused (shutdown_pool()
+    stops it); a broken pool falls back to running the shards in-process.
+    Frames under PARALLEL_MIN_ROWS rows skip the pool and shared memory
+    and run run_fused_pipeline, since worker startup and dispatch cost
+    more than they save there.
+    """
+    from concurrent.futures.process import BrokenProcessPool
+
+    workers = workers or os.cpu_count() or 1
+    if len(df) < PARALLEL_MIN_ROWS:
+        df = run_fused_pipeline(df, window=window, report=report)
+        return df, compute_brand_summary(df)
+    df = _prepare_sorted(df, report)
+    codes, uniques = pd.factorize(df["Brand"], sort=False)
+    n = len(df)
+
+    shared = _SharedBlock()
+    try:
+        for col in _SHARED_INPUTS:
+            shared.put(col, df[col].to_numpy(dtype=float))
+        shared.put("codes", codes.astype(np.int64))
+        shared.put("has_event", df["External_Event"].str.len().to_numpy() > 0)
+        shared.put("month_present", df["Month"].notna().to_numpy(dtype=float))
+        for col in _SHARED_OUTPUTS:
+            shared.alloc(col, (n,), np.float64)
+        shared.alloc("Confidence", (n,), np.int8)
+
+        bounds = _shard_bounds(codes, max(1, workers * shards_per_worker))
+        parts = None
+        if workers > 1 and len(bounds) > 1:
+            try:
+                pool = _get_pool(workers)
+                parts = list(pool.map(_run_shard, *zip(*[(shared.specs, a, b, window) for a, b in bounds])))
+            except BrokenProcessPool:
+                shutdown_pool()
+        if parts is None:
+            parts = [_run_shard(shared.specs, a, b, window) for a, b in bounds]
+
+        for col in _SHARED_OUTPUTS:
+            df[col] = shared.arrays[col].copy()
+        if (codes >= 0).all():
+            df["Months_Of_History"] = df["Months_Of_History"].astype(np.int64)
+        df["Confidence"] = np.array(CONFIDENCE_LEVELS, dtype=object)[shared.arrays["Confidence"]]
+    finally:
+        shared.close()
+
+    # Shards hold disjoint brands, so the partial sums just concatenate
+    acc = SummaryAccumulator()
+    parts = [p for p in parts if len(p["codes"])]
+    if parts:
+        merged = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+        brands = pd.Index(uniques[merged.pop("codes")], name="Brand")
+        acc.totals = pd.DataFrame(merged, index=brands)
+    return df, acc.summary()
@@ -0,0 +1,429 @@
+"""
+monthly_store.py — Incremental Monthly Store
+
+Keeps per-brand monthly aggregates from earlier runs so a new month only
+has to be merged in, not the whole history rebuilt. Each source field is a
+brand × month matrix; the current correlation window also keeps running
+sums per brand and correlation variant:
+
+    Σx, Σy, Σx², Σy², Σxy
+
+Merging diffs the incoming cells against the stored ones and applies only
+the changed cells to the matrices and the sums, so a month-over-month run
+costs in proportion to what changed. Pearson r is then read straight off
+the sums. Merges are upserts: cells missing from an upload keep their
+stored value, so either a full-history re-export or a single new month
+can be merged.
+
+The window trails the report month, so a new month also moves it. The
+sums are kept per pair of months (x at t, y at t + lag), so moving the
+window only subtracts the pairs that leave it and adds the pairs that
+enter: one or two month columns for a month-over-month run, whatever the
+window length.
+
+Delta updates and slides accumulate float rounding; rebuild() recomputes
+the sums exactly from the matrices. It runs when the window jumps by
+more than it keeps, and after RESYNC_SLIDES slides since the last rebuild.
+
+On disk a store is a directory with store.npz (matrices and sums) and
+store.json (brands, months, window, brand metadata).
+"""
+
+import os
+import json
+
+import numpy as np
+
+from attribution_engine import DEFAULT_MAX_LAG, assemble_brand_arrays, batched_pearson, pairs_vary, variant_pairs
+from time_axis import DEFAULT_WINDOW_MONTHS, month_at, month_index, resolve_window
+
+STORE_VERSION = 1
+
+TTS_FIELDS = ("tts",)
+AMZ_FIELDS = ("sales", "ad_sales", "organic", "page_views")
+CONTENT_FIELDS = ("gmv", "impressions", "visitors", "affiliate_gmv",
+                  "videos", "lives", "views", "likes", "creators")
+FIELDS = TTS_FIELDS + AMZ_FIELDS + CONTENT_FIELDS
+
+# Correlation variants in R_TYPES order: (y field, lag in months)
+PAIRS = (("sales", 0), ("organic", 0), ("sales", 1), ("organic", 1))
+
+# Running-sum slots, axis 1 of MonthlyStore.sums
+SX, SY, SXX, SYY, SXY = range(5)
+
+# Relative variance below which the running sums are too cancelled to give r
+_CONST_TOL = 1e-12
+
+# Window slides between exact rebuilds of the running sums
+RESYNC_SLIDES = 24
+
+
+def _month_span(window: list) -> tuple | None:
+    """(first month index, length) of a run of consecutive months, else None."""
+    if not window:
+        return None
+    first = month_index(window[0])
+    if [month_index(ym) for ym in window] != list(range(first, first + len(window))):
+        return None
+    return first, len(window)
+
+
+def _cells(by_brand: dict, fields=None):
+    """
+    Flatten {brand: {(y, m): value | {field: value}}} in one pass into
+    (brands, months, values): values has one column per field in `fields`,
+    or a single column of the plain values when fields is None.
+    """
+    brands = [b for b, ms in by_brand.items() for _ in ms]
+    months = [tuple(ym) for ms in by_brand.values() for ym in ms]
+    cells = [v for ms in by_brand.values() for v in ms.values()]
+    if fields is None:
+        return brands, months, np.asarray(cells, dtype=float).reshape(-1, 1)
+    values = np.array([[(len(v["creators"]) if isinstance(v.get("creators"), set) else 0) if f == "creators"
+                        else v.get(f, 0) for f in fields] for v in cells], dtype=float)
+    return brands, months, values.reshape(len(cells), len(fields))
+
+
+class MonthlyStore:
+    """
+    Brand × month aggregates with running correlation sums.
+
+    merge() takes the same monthly aggregates aggregate_model builds
+    (tts_monthly, amz_monthly, content, tts_meta, amz_brands);
+    brand_arrays() returns what apply_parameters consumes for one
+    upload's master brands, like prepare_brand_arrays.
+
+    Costs: a merge reads every cell it is given but touches the sums only
+    for cells that changed; moving the window costs the months that leave
+    and enter it (brands × months moved), not the window length.
+    """
+
+    def __init__(self, window=()):
+        self.window = [tuple(ym) for ym in window]
+        self.brands: list[str] = []
+        self.months: list[tuple] = []
+        self.tts_meta: dict = {}
+        self.amz_brands: set = set()
+        self.tts_brands: set = set()
+        self.content_months: set = set()
+        self._brand_idx: dict = {}
+        self._month_idx: dict = {}
+        self.data = {f: np.zeros((0, 0)) for f in FIELDS}
+        self.sums = np.zeros((len(PAIRS), 5, 0))
+        self.slides = 0   # since the last rebuild()
+
+    # ── Axes ──────────────────────────────────────────────────────────────────
+
+    def _grow(self, brands, months) -> None:
+        new_b = [b for b in dict.fromkeys(brands) if b not in self._brand_idx]
+        new_m = [m for m in dict.fromkeys(months) if m not in self._month_idx]
+        if not new_b and not new_m:
+            return
+        for b in new_b:
+            self._brand_idx[b] = len(self.brands)
+            self.brands.append(b)
+        for m in new_m:
+            self._month_idx[m] = len(self.months)
+            self.months.append(m)
+        pad = ((0, len(new_b)), (0, len(new_m)))
+        self.data = {f: np.pad(a, pad) for f, a in self.data.items()}
+        self.sums = np.pad(self.sums, ((0, 0), (0, 0), (0, len(new_b))))
+
+    def _window_cols(self) -> np.ndarray:
+        """Column of each window month in the matrices (-1 for months not seen yet)."""
+        return np.array([self._month_idx.get(ym, -1) for ym in self.window], dtype=np.int64)
+
+    def _window_values(self, field: str, rows: np.ndarray, t: np.ndarray) -> np.ndarray:
+        """data[field] at window position t (0 where t is outside the window or unseen)."""
+        win_cols = self._window_cols()
+        inside = (t >= 0) & (t < len(win_cols))
+        cols = np.where(inside, win_cols[np.clip(t, 0, max(len(win_cols) - 1, 0))] if len(win_cols) else -1, -1)
+        out = np.zeros(len(rows))
+        hit = cols >= 0
+        out[hit] = self.data[field][rows[hit], cols[hit]]
+        return out
+
+    # ── Merge ─────────────────────────────────────────────────────────────────
+
+    def _upsert(self, field: str, rows, cols, values) -> tuple:
+        """Write cells; return (rows, cols, old, new) for those that changed."""
+        old = self.data[field][rows, cols]
+        changed = old != values
+        rows, cols, old, new = rows[changed], cols[changed], old[changed], values[changed]
+        self.data[field][rows, cols] = new
+        return rows, cols, old, new
+
+    def _update_sums(self, field: str, rows, cols, old, new) -> None:
+        """Fold changed window cells of tts/sales/organic into the running sums."""
+        # Window position of each matrix column (-1 outside the window)
+        pos = np.full(len(self.months), -1, dtype=np.int64)
+        win_cols = self._window_cols()
+        pos[win_cols[win_cols >= 0]] = np.flatnonzero(win_cols >= 0)
+        t = pos[cols]
+        inside = t >= 0
+        rows, t, old, new = rows[inside], t[inside], old[inside], new[inside]
+        if not len(rows):
+            return
+        d, q = new - old, new * new - old * old
+        W = len(self.window)
+        for k, (y_field, lag) in enumerate(PAIRS):
+            if field == "tts":
+                # x at t pairs with y at t + lag
+                m = t < W - lag
+                partner = self._window_values(y_field, rows[m], t[m] + lag)
+                slot, sq = SX, SXX
+            elif field == y_field:
+                # y at t pairs with x at t - lag
+                m = t >= lag
+                partner = self._window_values("tts", rows[m], t[m] - lag)
+                slot, sq = SY, SYY
+            else:
+                continue
+            r = rows[m]
+            np.add.at(self.sums[k, slot], r, d[m])
+            np.add.at(self.sums[k, sq], r, q[m])
+            np.add.at(self.sums[k, SXY], r, d[m] * partner)
+
+    def merge(self, tts_monthly=None, amz_monthly=None, content=None,
+              tts_meta=None, amz_brands=None) -> dict:
+        """
+        Upsert monthly aggregates and update the running sums.
+
+        TTS cells are applied before Amazon cells, so Σxy picks up the
+        product of the new values when both sides of a pair change.
+        Returns {field: number of changed cells}.
+        """
+        sources = []
+        if tts_monthly:
+            sources.append((TTS_FIELDS, tts_monthly))
+            self.tts_brands.update(tts_monthly)
+        if amz_monthly:
+            sources.append((AMZ_FIELDS, amz_monthly))
+        if content:
+            sources.append((CONTENT_FIELDS, content))
+            self.content_months.update(tuple(ym) for ms in content.values() for ym in ms)
+
+        flat = [(fields, _cells(by_brand, None if fields == TTS_FIELDS else fields)) for fields, by_brand in sources]
+        self._grow([b for _, (bs, _, _) in flat for b in bs], [m for _, (_, ms, _) in flat for m in ms])
+
+        changed = {}
+        for fields, (bs, ms, vals) in flat:
+            rows = np.fromiter(map(self._brand_idx.__getitem__, bs), dtype=np.int64, count=len(bs))
+            cols = np.fromiter(map(self._month_idx.__getitem__, ms), dtype=np.int64, count=len(ms))
+            for j, f in enumerate(fields):
+                r, c, old, new = self._upsert(f, rows, cols, vals[:, j])
+                changed[f] = len(r)
+                if f in ("tts", "sales", "organic"):
+                    self._update_sums(f, r, c, old, new)
+
+        if tts_meta:
+            self.tts_meta.update(tts_meta)
+        if amz_brands:
+            self.amz_brands.update(amz_brands)
+        return changed
+
+    def set_window(self, window) -> None:
+        """
+        Move the correlation window to these months: slide the sums when
+        the old and new windows overlap enough, else rebuild them.
+        """
+        window = [tuple(ym) for ym in window]
+        if window == self.window:
+            return
+        if self.slides < RESYNC_SLIDES and self._slide(window):
+            self.slides += 1
+        else:
+            self.window = window
+            self.rebuild()
+
+    def _months_columns(self, field: str, months: list) -> np.ndarray:
+        """data[field] at calendar month indices `months`, brands × months (0 for unseen months)."""
+        out = np.zeros((len(self.brands), len(months)))
+        for i, m in enumerate(months):
+            c = self._month_idx.get(month_at(m))
+            if c is not None:
+                out[:, i] = self.data[field][:, c]
+        return out
+
+    def _slide(self, window: list) -> bool:
+        """
+        Update the sums for a move between two runs of consecutive months:
+        pairs are keyed by their x month, so per variant the pairs leaving
+        are the old x months not in the new range and vice versa. Returns
+        False (sums untouched) when that is no cheaper than a rebuild.
+        """
+        old, new = _month_span(self.window), _month_span(window)
+        if old is None or new is None:
+            return False
+        moves = []
+        for _, lag in PAIRS:
+            was = set(range(old[0], old[0] + old[1] - lag))
+            now = set(range(new[0], new[0] + new[1] - lag))
+            moves.append((sorted(was - now), sorted(now - was)))
+        if sum(len(out) + len(inc) for out, inc in moves) >= sum(max(new[1] - lag, 0) for _, lag in PAIRS):
+            return False
+
+        x_cache = {}
+
+        def terms(y_field, lag, xm):
+            """Per-brand Σx, Σy, Σx², Σy², Σxy over the pairs with x in months xm."""
+            if not xm:
+                return np.zeros((5, len(self.brands)))
+            if tuple(xm) not in x_cache:
+                x_cache[tuple(xm)] = self._months_columns("tts", xm)
+            x = x_cache[tuple(xm)]
+            y = self._months_columns(y_field, [m + lag for m in xm])
+            return np.stack([x.sum(axis=1), y.sum(axis=1), (x * x).sum(axis=1),
+                             (y * y).sum(axis=1), (x * y).sum(axis=1)])
+
+        for k, ((y_field, lag), (out, inc)) in enumerate(zip(PAIRS, moves)):
+            removed, added = terms(y_field, lag, out), terms(y_field, lag, inc)
+            scale = np.abs(self.sums[k]) + np.abs(removed) + np.abs(added)
+            self.sums[k] += added - removed
+            # What cancels down to rounding noise was zero (e.g. all pairs left)
+            self.sums[k][np.abs(self.sums[k]) <= 1e-12 * scale] = 0.0
+        self.window = window
+        return True
+
+    def rebuild(self) -> None:
+        """Recompute the running sums exactly from the stored matrices."""
+        self.slides = 0
+        W = len(self.window)
+        x = self.window_matrix("tts")
+        for k, (y_field, lag) in enumerate(PAIRS):
+            y = self.window_matrix(y_field)
+            xs, ys = x[:, :W - lag], y[:, lag:]
+            self.sums[k, SX] = xs.sum(axis=1)
+            self.sums[k, SY] = ys.sum(axis=1)
+            self.sums[k, SXX] = (xs * xs).sum(axis=1)
+            self.sums[k, SYY] = (ys * ys).sum(axis=1)
+            self.sums[k, SXY] = (xs * ys).sum(axis=1)
+
+    # ── Read ──────────────────────────────────────────────────────────────────
+
+    def window_matrix(self, field: str, rows=None) -> np.ndarray:
+        """data[field] over the correlation window (zeros for unseen months)."""
+        a = self.data[field] if rows is None else self.data[field][rows]
+        out = np.zeros((a.shape[0], len(self.window)))
+        for i, ym in enumerate(self.window):
+            c = self._month_idx.get(ym)
+            if c is not None:
+                out[:, i] = a[:, c]
+        return out
+
+    def month_column(self, field: str, ym: tuple, rows=None) -> np.ndarray:
+        a = self.data[field] if rows is None else self.data[field][rows]
+        c = self._month_idx.get(tuple(ym))
+        return a[:, c].copy() if c is not None else np.zeros(a.shape[0])
+
+    def correlations(self, rows=None, series=None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (r, ok) per correlation variant, shaped (len(R_TYPES), n_brands)
+        like attribution_engine.pair_correlations.
+
+        ok is pair_correlations' rule (pairs_vary) on the window matrices
+        `series` = (tts, sales, organic), read here when not given. r comes
+        from the running sums, except where they cancel below _CONST_TOL of
+        Σx² or Σy² (near-constant series): those are recomputed from the
+        window with batched_pearson, as the non-store path does.
+        """
+        if series is None:
+            series = tuple(self.window_matrix(f, rows) for f in ("tts", "sales", "organic"))
+        pairs = variant_pairs(*series, max_lag=1)
+        ok = pairs_vary(pairs)
+        s = self.sums if rows is None else self.sums[:, :, rows]
+        n = np.array([len(self.window) - lag for _, lag in PAIRS], dtype=float)[:, None]
+        vx = s[:, SXX] - s[:, SX] ** 2 / n
+        vy = s[:, SYY] - s[:, SY] ** 2 / n
+        cov = s[:, SXY] - s[:, SX] * s[:, SY] / n
+        sound = ok & (vx > _CONST_TOL * s[:, SXX]) & (vy > _CONST_TOL * s[:, SYY])
+        r = np.full(ok.shape, np.nan)
+        r[sound] = np.clip(cov[sound] / np.sqrt(vx[sound] * vy[sound]), -1.0, 1.0)
+        for k, (x, y) in enumerate(pairs):
+            redo = ok[k] & ~sound[k]
+            if redo.any():
+                r[k, redo] = batched_pearson(x[redo], y[redo])
+        return r, ok
+
+    def latest_content_month(self, default=(2026, 1)) -> tuple:
+        return max(self.content_months) if self.content_months else default
+
+    def brand_arrays(self, master_brands, latest: tuple, window=DEFAULT_WINDOW_MONTHS, n_resamples: int = 0,
+                     max_lag: int = DEFAULT_MAX_LAG) -> dict:
+        """
+        Per-brand arrays for apply_parameters over `master_brands` (the
+        current upload's, not every brand the store has seen), in the same
+        order as prepare_brand_arrays. `window`, `n_resamples` and `max_lag`
+        are as there; lags past one month are scanned from the window
+        matrices rather than kept as running sums.
+        """
+        self.set_window(resolve_window(window, latest))
+        brands = sorted(master_brands)
+        # A master brand with no cells anywhere is all zeros, as in prepare_brand_arrays
+        self._grow(brands, [])
+        rows = np.array([self._brand_idx[b] for b in brands], dtype=np.int64)
+        latest_content = {f: self.month_column(f, latest, rows) for f in CONTENT_FIELDS}
+        for f in ("videos", "lives", "creators"):
+            latest_content[f] = latest_content[f].astype(int).tolist()
+        series = tuple(self.window_matrix(f, rows) for f in ("tts", "sales", "organic"))
+        return assemble_brand_arrays(
+            brands, self.tts_meta, *series,
+            self.month_column("tts", latest, rows), self.month_column("sales", latest, rows),
+            latest_content, *self.correlations(rows, series), window=self.window, n_resamples=n_resamples,
+            max_lag=max_lag)
+
+    # ── Persistence ───────────────────────────────────────────────────────────
+
+    def save(self, path: str) -> None:
+        """Write the store to directory `path` (matrices first, then metadata)."""
+        os.makedirs(path, exist_ok=True)
+        tmp = os.path.join(path, ".store.tmp.npz")
+        np.savez(tmp, sums=self.sums, **self.data)
+        os.replace(tmp, os.path.join(path, "store.npz"))
+        meta = {
+            "version": STORE_VERSION,
+            "window": self.window,
+            "brands": self.brands,
+            "months": self.months,
+            "tts_meta": self.tts_meta,
+            "amz_brands": sorted(self.amz_brands),
+            "tts_brands": sorted(self.tts_brands),
+            "content_months": sorted(self.content_months),
+            "slides": self.slides,
+        }
+        tmp = os.path.join(path, ".store.tmp.json")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, "store.json"))
+
+    @classmethod
+    def load(cls, path: str) -> "MonthlyStore":
+        """
+        Open the store in `path`, or an empty one if there is none yet (or
+        it was written by another version).
+        """
+        store = cls()
+        try:
+            with open(os.path.join(path, "store.json")) as f:
+                meta = json.load(f)
+            if meta.get("version") != STORE_VERSION:
+                return store
+            with np.load(os.path.join(path, "store.npz")) as z:
+                data = {f: z[f] for f in FIELDS}
+                sums = z["sums"]
+        except (OSError, ValueError, KeyError):
+            return store
+        store.brands = list(meta["brands"])
+        store.months = [tuple(m) for m in meta["months"]]
+        store._brand_idx = {b: i for i, b in enumerate(store.brands)}
+        store._month_idx = {m: i for i, m in enumerate(store.months)}
+        store.tts_meta = meta["tts_meta"]
+        store.amz_brands = set(meta["amz_brands"])
+        store.tts_brands = set(meta["tts_brands"])
+        store.content_months = {tuple(m) for m in meta["content_months"]}
+        store.window = [tuple(m) for m in meta["window"]]
+        store.slides = meta.get("slides", 0)
+        store.data = data
+        store.sums = sums
+        return store
+
@@ -0,0 +1,175 @@
+"""
+parse_cache.py — Persistent Parse Cache
+
+Keeps parsed uploads on disk between server restarts and redeploys, keyed
+by a hash of the uploaded bytes plus the parser version. Re-uploading a
+file that has been seen before loads its columns back instead of parsing
+the workbook again.
+
+Each entry is a directory of one .npy file per column, loaded with
+np.load(mmap_mode='r'). String columns are dictionary-encoded: the
+distinct values go in meta.json and the column itself is int32 codes.
+Small row-oriented results (the GMV CSV) are stored in meta.json. Once
+the cache goes over its size budget, the least recently used entries are
+deleted.
+
+Environment:
+  TTS_PARSE_CACHE_DIR   cache location (default ~/.cache/tts-lift/parse;
+                        set to "off" to disable)
+  TTS_PARSE_CACHE_MB    size budget in MB (default 1024)
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+import numpy as np
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tts-lift", "parse")
+DEFAULT_MAX_MB = 1024
+
+
+def content_hash(fb: bytes) -> str:
+    return hashlib.sha256(fb).hexdigest()
+
+
+# ── Encoding ──────────────────────────────────────────────────────────────────
+
+def _save_columns(d: str, prefix: str, cols: dict, meta: dict) -> None:
+    """Write {field: ndarray | list[str]} as .npy files under `prefix`."""
+    for f, col in cols.items():
+        name = f"{prefix}{f}"
+        if isinstance(col, np.ndarray):
+            np.save(os.path.join(d, name + ".npy"), col)
+            continue
+        uniq = {}
+        codes = np.fromiter((uniq.setdefault(s, len(uniq)) for s in col), dtype=np.int32, count=len(col))
+        np.save(os.path.join(d, name + ".codes.npy"), codes)
+        meta["strings"][name] = list(uniq)
+
+
+def _load_columns(d: str, prefix: str, fields: list, meta: dict) -> dict:
+    out = {}
+    for f in fields:
+        name = f"{prefix}{f}"
+        if name in meta["strings"]:
+            uniq = meta["strings"][name]
+            codes = np.load(os.path.join(d, name + ".codes.npy"), mmap_mode="r")
+            out[f] = [uniq[c] for c in codes.tolist()]
+        else:
+            out[f] = np.load(os.path.join(d, name + ".npy"), mmap_mode="r")
+    return out
+
+
+def _encode(value, d: str) -> dict:
+    """Write `value` into directory d and return its meta.json payload."""
+    meta = {"strings": {}}
+    if value is None:
+        meta["layout"] = "none"
+    elif isinstance(value, list):
+        # GMV rows: {'brand', 'ps', 'status', 'monthly': {(y, m): v}}
+        meta["layout"] = "rows"
+        meta["rows"] = [{**r, "monthly": [[y, m, v] for (y, m), v in r["monthly"].items()]} for r in value]
+    elif all(isinstance(v, dict) for v in value.values()):
+        # Broadway: {sheet: {field: column}}
+        meta["layout"] = "tables"
+        meta["tables"] = {t: list(cols) for t, cols in value.items()}
+        for t, cols in value.items():
+            _save_columns(d, f"{t}.", cols, meta)
+    else:
+        meta["layout"] = "columns"
+        meta["fields"] = list(value)
+        _save_columns(d, "", value, meta)
+    return meta
+
+
+def _decode(meta: dict, d: str):
+    layout = meta["layout"]
+    if layout == "none":
+        return None
+    if layout == "rows":
+        return [{**r, "monthly": {(y, m): v for y, m, v in r["monthly"]}} for r in meta["rows"]]
+    if layout == "tables":
+        return {t: _load_columns(d, f"{t}.", fields, meta) for t, fields in meta["tables"].items()}
+    return _load_columns(d, "", meta["fields"], meta)
+
+
+# ── Cache ─────────────────────────────────────────────────────────────────────
+
+class ParseCache:
+    """
+    Directory of parsed uploads, one subdirectory per (kind, version, hash).
+
+    get()/put() never raise on I/O problems — a broken or unwritable
+    cache just means parsing again.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_MB * 2**20):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_env(cls) -> "ParseCache | None":
+        root = os.environ.get("TTS_PARSE_CACHE_DIR", DEFAULT_DIR)
+        if not root or root.lower() in ("off", "0", "none"):
+            return None
+        mb = float(os.environ.get("TTS_PARSE_CACHE_MB", DEFAULT_MAX_MB))
+        return cls(root, int(mb * 2**20))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def get(self, key: str):
+        """(True, value) on a hit, (False, None) on a miss."""
+        d = self._path(key)
+        try:
+            with open(os.path.join(d, "meta.json")) as f:
+                meta = json.load(f)
+            value = _decode(meta, d)
+            os.utime(os.path.join(d, "meta.json"))   # mark as recently used
+            return True, value
+        except (OSError, ValueError, KeyError):
+            return False, None
+
+    def put(self, key: str, value) -> None:
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp = tempfile.mkdtemp(prefix=".tmp-", dir=self.root)
+            try:
+                meta = _encode(value, tmp)
+                with open(os.path.join(tmp, "meta.json"), "w") as f:
+                    json.dump(meta, f)
+                os.replace(tmp, self._path(key))
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)
+                return
+            self.evict()
+        except OSError:
+            pass
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        """(last used, size in bytes, path) for every complete entry."""
+        out = []
+        for name in os.listdir(self.root):
+            d = self._path(name)
+            if name.startswith(".tmp-") or not os.path.isdir(d):
+                continue
+            try:
+                used = os.path.getmtime(os.path.join(d, "meta.json"))
+                size = sum(e.stat().st_size for e in os.scandir(d))
+            except OSError:
+                continue
+            out.append((used, size, d))
+        return out
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits its budget."""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, d in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(d, ignore_errors=True)
+            total -= size
@@ -0,0 +1,415 @@
+"""
+parsers.py — Upload Parsers
+
+Streaming readers for the monthly uploads. No Streamlit imports here, so
+the app, benchmarks and batch jobs can all share them.
+
+The Broadway reader walks the worksheet XML inside the XLSM directly
+instead of going through openpyxl: only the columns the model uses are
+decoded, rows are dropped as soon as they are read, and each sheet comes
+back as typed column arrays rather than a list of per-row dicts.
+"""
+
+import re
+import csv
+import io
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+from array import array
+from datetime import datetime
+from io import BytesIO
+
+import numpy as np
+
+# Bump whenever a parser's output changes, so persisted parses are not reused
+PARSER_VERSION = 2
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def sf(v):
+    """Lenient float: strips $ , % and returns 0.0 for anything unparseable."""
+    try: return float(str(v).replace('$', '').replace(',', '').replace('%', ''))
+    except: return 0.0
+
+
+MO_MAP={'january':1,'february':2,'march':3,'april':4,'may':5,'june':6,
+        'july':7,'august':8,'september':9,'october':10,'november':11,'december':12,
+        'jan':1,'feb':2,'mar':3,'apr':4,'jun':6,'jul':7,'aug':8,'sep':9,'oct':10,'nov':11,'dec':12}
+
+# Four-digit year anywhere in a header ("Jan 2025", "2026-02 GMV", ...)
+_YEAR = re.compile(r"(?<!\d)((?:19|20)\d\d)(?!\d)")
+
+
+# ── XLSX Streaming ────────────────────────────────────────────────────────────
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_TEXT = _NS + "t"
+_RUN = _NS + "r"
+
+
+def _col_index(ref: str, cache: dict) -> int:
+    """'AB12' -> 27 (0-based column)."""
+    letters = ref.rstrip("0123456789")
+    idx = cache.get(letters)
+    if idx is None:
+        idx = 0
+        for ch in letters:
+            idx = idx * 26 + (ord(ch.upper()) - 64)
+        idx -= 1
+        cache[letters] = idx
+    return idx
+
+
+def _cast_number(text: str):
+    """Numeric cell text -> int or float, the way openpyxl reads it."""
+    if "." in text or "E" in text or "e" in text:
+        return float(text)
+    return int(text)
+
+
+def _rich_text(node) -> str:
+    """Plain text of a shared/inline string, skipping phonetic runs."""
+    t = node.find(_TEXT)
+    if t is not None:
+        return t.text or ""
+    return "".join((r.findtext(_TEXT) or "") for r in node.iter(_RUN))
+
+
+def workbook_sheets(zf: zipfile.ZipFile) -> dict[str, str]:
+    """Sheet name -> worksheet XML path inside the archive."""
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    targets = {r.get("Id"): r.get("Target") for r in rels.iter(_PKG_REL_NS + "Relationship")}
+    wb = ET.fromstring(zf.read("xl/workbook.xml"))
+    out = {}
+    for s in wb.iter(_NS + "sheet"):
+        target = targets.get(s.get(_REL_NS + "id"))
+        if not target:
+            continue
+        path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+        out[s.get("name")] = path
+    return out
+
+
+def shared_strings(zf: zipfile.ZipFile) -> list[str]:
+    """The workbook's shared string table (empty if there is none)."""
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    out = []
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, el in ET.iterparse(f):
+            if el.tag == _NS + "si":
+                out.append(_rich_text(el))
+                el.clear()
+    return out
+
+
+def iter_sheet_rows(zf: zipfile.ZipFile, path: str, cols: set[int], strings: list[str],
+                    chunk_size: int = 1 << 16):
+    """Stream worksheet `path` of the archive; see iter_xml_rows."""
+    with zf.open(path) as f:
+        yield from iter_xml_rows(f, cols, strings, chunk_size)
+
+
+def iter_xml_rows(f, cols: set[int], strings: list[str], chunk_size: int = 1 << 16):
+    """
+    Stream worksheet XML from the binary file `f` as (row_number,
+    {col: value}) for the wanted columns.
+
+    Cells outside `cols` are skipped without decoding. Values are typed
+    like openpyxl's data_only read: cached formula results, shared and
+    inline strings, ints/floats, bools. The XML is fed to expat in chunks
+    and rows are handed out as each chunk completes them, so memory stays
+    flat however long the sheet is.
+    """
+    col_cache = {}
+    rows = []
+    row_num = 0
+    vals = {}
+    col = -1
+    ctype = None
+    wanted = False
+    text = None      # char data of the current wanted <v>/<t>
+    inline = None    # text pieces of the current inline string
+
+    # Element names without namespace processing (which roughly doubles
+    # expat's cost); the sheet's prefix, if any, is read off the root tag.
+    x_row, x_cell, x_value, x_text = "row", "c", "v", "t"
+
+    def start(name, attrs):
+        nonlocal row_num, vals, col, ctype, wanted, text, inline
+        nonlocal x_row, x_cell, x_value, x_text
+        if name == x_cell:
+            ref = attrs.get("r")
+            if ref:
+                col = col_cache.get(ref.rstrip("0123456789"))
+                if col is None:
+                    col = _col_index(ref, col_cache)
+            else:
+                col += 1
+            wanted = col in cols
+            if wanted:
+                ctype = attrs.get("t")
+                inline = [] if ctype == "inlineStr" else None
+        elif name == x_value or name == x_text:
+            if wanted:
+                text = []
+        elif name == x_row:
+            r = attrs.get("r")
+            row_num = int(r) if r else row_num + 1
+            vals = {}
+            col = -1
+        elif name.endswith(":worksheet"):
+            p = name[:-len("worksheet")]
+            x_row, x_cell, x_value, x_text = p + "row", p + "c", p + "v", p + "t"
+
+    def data(s):
+        if text is not None:
+            text.append(s)
+
+    def end(name):
+        nonlocal text, wanted
+        if name == x_value:
+            if text is not None:
+                raw = "".join(text)
+                text = None
+                if ctype == "s":
+                    vals[col] = strings[int(raw)]
+                elif ctype == "b":
+                    vals[col] = raw == "1"
+                elif ctype in ("str", "e", "d", "inlineStr"):
+                    vals[col] = raw
+                else:
+                    vals[col] = _cast_number(raw)
+        elif name == x_text:
+            if text is not None:
+                if inline is not None:
+                    inline.append("".join(text))
+                text = None
+        elif name == x_cell:
+            if wanted and inline is not None:
+                vals[col] = "".join(inline)
+            wanted = False
+        elif name == x_row:
+            rows.append((row_num, vals))
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = data
+    while True:
+        chunk = f.read(chunk_size)
+        parser.Parse(chunk, not chunk)
+        if rows:
+            yield from rows
+            rows.clear()
+        if not chunk:
+            break
+
+
+# ── GMV CSV ───────────────────────────────────────────────────────────────────
+
+def parse_gmv_csv(fb):
+    """Parse the monthly GMV CSV into one {brand, ps, status, monthly} dict per brand row."""
+    text=fb.decode('utf-8-sig');reader=csv.reader(io.StringIO(text));rows=list(reader)
+    hi=None
+    for i,r in enumerate(rows):
+        if r and str(r[0]).strip().upper()=='BRAND': hi=i;break
+    if hi is None: return None
+    headers=rows[hi]; month_cols={}
+    for ci,h in enumerate(headers):
+        hl=str(h).strip().lower()
+        for mn,mv in MO_MAP.items():
+            if mn in hl:
+                years=_YEAR.findall(hl)
+                if years: month_cols[(int(max(years)),mv)]=ci
+                break
+    data=[]
+    for r in rows[hi+1:]:
+        if not r or not r[0] or r[0].strip() in ('Total',''): continue
+        brand=r[0].strip();ps=r[1].strip() if len(r)>1 else '';status=r[3].strip() if len(r)>3 else ''
+        monthly={}
+        for (year,month),ci in month_cols.items():
+            if ci<len(r): monthly[(year,month)]=sf(r[ci])
+        data.append({'brand':brand,'ps':ps,'status':status,'monthly':monthly})
+    return data
+
+
+# ── Broadway ──────────────────────────────────────────────────────────────────
+
+# sheet key -> (sheet name, {field: (column, kind)})
+#   str: str(v) if v else ''   num: sf(v)   int: int(sf(v)) if v else 0
+BROADWAY_SHEETS = {
+    "pr": ("Partner Raw", {
+        "shop": (0, "str"), "gmv": (1, "num"), "affiliate_gmv": (10, "num"),
+        "impressions": (13, "num"), "visitors": (14, "num"),
+        "month": (18, "int"), "year": (20, "int"),
+    }),
+    "vr": ("Partner Video Raw", {
+        "shop": (0, "str"), "lives": (9, "num"), "videos": (10, "num"),
+        "month": (13, "int"), "year": (15, "int"),
+    }),
+    "ct": ("Retainer Creator TAP Data", {
+        "creator": (5, "str"), "shop": (10, "str"),
+        "views": (18, "num"), "likes": (19, "num"),
+        "month": (24, "int"), "year": (26, "int"),
+    }),
+}
+
+_TYPECODES = {"num": "d", "int": "q"}
+
+
+def _empty_columns(fields: dict) -> dict:
+    return {f: ([] if kind == "str" else array(_TYPECODES[kind])) for f, (_, kind) in fields.items()}
+
+
+def _finish_columns(cols: dict) -> dict:
+    """array('d'/'q') buffers -> float64/int64 ndarrays; strings stay lists."""
+    dtypes = {"d": np.float64, "q": np.int64}
+    return {f: np.frombuffer(buf, dtype=dtypes[buf.typecode]) if isinstance(buf, array) else buf
+            for f, buf in cols.items()}
+
+
+def read_broadway_sheet(zf: zipfile.ZipFile, path: str, fields: dict, strings: list[str],
+                        min_year: int | None = None) -> dict:
+    """
+    Read one Broadway sheet into column arrays.
+
+    Skips the header row and rows with an empty first column, like the
+    openpyxl parser did. When `min_year` is set, rows with an earlier (or
+    missing) year are dropped here instead of later in the model.
+    """
+    with zf.open(path) as f:
+        return _sheet_columns(f, fields, strings, min_year)
+
+
+def _sheet_columns(f, fields: dict, strings: list[str], min_year: int | None) -> dict:
+    """read_broadway_sheet on the worksheet XML stream `f`."""
+    cols = {0} | {c for c, _ in fields.values()}
+    out = _empty_columns(fields)
+    year_col = fields["year"][0] if "year" in fields else None
+    for rn, vals in iter_xml_rows(f, cols, strings):
+        if rn == 1 or not vals.get(0):
+            continue
+        if min_year is not None:
+            y = vals.get(year_col)
+            if (int(sf(y)) if y else 0) < min_year:
+                continue
+        for f, (c, kind) in fields.items():
+            v = vals.get(c)
+            if kind == "str":
+                out[f].append(str(v) if v else "")
+            elif kind == "num":
+                out[f].append(sf(v))
+            else:
+                out[f].append(int(sf(v)) if v else 0)
+    return _finish_columns(out)
+
+
+def read_broadway(fb: bytes, min_year: int | None = None, sheets=None) -> dict:
+    """
+    Parse a Broadway XLSM into {'pr', 'vr', 'ct'} column dicts.
+
+    Each value is {field: ndarray or list[str]} with the fields listed in
+    BROADWAY_SHEETS. Missing sheets come back with zero-length columns.
+    `sheets` limits the parse to some of the keys, so separate workers can
+    each take one sheet.
+    """
+    with zipfile.ZipFile(BytesIO(fb)) as zf:
+        paths = workbook_sheets(zf)
+        strings = shared_strings(zf)
+        out = {}
+        for key in sheets or BROADWAY_SHEETS:
+            name, fields = BROADWAY_SHEETS[key]
+            if name in paths:
+                out[key] = read_broadway_sheet(zf, paths[name], fields, strings, min_year)
+            else:
+                out[key] = _finish_columns(_empty_columns(fields))
+    return out
+
+
+def broadway_sheet_xml(fb: bytes, sheets=None) -> tuple[dict, list[str]]:
+    """
+    ({key: worksheet XML bytes, or None for a missing sheet}, shared
+    strings) for a Broadway workbook: the archive is opened and its shared
+    strings parsed once, so each sheet can go to its own worker as
+    read_broadway_xml(key, xml, strings).
+    """
+    with zipfile.ZipFile(BytesIO(fb)) as zf:
+        paths = workbook_sheets(zf)
+        strings = shared_strings(zf)
+        xml = {}
+        for key in sheets or BROADWAY_SHEETS:
+            name = BROADWAY_SHEETS[key][0]
+            xml[key] = zf.read(paths[name]) if name in paths else None
+    return xml, strings
+
+
+def read_broadway_xml(key: str, xml: bytes | None, strings: list[str], min_year: int | None = None) -> dict:
+    """read_broadway(sheets=(key,)) from broadway_sheet_xml output: {key: column arrays}."""
+    fields = BROADWAY_SHEETS[key][1]
+    if xml is None:
+        return {key: _finish_columns(_empty_columns(fields))}
+    return {key: _sheet_columns(BytesIO(xml), fields, strings, min_year)}
+
+
+# ── Amazon ────────────────────────────────────────────────────────────────────
+
+# field -> column kind for the Amazon "Brands > Aggregations" rows
+AMAZON_FIELDS = {
+    "year": "int", "month": "int", "brand_raw": "str",
+    "sales": "num", "ad_sales": "num", "organic": "num", "page_views": "num",
+}
+
+
+def parse_amazon(fb):
+    """
+    Parse the Amazon report into column arrays (see AMAZON_FIELDS).
+
+    Returns None when no sheet has Start Date + Brand headers or when no
+    rows parse.
+    """
+    import openpyxl
+    wb=openpyxl.load_workbook(BytesIO(fb),read_only=True,data_only=True)
+    target=None
+    for s in wb.sheetnames:
+        ws=wb[s]
+        first=[str(c).lower() if c else '' for c in next(ws.iter_rows(max_row=1,values_only=True))]
+        if any('start' in f and 'date' in f for f in first) and any('brand' in f for f in first):
+            target=s;break
+    if not target:wb.close();return None
+    ws=wb[target];headers=None;rows=[]
+    for i,row in enumerate(ws.iter_rows(values_only=True)):
+        v=list(row)
+        if i==0:headers=[str(c).strip() if c else '' for c in v];continue
+        if v[0]:rows.append(v)
+    wb.close()
+    if not headers or not rows:return None
+    hl=[h.lower() for h in headers]
+    def fc(kws):
+        for k in kws:
+            for j,h in enumerate(hl):
+                if all(w in h for w in k.split()):return j
+        return None
+    cs=fc(['start date']);cb=fc(['brand']);ct_col=fc(['total sales $','total sales'])
+    cas=fc(['ad sales','advertising sales','sponsored sales'])
+    cpv=fc(['total page view','page view'])
+    if cs is None or cb is None or ct_col is None:return None
+    out={f:([] if k=='str' else array(_TYPECODES[k])) for f,k in AMAZON_FIELDS.items()}
+    for v in rows:
+        try:
+            s=v[cs]
+            if isinstance(s,str):s=datetime.strptime(s.split(' ')[0],'%Y-%m-%d')
+            elif not isinstance(s,datetime):continue
+            sales=sf(v[ct_col]);ad_s=sf(v[cas]) if cas is not None else 0
+            row=(s.year,s.month,str(v[cb]).strip(),sales,ad_s,sales-ad_s,
+                 sf(v[cpv]) if cpv is not None else 0)
+        except:continue
+        for f,x in zip(AMAZON_FIELDS,row):out[f].append(x)
+    if not out['brand_raw']:return None
+    return _finish_columns(out)
@@ -0,0 +1,357 @@
+"""
+reports.py — Brand PDF Reports
+
+The two-page brand report from the Deep Dive tab (KPIs, attribution
+detail, TTS vs Amazon chart, monthly table, funnel summary), drawn with
+reportlab and a matplotlib chart. It takes a plain model row dict, so it
+runs outside Streamlit:
+
+    pdf = brand_report(row, months, window_label, month_label)
+
+For the whole roster, BulkExport renders every brand in a process pool
+from a background thread and streams the PDFs into one zip as they
+finish; the app polls its progress. Each worker loads matplotlib and
+reportlab, the chart figure and the font lookups once (init_worker) and
+reuses them for every brand it draws (one figure per thread in the app).
+"""
+
+import os
+import re
+import zipfile
+import threading
+import multiprocessing
+from io import BytesIO
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.colors import HexColor, white
+from reportlab.pdfgen import canvas as pdf_canvas
+from reportlab.lib.utils import ImageReader
+
+from theme import fd, fn
+
+CHART_SIZE = (7, 2.5)   # inches
+
+# Colors
+bg_color = HexColor('#0A0A0A')
+surface = HexColor('#111111')
+border = HexColor('#2A2A2A')
+coral_pdf = HexColor('#FF6B35')
+green_pdf = HexColor('#34D399')
+blue_pdf = HexColor('#60A5FA')
+purple_pdf = HexColor('#A78BFA')
+text_w = white
+text_g = HexColor('#9CA3AF')
+conf_colors_pdf = {'HIGH':HexColor('#34D399'),'MED':HexColor('#FBBF24'),'LOW':HexColor('#FB923C'),'WEAK':HexColor('#EF4444'),'INSUF':HexColor('#4B5563')}
+
+# One reusable chart figure per thread (app sessions share the process)
+_local = threading.local()
+
+
+def init_worker():
+    """Create the reusable chart figure and warm the font lookups (once per worker)."""
+    fig = getattr(_local, "fig", None)
+    if fig is None:
+        # Figure + Agg canvas, not pyplot: no global figure registry to share
+        fig = _local.fig = Figure(figsize=CHART_SIZE)
+        FigureCanvasAgg(fig)
+        # The first text draw resolves fonts and builds glyph caches
+        fig.text(0, 0, "$0 TTS GMV", fontsize=7, fontweight='bold')
+        fig.canvas.draw()
+    return fig
+
+
+def _file_part(text: str) -> str:
+    """Only [A-Za-z0-9._-] (others become '_'), no leading or trailing dots."""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", text).strip(".") or "_"
+
+
+def report_filename(brand: str, ml: str, n: int = 1) -> str:
+    """PDF name for a brand's report; n > 1 tells apart brands that clean up to the same name."""
+    suffix = f"-{n}" if n > 1 else ""
+    return f"{_file_part(brand)}{suffix}_lift_report_{_file_part(ml)}.pdf"
+
+
+def report_filenames(brands: list, ml: str) -> list[str]:
+    """report_filename for each brand, numbered where names collide (ignoring case)."""
+    names, seen = [], set()
+    for brand in brands:
+        n = 1
+        while (name := report_filename(brand, ml, n)).lower() in seen:
+            n += 1
+        seen.add(name.lower())
+        names.append(name)
+    return names
+
+
+def _tts_amz_chart(b: dict, WM: list, wl: str) -> ImageReader:
+    fig = init_worker()
+    fig.clf()
+    fig.set_size_inches(*CHART_SIZE)
+    ax = fig.add_subplot()
+    x = np.arange(len(WM))
+    ax.bar(x, b['tts_series'], color='#FF6B35', alpha=0.75, label='TTS GMV', width=0.4)
+    ax2 = ax.twinx()
+    ax2.fill_between(x, b['amz_series'], alpha=0.15, color='#60A5FA')
+    ax2.plot(x, b['amz_series'], color='#60A5FA', linewidth=2, label='AMZ Sales')
+    ax2.plot(x, b['org_series'], color='#34D399', linewidth=1.5, linestyle='--', label='AMZ Organic')
+    ax2.tick_params(colors='#9CA3AF', labelsize=7)
+    ax.set_xticks(x); ax.set_xticklabels(WM, fontsize=7)
+    ax.legend(loc='upper left', fontsize=6, facecolor='#0A0A0A', edgecolor='#2A2A2A', labelcolor='#9CA3AF')
+    ax2.legend(loc='upper right', fontsize=6, facecolor='#0A0A0A', edgecolor='#2A2A2A', labelcolor='#9CA3AF')
+    ax.set_title(f'TTS GMV vs Amazon Sales ({wl})', color='white', fontsize=9, fontweight='bold', pad=8)
+
+    fig.patch.set_facecolor('#0A0A0A')
+    ax.set_facecolor('#0A0A0A')
+    ax.tick_params(colors='#9CA3AF', labelsize=7)
+    for spine in ax.spines.values(): spine.set_color('#2A2A2A')
+    buf2 = BytesIO()
+    fig.savefig(buf2, format='png', dpi=150, bbox_inches='tight', facecolor='#0A0A0A')
+    fig.clf()
+    buf2.seek(0)
+    return ImageReader(buf2)
+
+
+def brand_report(b: dict, WM: list, wl: str, ml: str, generated: str | None = None) -> bytes:
+    """
+    Two-page PDF for one model row `b` (apply_parameters row or
+    BrandResults.brand()). WM labels the window months, wl is the window label
+    and ml the report month label; `generated` defaults to today.
+    """
+    sel = b['brand']
+    generated = generated or datetime.now().strftime('%Y-%m-%d')
+    pdf_buf = BytesIO()
+    c = pdf_canvas.Canvas(pdf_buf, pagesize=letter)
+    W, H = letter
+    margin = 50
+
+    def draw_bg():
+        c.setFillColor(bg_color)
+        c.rect(0, 0, W, H, fill=1, stroke=0)
+
+    # ═══ PAGE 1 ═══
+    draw_bg()
+    # Header bar
+    c.setFillColor(coral_pdf)
+    c.rect(0, H-60, W, 60, fill=1, stroke=0)
+    c.setFillColor(white)
+    c.setFont("Helvetica-Bold", 20)
+    c.drawString(margin, H-42, f"{sel} — TTS to Amazon Lift Report")
+    c.setFont("Helvetica", 10)
+    c.drawRightString(W-margin, H-42, f"{ml} | Pattern x NextWave")
+
+    # KPI boxes
+    y = H - 110
+    kpis_pdf = [
+        ("TTS GMV", fd(b['jan_tts'])),
+        ("AMZ Sales", fd(b['jan_amz'])),
+        ("Correlation r", f"{b['r_best']:.3f}"),
+        ("Confidence", b['confidence']),
+        ("Corr. Attributed", fd(b['corr_attr'])),
+        ("Funnel Attributed", fd(b['funnel_attr'])),
+    ]
+    box_w = (W - 2*margin - 5*12) / 6
+    for i, (label, value) in enumerate(kpis_pdf):
+        bx = margin + i*(box_w+12)
+        c.setFillColor(surface)
+        c.roundRect(bx, y, box_w, 55, 6, fill=1, stroke=0)
+        c.setFillColor(text_g)
+        c.setFont("Helvetica", 7)
+        c.drawString(bx+8, y+40, label.upper())
+        val_color = conf_colors_pdf.get(value, green_pdf) if label == "Confidence" else (green_pdf if label in ("Corr. Attributed","Funnel Attributed") else text_w)
+        c.setFillColor(val_color)
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(bx+8, y+12, str(value))
+
+    # Attribution detail
+    y -= 50
+    c.setFillColor(coral_pdf)
+    c.rect(margin, y, 3, 12, fill=1, stroke=0)
+    c.setFont("Helvetica-Bold", 9)
+    c.drawString(margin+10, y+2, "ATTRIBUTION DETAIL")
+
+    y -= 25
+    detail_rows = [
+        ("Correlation Rate", f"{b['corr_rate']*100:.0f}%"),
+        ("Corr. Type", b['r_type']),
+        ("GMV Cap Applied", "YES" if b['corr_capped'] else "NO"),
+        ("Active TTS Months", str(b['active_months'])),
+        (f"TTS Total ({len(WM)} mo)", fd(b['tts_total'])),
+        ("Impressions", fn(b['impressions'])),
+        ("Visitors", fn(b['visitors'])),
+        ("Funnel Path A (visitors)", fd(b['path_a'])),
+        ("Funnel Path B (impressions)", fd(b['path_b'])),
+        ("Est. AMZ Visitors", fn(b['total_amz_vis'])),
+    ]
+    col1_rows = detail_rows[:5]
+    col2_rows = detail_rows[5:]
+    for ci, col_rows in enumerate([col1_rows, col2_rows]):
+        bx = margin + ci * ((W-2*margin)//2)
+        ry = y
+        for label, value in col_rows:
+            c.setFillColor(text_g); c.setFont("Helvetica", 8)
+            c.drawString(bx, ry, label)
+            c.setFillColor(text_w); c.setFont("Helvetica-Bold", 8)
+            c.drawString(bx+160, ry, str(value))
+            ry -= 15
+
+    # TTS vs AMZ chart
+    img = _tts_amz_chart(b, WM, wl)
+    c.drawImage(img, 25, H-430, width=550, height=230, mask='auto')
+
+    # ═══ PAGE 2 ═══
+    c.showPage(); draw_bg()
+    c.setFillColor(coral_pdf); c.setFont("Helvetica-Bold", 8)
+    c.drawString(margin, H-35, "PATTERN x NEXTWAVE")
+    c.setFillColor(text_w); c.setFont("Helvetica-Bold", 16)
+    c.drawString(margin, H-55, f"{sel} — Monthly Detail")
+
+    # Monthly table
+    y = H-90
+    c.setFillColor(coral_pdf); c.rect(margin, y, 3, 12, fill=1, stroke=0)
+    c.setFont("Helvetica-Bold", 9)
+    c.drawString(margin+10, y+2, f"MONTHLY DETAIL ({wl})".upper())
+
+    y -= 25
+    col_positions = [margin, margin+50, margin+140, margin+250, margin+360]
+    headers_t = ["Month", "TTS GMV", "AMZ Sales", "AMZ Organic", "Ad Sales"]
+    c.setFillColor(surface)
+    c.rect(margin-5, y-4, W-2*margin+10, 18, fill=1, stroke=0)
+    c.setFillColor(coral_pdf); c.setFont("Helvetica-Bold", 8)
+    for hi_idx, h in enumerate(headers_t):
+        c.drawString(col_positions[hi_idx], y, h)
+
+    y -= 18
+    for mi in range(len(WM)):
+        tts_v = b['tts_series'][mi]
+        amz_v = b['amz_series'][mi]
+        org_v = b['org_series'][mi]
+        ad_v = amz_v - org_v
+        if mi % 2 == 0:
+            c.setFillColor(HexColor('#0F0F0F'))
+            c.rect(margin-5, y-4, W-2*margin+10, 16, fill=1, stroke=0)
+        c.setFillColor(text_g); c.setFont("Helvetica", 8)
+        c.drawString(col_positions[0], y, WM[mi])
+        c.setFillColor(text_w)
+        c.drawString(col_positions[1], y, fd(tts_v) if tts_v > 0 else "-")
+        c.drawString(col_positions[2], y, fd(amz_v) if amz_v > 0 else "-")
+        c.drawString(col_positions[3], y, fd(org_v) if org_v > 0 else "-")
+        c.drawString(col_positions[4], y, fd(ad_v) if ad_v != 0 else "-")
+        y -= 16
+
+    # Funnel summary
+    y -= 30
+    c.setFillColor(coral_pdf); c.rect(margin, y, 3, 12, fill=1, stroke=0)
+    c.setFont("Helvetica-Bold", 9)
+    c.drawString(margin+10, y+2, "FUNNEL MODEL SUMMARY")
+    y -= 20
+    funnel_rows = [
+        ("TTS Visitors", fn(b['visitors'])),
+        ("TTS Impressions", fn(b['impressions'])),
+        ("Path A — Non-buyer visitors → AMZ", fd(b['path_a'])),
+        ("Path B — Impression recall → AMZ", fd(b['path_b'])),
+        ("Total Funnel Attributed", fd(b['funnel_attr'])),
+        ("Est. Amazon Visitors from TTS", fn(b['total_amz_vis'])),
+    ]
+    for label, value in funnel_rows:
+        c.setFillColor(text_g); c.setFont("Helvetica", 8)
+        c.drawString(margin+10, y, label)
+        is_total = "Total" in label
+        c.setFillColor(green_pdf if is_total else text_w)
+        c.setFont("Helvetica-Bold", 9 if is_total else 8)
+        c.drawString(margin+250, y, value)
+        y -= 15
+
+    # Footer
+    c.setFillColor(text_g); c.setFont("Helvetica", 7)
+    c.drawString(margin, 30, f"Pattern x NextWave | TTS → Amazon Lift Model v5 | {ml} | Generated {generated}")
+    c.drawRightString(W-margin, 30, "Confidential — Internal Use Only")
+
+    c.save()
+    return pdf_buf.getvalue()
+
+
+# ── Bulk Export ───────────────────────────────────────────────────────────────
+
+def _render(i: int, b: dict, WM: list, wl: str, ml: str, generated: str) -> tuple[int, bytes]:
+    return i, brand_report(b, WM, wl, ml, generated)
+
+
+def default_workers() -> int:
+    """Leave a core for the app's server threads."""
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def build_zip(rows: list[dict], WM: list, wl: str, ml: str, workers: int | None = None,
+              progress=None, cancel: threading.Event | None = None) -> bytes:
+    """
+    Zip of brand_report for every row. PDFs are written into the archive
+    as workers finish them; progress(done, total) is called after each.
+    With workers=1 everything renders in-process. Setting `cancel` stops
+    the job early and returns the partial archive.
+    """
+    workers = default_workers() if workers is None else workers
+    generated = datetime.now().strftime('%Y-%m-%d')
+    names = report_filenames([b['brand'] for b in rows], ml)
+    out = BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        def add(done, i, pdf):
+            zf.writestr(names[i], pdf)
+            if progress is not None:
+                progress(done, len(rows))
+
+        if workers <= 1 or len(rows) <= 1:
+            for i, b in enumerate(rows):
+                if cancel is not None and cancel.is_set():
+                    break
+                add(i + 1, *_render(i, b, WM, wl, ml, generated))
+        else:
+            # spawn, not fork: the app process runs server threads
+            with ProcessPoolExecutor(max_workers=min(workers, len(rows)), initializer=init_worker,
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(_render, i, b, WM, wl, ml, generated) for i, b in enumerate(rows)]
+                for done, f in enumerate(as_completed(futures), 1):
+                    if cancel is not None and cancel.is_set():
+                        for other in futures:
+                            other.cancel()
+                        break
+                    add(done, *f.result())
+    return out.getvalue()
+
+
+class BulkExport:
+    """
+    build_zip on a background thread, so a Streamlit run can start it and
+    return. Poll `done` / `total` / `running`; when finished, `data` holds
+    the zip, or `error` the exception that stopped it.
+    """
+
+    def __init__(self, rows: list[dict], WM: list, wl: str, ml: str, workers: int | None = None):
+        self.total = len(rows)
+        self.done = 0
+        self.data = None
+        self.error = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(rows, WM, wl, ml, workers),
+                                        name="bulk-pdf-export", daemon=True)
+        self._thread.start()
+
+    def _progress(self, done, total):
+        self.done = done
+
+    def _run(self, rows, WM, wl, ml, workers):
+        try:
+            self.data = build_zip(rows, WM, wl, ml, workers, progress=self._progress, cancel=self._cancel)
+        except Exception as e:
+            self.error = e
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def cancel(self) -> None:
+        self._cancel.set()
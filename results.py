@@ -0,0 +1,97 @@
+"""
+results.py — Brand-Level Model Results
+
+apply_parameters returns one dict per brand with the monthly series as
+lists inside each row, which is what batch output and the PDF reports
+have always consumed. The app needs the same output as columns instead:
+totals, sorted tables and per-brand lookups. BrandResults keeps the light
+stage's output that way:
+
+    res = BrandResults.build(arrays, cap_mult=4, browse_rate=0.15, ...)
+    res.table                   # scalar metrics, one typed column each, indexed by brand
+    res.series("tts_series")    # (n_brands, n_months) window matrix
+    res.rows(["Gaia", "Thorne Research"])   # their rows in the matrices
+    b = res.brand("Gaia")       # one model row: scalars plus series rows
+
+res.table is in latest-month TTS GMV order (descending), the order the
+views list brands in. The matrices are the cached arrays themselves, in
+the engine's sorted-brand order. Brand lookups go through hashed indexes,
+and a brand's series in res.brand() are views of matrix rows.
+
+No Streamlit imports here.
+"""
+
+import numpy as np
+import pandas as pd
+
+from attribution_engine import parameter_arrays, row_fields
+from diagnostics import span
+
+# Per-brand vectors: kept as brand × month (or × lag) matrices, not table columns
+MATRIX_FIELDS = ("tts_series", "amz_series", "org_series", "lag_profile")
+# Low-cardinality labels stored as categoricals
+CATEGORY_FIELDS = ("r_type", "confidence")
+
+
+class BrandResults:
+    """
+    Scalar model fields in `table` (a DataFrame indexed by brand) and the
+    per-brand vectors in `matrices` ({field: 2-D array}, rows in `index`
+    order). `window` lists the months the series columns cover.
+    """
+
+    def __init__(self, table: pd.DataFrame, matrices: dict, index: pd.Index, window: list):
+        self.table = table
+        self.matrices = matrices
+        self.index = index
+        self.window = window
+        self._columns = None
+
+    @classmethod
+    def build(cls, arrays: dict, **params) -> "BrandResults":
+        """Light stage on prepared arrays; `params` are apply_parameters keyword arguments."""
+        with span("brand_results", "model", brands=len(arrays["brand"])):
+            fields = [f for f in row_fields(arrays) if f != "brand" and f not in MATRIX_FIELDS]
+            cols = parameter_arrays(arrays, fields=fields, **params)
+            index = pd.Index(arrays["brand"], name="brand")
+            table = pd.DataFrame({f: pd.Series(cols[f], index=index,
+                                               dtype="category" if f in CATEGORY_FIELDS else None)
+                                  for f in fields}, index=index)
+            table = table.sort_values("jan_tts", ascending=False, kind="stable")
+            matrices = {f: arrays[f] for f in MATRIX_FIELDS if f in arrays}
+            return cls(table, matrices, index, list(arrays.get("window", [])))
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def rows(self, brands) -> np.ndarray:
+        """Matrix rows of `brands`. KeyError naming any brand not in the results."""
+        pos = self.index.get_indexer(brands)
+        if (pos < 0).any():
+            missing = [b for b, p in zip(brands, pos) if p < 0]
+            raise KeyError(f"Brands not in the results: {', '.join(map(str, missing))}")
+        return pos
+
+    def series(self, field: str, brands=None) -> np.ndarray:
+        """Matrix `field`, or just the rows of `brands` in that order."""
+        m = self.matrices[field]
+        return m if brands is None else m[self.rows(brands)]
+
+    def brand(self, name: str) -> dict:
+        """
+        One brand's model row, keyed like an apply_parameters row: table
+        values plus a view of each matrix row. KeyError for unknown brands.
+        """
+        if self._columns is None:
+            # Column arrays once per result; numeric columns are not copied
+            self._columns = {c: self.table[c].to_numpy() for c in self.table.columns}
+        j = self.table.index.get_loc(name)
+        i = self.index.get_loc(name)
+        row = {"brand": name}
+        row.update((c, v[j]) for c, v in self._columns.items())
+        row.update((f, m[i]) for f, m in self.matrices.items())
+        return row
+
+    def records(self) -> list[dict]:
+        """brand() for every brand, in table order (e.g. for the bulk PDF export)."""
+        return [self.brand(name) for name in self.table.index]
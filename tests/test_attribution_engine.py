@@ -0,0 +1,103 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from attribution_engine import (  # noqa: E402
+    MIN_LAG_OVERLAP, batched_pearson, bootstrap_intervals, compute_brand_models, lag_correlations,
+    pair_correlations, resample_weights, rolling_pair_correlations, variant_pairs, weighted_pearson,
+)
+from synthetic import make_aggregates  # noqa: E402
+
+
+def test_columnar_engine_matches_legacy_loop():
+    pytest.importorskip("scipy")
+    from bench_brand_models import WINDOW_2025, diff_rows, legacy_rows
+
+    agg = make_aggregates(70)
+    latest = (2026, 1)
+    assert diff_rows(legacy_rows(*agg, latest), compute_brand_models(*agg, latest, window=WINDOW_2025)) == []
+
+
+# ── Engine arithmetic against per-row np.corrcoef ─────────────────────────────
+
+def _r(x, y) -> float:
+    """Reference Pearson r, NaN for a constant series."""
+    if np.all(x == x[0]) or np.all(y == y[0]):
+        return np.nan
+    return float(np.corrcoef(x, y)[0, 1])
+
+
+def _series(rows: int = 12, months: int = 14, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, 5e4, (rows, months))
+    y = 2e5 + 3 * x + rng.normal(0, 2e4, (rows, months))
+    x[1] = 7.0                      # constant TTS
+    x[2, ::2] = 0                   # sparse TTS
+    y[3] = 1e5                      # constant Amazon
+    return x, y
+
+
+def test_batched_pearson_matches_reference():
+    x, y = _series()
+    np.testing.assert_allclose(batched_pearson(x, y), [_r(a, b) for a, b in zip(x, y)], rtol=1e-12)
+
+
+def test_lag_correlations_match_shifted_reference():
+    x, y = _series()
+    m = x.shape[1]
+    max_lag = m - MIN_LAG_OVERLAP + 2    # the last lags overlap too few months
+    r, ok = lag_correlations(x, y, max_lag)
+    for k in range(max_lag + 1):
+        ref = np.array([_r(a[:m - k], b[k:]) if m - k >= MIN_LAG_OVERLAP else np.nan for a, b in zip(x, y)])
+        np.testing.assert_array_equal(ok[:, k], ~np.isnan(ref))
+        np.testing.assert_allclose(r[:, k], ref, rtol=1e-9, atol=1e-12)
+
+
+def test_rolling_correlations_match_each_window():
+    tts, amz = _series()
+    org = amz * 0.7
+    n = 6
+    r, ok = rolling_pair_correlations(tts, amz, org, n)
+    assert not ok[:, :, :n - 1].any()
+    for t in range(n - 1, tts.shape[1]):
+        ref_r, ref_ok = pair_correlations(*(a[:, t - n + 1:t + 1] for a in (tts, amz, org)))
+        np.testing.assert_array_equal(ok[:, :, t], ref_ok)
+        np.testing.assert_allclose(r[:, :, t], ref_r, rtol=1e-9, atol=1e-12)
+
+
+def test_weighted_pearson_matches_drawn_resamples():
+    x, y = _series()
+    w = resample_weights(x.shape[1], 20, seed=3)
+    assert (w.sum(axis=1) == x.shape[1]).all()
+    np.testing.assert_array_equal(w, resample_weights(x.shape[1], 20, seed=3))
+    r = weighted_pearson(x, y, w)
+    for b in range(20):
+        idx = np.repeat(np.arange(x.shape[1]), w[b].astype(int))
+        ref = [_r(a[idx], c[idx]) for a, c in zip(x, y)]
+        np.testing.assert_allclose(r[:, b], ref, rtol=1e-9, atol=1e-12)
+
+
+def test_bootstrap_intervals_match_resample_loop():
+    tts, amz = _series()
+    org = amz * 0.5 + 1e4 * np.arange(tts.shape[1])
+    r_idx = np.arange(len(tts)) % 4
+    scored = np.ones(len(tts), dtype=bool)
+    scored[5] = False
+    out = bootstrap_intervals(tts, amz, org, r_idx, scored, n_resamples=200, level=0.9, chunk=3)
+    pairs = variant_pairs(tts, amz, org)
+    for i in range(len(tts)):
+        if not scored[i]:
+            assert np.isnan(out["r_lo"][i])
+            continue
+        x, y = pairs[r_idx[i]][0][i], pairs[r_idx[i]][1][i]
+        m = len(x)
+        draws = [np.repeat(np.arange(m), c.astype(int)) for c in resample_weights(m, 200, seed=m)]
+        rs = np.nan_to_num([_r(x[idx], y[idx]) for idx in draws], nan=0.0)
+        np.testing.assert_allclose([out["r_lo"][i], out["r_hi"][i]], np.quantile(rs, [0.05, 0.95]),
+                                   rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose([out["abs_r_lo"][i], out["abs_r_hi"][i]],
+                                   np.quantile(np.abs(rs), [0.05, 0.95]), rtol=1e-9, atol=1e-12)
@@ -0,0 +1,34 @@
+import os
+import sys
+from io import BytesIO
+
+import openpyxl
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from attribution_model import BRAND_MAP, aggregate_sources, available_months  # noqa: E402
+from parsers import read_broadway  # noqa: E402
+
+
+def _partner_raw(rows: list[tuple]) -> bytes:
+    """Broadway workbook with a Partner Raw sheet of (shop, gmv, month, year) rows."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Partner Raw"
+    ws.append([f"h{i}" for i in range(22)])
+    for shop, gmv, month, year in rows:
+        row = [None] * 22
+        row[0], row[1], row[13], row[14], row[18], row[20] = shop, gmv, 1000, 50, month, year
+        ws.append(row)
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def test_blank_year_broadway_rows_are_not_a_month():
+    broadway = read_broadway(_partner_raw([("Gaia", 500.0, 3, 2025), ("Gaia", 200.0, 4, None)]))
+    assert broadway["pr"]["year"].tolist() == [2025, 0]
+
+    assert available_months(None, broadway) == {(2025, 3)}
+    content = aggregate_sources(None, broadway, None, dict(BRAND_MAP))[2]
+    assert dict(content["Gaia"]).keys() == {(2025, 3)}
+    assert content["Gaia"][(2025, 3)]["gmv"] == 500.0
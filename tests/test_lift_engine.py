@@ -0,0 +1,92 @@
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lift_engine import prepare_compact, run_lift_analysis, run_lift_analysis_chunked, validate_frame  # noqa: E402
+
+
+def _frame(n_brands: int = 10, n_months: int = 12) -> pd.DataFrame:
+    months = pd.period_range("2023-01", periods=n_months, freq="M").astype(str)
+    return pd.DataFrame({
+        "Brand": [f"Brand {b}" for b in range(n_brands) for _ in months],
+        "Month": list(months) * n_brands,
+        "Amazon_Sales": [1000.0 + 10 * i for i in range(n_brands * n_months)],
+        "TikTok_Spend": 50.0,
+        "TikTok_Views": 2000,
+        "TikTok_Impressions": 5000,
+        "TikTok_Engagements": 300,
+        "TikTok_Clicks": 40,
+    })
+
+
+def _csv(df: pd.DataFrame) -> io.StringIO:
+    return io.StringIO(df.to_csv(index=False))
+
+
+def test_chunked_reports_errors_from_every_chunk_with_file_rows(tmp_path):
+    df = _frame()
+    df.loc[3, "Amazon_Sales"] = -1.0      # chunk 0
+    df.loc[97, "Month"] = "2024/02"       # chunk 4 of 25-row chunks
+    out = run_lift_analysis_chunked(_csv(df), str(tmp_path / "detail.csv"), chunksize=25)
+
+    assert out["detail"] is None
+    assert not (tmp_path / "detail.csv").exists()
+    assert out["errors"] == [
+        "Amazon_Sales contains negative values. (1 row: 3)",
+        "Month column must be in YYYY-MM format (e.g., 2024-01). (1 row: 97)",
+    ]
+
+
+def test_chunked_errors_match_in_memory_validation(tmp_path):
+    df = _frame()
+    df["TikTok_Views"] = df["TikTok_Views"].astype(object)
+    df.loc[[2, 30, 31, 64, 90, 91, 119], "Amazon_Sales"] = -5.0
+    df.loc[[8, 77], "TikTok_Views"] = "lots"
+    df.loc[50, "Month"] = "Feb 2024"
+    out = run_lift_analysis_chunked(_csv(df), str(tmp_path / "detail.csv"), chunksize=25)
+
+    assert out["errors"] == validate_frame(pd.read_csv(_csv(df))).errors
+    assert out["errors"] == [
+        "Column 'TikTok_Views' must be numeric. (2 rows: 8, 77)",
+        "Amazon_Sales contains negative values. (7 rows: 2, 30, 31, 64, 90 and 2 more)",
+        "Month column must be in YYYY-MM format (e.g., 2024-01). (1 row: 50)",
+    ]
+
+
+def test_chunked_clean_file_runs(tmp_path):
+    out = run_lift_analysis_chunked(_csv(_frame()), str(tmp_path / "detail.csv"), chunksize=25)
+    assert out["errors"] == []
+    assert out["rows"] == 120
+
+
+def test_chunked_header_only_reports_missing_columns(tmp_path):
+    out = run_lift_analysis_chunked(io.StringIO("Brand,Month,Sales\n"), str(tmp_path / "detail.csv"))
+    assert out["errors"] == validate_frame(pd.DataFrame(columns=["Brand", "Month", "Sales"])).errors
+    assert out["errors"][0].startswith("Missing required columns: Amazon_Sales")
+    assert out["errors"][-1] == "Dataset is empty."
+
+    out = run_lift_analysis_chunked(_csv(_frame().iloc[:0]), str(tmp_path / "detail.csv"))
+    assert out["errors"] == ["Dataset is empty."]
+
+
+def test_compact_counts_stay_exact_past_float32_precision():
+    df = _frame(n_brands=2, n_months=3)
+    df["TikTok_Engagements"] = 2**24 + 1
+    df["TikTok_Clicks"] = 2**24 + 1.0
+    df.loc[0, "TikTok_Clicks"] = np.nan
+    out = prepare_compact(df)
+    assert out["TikTok_Engagements"].dtype == np.int32
+    assert out["TikTok_Clicks"].iloc[1:].eq(2**24 + 1).all()
+
+    df["TikTok_Engagements"] = 2**31 + 1
+    assert prepare_compact(df)["TikTok_Engagements"].eq(2**31 + 1).all()
+
+
+def test_compact_with_workers_is_rejected():
+    with pytest.raises(ValueError, match="compact"):
+        run_lift_analysis(_frame(), workers=2, compact=True)
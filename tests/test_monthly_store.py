@@ -0,0 +1,62 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from attribution_engine import prepare_brand_arrays  # noqa: E402
+from monthly_store import MonthlyStore  # noqa: E402
+from synthetic import make_aggregates  # noqa: E402
+
+LATEST = (2026, 1)
+
+
+def _upload(aggregates, names) -> tuple:
+    """The aggregates of an upload holding only `names`."""
+    tts_monthly, amz_monthly, content, tts_meta, _ = aggregates
+    return ({b: tts_monthly[b] for b in names if b in tts_monthly},
+            {b: amz_monthly[b] for b in names if b in amz_monthly},
+            {b: content[b] for b in names if b in content},
+            {b: tts_meta[b] for b in names}, set(names))
+
+
+def _assert_same(ref: dict, got: dict) -> None:
+    assert ref.keys() == got.keys()
+    for k, a in ref.items():
+        b = got[k]
+        if isinstance(a, np.ndarray) and a.dtype.kind == "f":
+            np.testing.assert_allclose(b, a, rtol=1e-9, atol=1e-9, err_msg=k)
+        else:
+            assert list(b) == list(a), k
+
+
+def test_brand_arrays_cover_only_the_current_upload():
+    aggregates = make_aggregates(30)
+    names = sorted(aggregates[4])
+    store = MonthlyStore()
+    store.merge(*_upload(aggregates, names[:20]))
+    current = _upload(aggregates, names[10:])
+    store.merge(*current)
+
+    got = store.brand_arrays(current[4], LATEST)
+    assert list(got["brand"]) == names[10:]
+    _assert_same(prepare_brand_arrays(*current, LATEST), got)
+
+
+def test_near_constant_series_scored_as_without_the_store():
+    aggregates = make_aggregates(14)
+    brand = sorted(aggregates[4])[5]
+    series = aggregates[0][brand]
+    series.clear()
+    series.update({(2025, m): 1e6 for m in range(1, 13)})
+    series[(2025, 7)] += 1e-4    # varies, but far below the sums' precision
+    series[LATEST] = 1e6
+
+    store = MonthlyStore()
+    store.merge(*aggregates)
+    ref = prepare_brand_arrays(*aggregates, LATEST)
+    got = store.brand_arrays(aggregates[4], LATEST)
+    i = list(ref["brand"]).index(brand)
+    assert np.isfinite(ref["r_best"][i])
+    _assert_same(ref, got)
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from bench_broadway_parser import legacy_parse_broadway, mismatches  # noqa: E402
+from parse_cache import ParseCache  # noqa: E402
+from parsers import broadway_sheet_xml, parse_amazon, parse_gmv_csv, read_broadway, read_broadway_xml  # noqa: E402
+from synthetic import MIN_YEAR, make_amazon, make_broadway, make_gmv  # noqa: E402
+
+
+def _assert_equal(a, b) -> None:
+    if isinstance(a, dict):
+        assert a.keys() == b.keys()
+        for k in a:
+            _assert_equal(a[k], b[k])
+    elif isinstance(a, np.ndarray):
+        assert isinstance(b, np.ndarray) and a.dtype == b.dtype
+        np.testing.assert_array_equal(a, b)
+    elif isinstance(a, list):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            _assert_equal(x, y)
+    else:
+        assert a == b
+
+
+def test_streaming_broadway_matches_openpyxl():
+    fb = make_broadway(300)
+    parsed = read_broadway(fb, min_year=MIN_YEAR)
+    assert mismatches(legacy_parse_broadway(fb), parsed) == []
+    # One sheet at a time
+    for key in parsed:
+        _assert_equal(read_broadway(fb, min_year=MIN_YEAR, sheets=(key,))[key], parsed[key])
+    # From the pre-split sheet XML and shared strings, as the ingest workers read it
+    xml, strings = broadway_sheet_xml(fb)
+    assert xml.keys() == parsed.keys()
+    for key in parsed:
+        _assert_equal(read_broadway_xml(key, xml[key], strings, MIN_YEAR)[key], parsed[key])
+
+
+def test_parse_cache_round_trips_every_source(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    sources = {
+        "broadway": read_broadway(make_broadway(200), min_year=MIN_YEAR),
+        "amazon": parse_amazon(make_amazon()),
+        "gmv": parse_gmv_csv(make_gmv()),
+    }
+    for key, value in sources.items():
+        assert cache.get(key) == (False, None)
+        cache.put(key, value)
+        hit, loaded = cache.get(key)
+        assert hit
+        _assert_equal(value, loaded)
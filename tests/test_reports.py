@@ -0,0 +1,17 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from reports import report_filename, report_filenames  # noqa: E402
+
+
+def test_report_filename_keeps_only_safe_characters():
+    assert report_filename("Herbs, Etc.", "Jan 2026") == "Herbs__Etc_lift_report_Jan_2026.pdf"
+    name = report_filename("../A/B", "Jan 2026")
+    assert "/" not in name and not name.startswith(".")
+
+
+def test_report_filenames_are_unique():
+    names = report_filenames(["A B", "A_B", "a b", "Gaia"], "Jan 2026")
+    assert names == ["A_B_lift_report_Jan_2026.pdf", "A_B-2_lift_report_Jan_2026.pdf",
+                     "a_b-3_lift_report_Jan_2026.pdf", "Gaia_lift_report_Jan_2026.pdf"]
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from attribution_engine import apply_parameters, prepare_brand_arrays  # noqa: E402
+from results import BrandResults  # noqa: E402
+from synthetic import make_aggregates  # noqa: E402
+
+PARAMS = dict(cap_mult=3, browse_rate=0.2, recall_rate=0.004, amz_conv=0.12, amz_aov=40)
+
+
+def _results() -> BrandResults:
+    index = pd.Index(["Gaia", "Thorne", "Olly"], name="brand")
+    table = pd.DataFrame({"jan_tts": [30.0, 20.0, 10.0]}, index=index)
+    series = np.arange(12, dtype=float).reshape(3, 4)
+    return BrandResults(table, {"tts_series": series}, index, ["2024-01", "2024-02", "2024-03", "2024-04"])
+
+
+def test_series_rows_in_requested_order():
+    res = _results()
+    np.testing.assert_array_equal(res.series("tts_series", ["Olly", "Gaia"]), [[8, 9, 10, 11], [0, 1, 2, 3]])
+
+
+def test_unknown_brand_raises_key_error():
+    res = _results()
+    with pytest.raises(KeyError, match="Nope"):
+        res.rows(["Gaia", "Nope"])
+    with pytest.raises(KeyError, match="Nope"):
+        res.series("tts_series", ["Nope"])
+
+
+def test_brand_matches_apply_parameters():
+    arrays = prepare_brand_arrays(*make_aggregates(40), (2026, 1), max_lag=3, n_resamples=50)
+    res = BrandResults.build(arrays, **PARAMS)
+    rows = apply_parameters(arrays, **PARAMS)
+    assert len(res) == len(rows)
+    for row in rows:
+        got = res.brand(row["brand"])
+        assert got.keys() == row.keys()
+        for k, v in row.items():
+            if isinstance(v, (list, float, np.ndarray)):
+                np.testing.assert_allclose(np.asarray(got[k], dtype=float), np.asarray(v, dtype=float),
+                                           rtol=1e-12, err_msg=f"{row['brand']}.{k}")
+            else:
+                assert got[k] == v, f"{row['brand']}.{k}"
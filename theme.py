@@ -0,0 +1,61 @@
+"""
+theme.py — Dashboard Theme & Formatting Helpers
+
+Palette, global CSS and the small HTML/number formatting helpers used by
+app.py. Kept out of the app script so they are built once per process
+instead of on every Streamlit rerun. Streamlit is imported only by the
+helpers that write to the page, so report workers can use the formatters.
+"""
+
+# ═══════════════ THEME — Pattern.com inspired ═══════════════
+BG='#0A0A0A';S1='#111111';S2='#1A1A1A';BD='#2A2A2A'
+# Pattern uses a dark black BG, white text, and coral/orange accent
+CORAL='#FF6B35';GRN='#34D399';YEL='#FBBF24';BLU='#60A5FA'
+PUR='#A78BFA';T1='#FFFFFF';T2='#9CA3AF';T3='#4B5563'
+CC={'HIGH':GRN,'MED':YEL,'LOW':'#FB923C','WEAK':'#EF4444','INSUF':T3}
+MO=['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
+
+CSS=f"""<style>
+@import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800;900&display=swap');
+.stApp{{background:{BG};}}
+section[data-testid="stSidebar"]{{background:{S1};border-right:1px solid {BD};}}
+h1,h2,h3{{font-family:'Inter',sans-serif!important;color:{T1}!important;font-weight:800!important;}}
+.kpi{{background:{S1};border:1px solid {BD};border-radius:12px;padding:18px;text-align:center;position:relative;}}
+.kpi .lb{{font:700 10px 'Inter',sans-serif;color:{T2};text-transform:uppercase;letter-spacing:.08em;}}
+.kpi .vl{{font:800 28px 'Inter',sans-serif;color:{T1};letter-spacing:-.02em;margin:4px 0;}}
+.kpi .vg{{font:800 28px 'Inter',sans-serif;color:{GRN};letter-spacing:-.02em;margin:4px 0;}}
+.kpi .sb{{font:400 10px 'Inter',sans-serif;color:{T3};}}
+.kpi .tip{{display:none;position:absolute;bottom:calc(100% + 8px);left:50%;transform:translateX(-50%);background:#1F2937;color:#D1D5DB;padding:8px 12px;border-radius:8px;font:400 11px 'Inter',sans-serif;white-space:normal;width:220px;text-align:left;z-index:99;box-shadow:0 4px 12px rgba(0,0,0,.4);line-height:1.4;}}
+.kpi .tip::after{{content:'';position:absolute;top:100%;left:50%;transform:translateX(-50%);border:6px solid transparent;border-top-color:#1F2937;}}
+.kpi:hover .tip{{display:block;}}
+.stTabs [data-baseweb="tab-list"]{{gap:4px;}}
+.stTabs [data-baseweb="tab"]{{background:transparent;border:1px solid {BD};border-radius:8px;padding:6px 16px;font-size:12px;font-weight:600;color:{T2};font-family:'Inter',sans-serif;}}
+.stTabs [aria-selected="true"]{{background:rgba(255,107,53,.08)!important;border-color:{CORAL}!important;color:{CORAL}!important;}}
+</style>"""
+
+# ═══════════════ HELPERS ═══════════════
+def fd(v):
+    if v is None: return "$0"
+    v=float(v)
+    if abs(v)>=1e6:return f"${v/1e6:.1f}M"
+    if abs(v)>=1e3:return f"${v/1e3:.0f}K"
+    return f"${v:,.0f}"
+def fn(v):
+    if v is None: return "0"
+    v=float(v)
+    if v>=1e6:return f"{v/1e6:.1f}M"
+    if v>=1e3:return f"{v/1e3:.0f}K"
+    return f"{v:,.0f}"
+def kpi_h(lb,vl,sb="",g=False,tip=""):
+    vc="vg" if g else "vl"
+    tip_html = f'<div class="tip">{tip}</div>' if tip else ''
+    return f'<div class="kpi">{tip_html}<div class="lb">{lb}</div><div class="{vc}">{vl}</div><div class="sb">{sb}</div></div>'
+def sec(t):
+    import streamlit as st
+    st.markdown(f'<div style="display:flex;align-items:center;gap:8px;margin:28px 0 10px;"><div style="width:3px;height:16px;background:{CORAL};border-radius:2px;"></div><span style="font:700 10px \'Inter\',sans-serif;color:{CORAL};text-transform:uppercase;letter-spacing:.12em;">{t}</span></div>',unsafe_allow_html=True)
+def badge_h(c):
+    return f'<span style="display:inline-block;font:700 9px \'Inter\',sans-serif;padding:2px 8px;border-radius:4px;letter-spacing:.06em;background:{CC.get(c,T3)}15;color:{CC.get(c,T3)};">{c}</span>'
+def pthem(fig,h=350):
+    fig.update_layout(height=h,plot_bgcolor=BG,paper_bgcolor=BG,font=dict(family='Inter,sans-serif',color=T2,size=10),margin=dict(l=10,r=10,t=20,b=10),hovermode='x unified',legend=dict(orientation='h',y=-0.12,font=dict(size=10)))
+    fig.update_xaxes(gridcolor=BD,showline=False);fig.update_yaxes(gridcolor=BD,showline=False)
+    return fig
@@ -0,0 +1,98 @@
+"""
+time_axis.py — Month Time Axis
+
+Months are (year, month) tuples everywhere in the app. For window math
+they are mapped to integer offsets (year * 12 + month - 1), so any date
+range is a contiguous run of integers and a trailing window is a slice.
+
+No Streamlit imports here.
+"""
+
+MONTH_ABBR = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+DEFAULT_WINDOW_MONTHS = 12
+
+
+def month_index(ym: tuple) -> int:
+    """(year, month) -> integer month offset."""
+    y, m = ym
+    return int(y) * 12 + int(m) - 1
+
+
+def month_at(i: int) -> tuple:
+    """Integer month offset -> (year, month)."""
+    y, m = divmod(int(i), 12)
+    return (y, m + 1)
+
+
+def month_range(start: tuple, end: tuple) -> list[tuple]:
+    """Every month from start to end, inclusive."""
+    return [month_at(i) for i in range(month_index(start), month_index(end) + 1)]
+
+
+def trailing_window(end: tuple, n: int = DEFAULT_WINDOW_MONTHS) -> list[tuple]:
+    """The n months ending at (and including) `end`."""
+    e = month_index(end)
+    return [month_at(i) for i in range(e - n + 1, e + 1)]
+
+
+def resolve_window(window, latest: tuple) -> list[tuple]:
+    """
+    Correlation window for a report month: an int is a trailing window of
+    that many months ending at `latest`; a sequence of months is used as is.
+    """
+    if isinstance(window, int):
+        return trailing_window(latest, window)
+    return [tuple(ym) for ym in window]
+
+
+def month_label(ym: tuple, short: bool = False) -> str:
+    """'Jan 2026', or "Jan '26" with short=True."""
+    y, m = ym
+    return f"{MONTH_ABBR[m - 1]} '{y % 100:02d}" if short else f"{MONTH_ABBR[m - 1]} {y}"
+
+
+def window_label(months: list[tuple]) -> str:
+    """'Feb 2025 – Jan 2026' for a run of months (just 'Jan 2026' for one)."""
+    if not months:
+        return ""
+    if len(months) == 1:
+        return month_label(months[0])
+    return f"{month_label(months[0])} – {month_label(months[-1])}"
+
+
+class TimeAxis:
+    """
+    Dense month axis from `start` to `end`: column j of a brand × month
+    matrix is month start + j, so trailing windows are plain slices.
+    """
+
+    def __init__(self, start: tuple, end: tuple):
+        self.origin = month_index(start)
+        self.size = max(0, month_index(end) - self.origin + 1)
+
+    @classmethod
+    def covering(cls, months, *extra) -> "TimeAxis":
+        """Smallest axis holding every month in `months` and `extra`."""
+        idx = [month_index(ym) for ym in months] + [month_index(ym) for ym in extra]
+        if not idx:
+            raise ValueError("TimeAxis needs at least one month")
+        return cls(month_at(min(idx)), month_at(max(idx)))
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def months(self) -> list[tuple]:
+        return [month_at(self.origin + j) for j in range(self.size)]
+
+    def offset(self, ym: tuple) -> int:
+        """Column of `ym` (may fall outside 0..len-1)."""
+        return month_index(ym) - self.origin
+
+    def window(self, end: tuple, n: int) -> slice:
+        """Columns of the n months ending at `end`; the axis must cover them."""
+        e = self.offset(end)
+        if e - n + 1 < 0 or e >= self.size:
+            raise ValueError(f"window of {n} months ending {month_label(end)} is outside the axis")
+        return slice(e - n + 1, e + 1)